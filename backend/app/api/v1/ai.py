@@ -6,6 +6,7 @@ from app.core.database import get_db
 from app.api import dependencies as deps
 from app.models import User
 from app.services.llm_orchestrator import llm_orchestrator
+from app.services.llm_cache import completion_cache
 
 router = APIRouter()
 
@@ -33,6 +34,14 @@ async def get_ai_providers(
     }
 
 
+@router.get("/cache-stats", response_model=Dict[str, Any])
+async def get_completion_cache_stats(
+    current_user: User = Depends(deps.get_current_admin)
+):
+    """Hit/miss counters for the LLM completion cache (this worker process)"""
+    return completion_cache.stats()
+
+
 @router.post("/configure", status_code=status.HTTP_200_OK)
 async def configure_ai_provider(
     config: Dict[str, str],
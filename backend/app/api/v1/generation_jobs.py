@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from app.core.database import get_db
+from app.api import dependencies as deps
+from app.models import User
+from app.schemas.generation_job import GenerationJobResponse, GenerationJobProgressResponse
+from app.services.generation_jobs import GenerationJobService
+
+router = APIRouter()
+
+
+async def _get_job_with_access(job_id: uuid.UUID, current_user: User, db: AsyncSession):
+    service = GenerationJobService(db)
+    try:
+        job = await service.get_job(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    await deps.verify_project_access(job.project_id, current_user, db)
+    return service, job
+
+
+@router.get("/generation-jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Get status and result of a generation job"""
+    _, job = await _get_job_with_access(job_id, current_user, db)
+    return job
+
+
+@router.get("/generation-jobs/{job_id}/progress", response_model=GenerationJobProgressResponse)
+async def get_generation_job_progress(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Get per-story progress of a generation job"""
+    _, job = await _get_job_with_access(job_id, current_user, db)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total_stories": job.total_stories,
+        "completed_stories": job.completed_stories,
+        "stories": (job.progress or {}).get("stories", [])
+    }
+
+
+@router.post("/generation-jobs/{job_id}/cancel", response_model=GenerationJobResponse)
+async def cancel_generation_job(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Cancel a queued or running generation job"""
+    service, job = await _get_job_with_access(job_id, current_user, db)
+    job = await service.request_cancel(job)
+    await db.commit()
+    return job
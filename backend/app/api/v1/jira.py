@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime, timedelta
+from typing import Optional
+import json
 import uuid
 
 from app.core.database import get_db
 from app.api import dependencies as deps
 from app.models.user import User
 from app.services.jira_service import jira_service
+from app.services.jira_tokens import jira_tokens
+from app.services.jira_webhooks import jira_webhooks
 
 router = APIRouter()
 
@@ -81,6 +85,7 @@ async def jira_callback(
         
         db.add(user)
         await db.commit()
+        await jira_tokens.store(user.id, token_data)
 
         # 5. Redirect to Frontend
         # Assuming frontend is on localhost:3000
@@ -93,17 +98,24 @@ async def jira_callback(
 @router.post("/sync/{project_id}")
 async def sync_project_features(
     project_id: uuid.UUID,
+    full: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     Sync features from Jira for a specific project.
+    Only issues updated since the last sync are fetched unless full=true.
     """
     await deps.verify_project_access(project_id, current_user, db)
     
     try:
-        count = await jira_service.sync_project_features(project_id, db, current_user)
-        return {"message": f"Successfully synced {count} new features from Jira", "count": count}
+        report = await jira_service.sync_project_features(project_id, db, current_user, full=full)
+        count = report["upserts"]
+        return {
+            "message": f"Successfully synced {report['created']} new and {report['updated']} updated features from Jira",
+            "count": count,
+            **report,
+        }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -141,6 +153,32 @@ async def import_by_jira_key(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/webhook", status_code=status.HTTP_202_ACCEPTED)
+async def receive_jira_webhook(
+    request: Request,
+    x_hub_signature: Optional[str] = Header(None),
+    x_atlassian_webhook_identifier: Optional[str] = Header(None),
+):
+    """
+    Receive Jira issue created/updated/deleted webhooks.
+    Events are verified against JIRA_WEBHOOK_SECRET, de-duplicated by delivery
+    id and applied asynchronously, coalescing bursts for the same issue.
+    """
+    if not jira_webhooks.enabled:
+        raise HTTPException(status_code=503, detail="Jira webhooks are not configured")
+    body = await request.body()
+    if not jira_webhooks.verify_signature(body, x_hub_signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    event_id = jira_webhooks.event_id(body, x_atlassian_webhook_identifier)
+    result = await jira_webhooks.receive(payload, event_id)
+    return {"status": result}
+
+
 @router.get("/projects")
 async def get_projects(
     current_user: User = Depends(deps.get_current_user)
@@ -13,7 +13,8 @@ from app.core.config import settings
 from app.core.database import get_db
 from app.models import KnowledgeBatchStatus, User
 from app.schemas.knowledge import KnowledgeBatchResponse, KnowledgeEntryResponse
-from app.services.knowledge_base.batch_service import KnowledgeBatchService
+from app.services.knowledge_base.batch_service import KnowledgeBatchService, KnowledgeIngestMode
+from app.services.knowledge_base.pipeline import enqueue_batch
 
 router = APIRouter()
 
@@ -35,11 +36,19 @@ def _validate_file_extension(filename: str) -> str:
     return extension
 
 
-def _validate_file_size(file_bytes: bytes) -> None:
-    if not file_bytes:
+def _upload_size(file: UploadFile) -> int:
+    # The upload is spooled to a temporary file; measure it without reading it
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def _validate_file_size(size: int) -> None:
+    if not size:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
     max_bytes = settings.KNOWLEDGE_MAX_FILE_SIZE_MB * 1024 * 1024
-    if len(file_bytes) > max_bytes:
+    if size > max_bytes:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File exceeds size limit of {settings.KNOWLEDGE_MAX_FILE_SIZE_MB} MB",
@@ -54,13 +63,14 @@ def _validate_file_size(file_bytes: bytes) -> None:
 async def upload_knowledge_batch(
     project_id: UUID,
     file: UploadFile = File(...),
+    mode: KnowledgeIngestMode = KnowledgeIngestMode.APPEND,
     current_admin: User = Depends(deps.get_current_admin),
     db: AsyncSession = Depends(get_db),
 ):
     project = await deps.verify_project_access(project_id, current_admin, db)
     extension = _validate_file_extension(file.filename or "")
-    file_bytes = await file.read()
-    _validate_file_size(file_bytes)
+    file_size = _upload_size(file)
+    _validate_file_size(file_size)
 
     service = KnowledgeBatchService(db)
     batch = await service.create_batch(
@@ -68,20 +78,15 @@ async def upload_knowledge_batch(
         user=current_admin,
         file_name=file.filename or "upload",
         file_type=extension,
-        file_size_bytes=len(file_bytes),
+        file_size_bytes=file_size,
     )
-    service.upload_original_file(batch, file_bytes=file_bytes, content_type=file.content_type)
-
-    try:
-        await service.process_batch(batch)
-    except Exception as exc:  # pragma: no cover - bubbled to client
-        batch.status = KnowledgeBatchStatus.FAILED.value
-        batch.error_details = {"message": str(exc)}
-        await db.commit()
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    service.upload_original_file(batch, file_obj=file.file, content_type=file.content_type)
 
+    # Processing runs in the background; poll GET /knowledge-batches/{id} for progress
+    batch.status = KnowledgeBatchStatus.PENDING.value
     await db.commit()
     await db.refresh(batch)
+    enqueue_batch(batch.id, mode)
     return batch
 
 
@@ -1,15 +1,20 @@
+import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from typing import List
 import uuid
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.api import dependencies as deps
-from app.models import TestCase, Feature, User, TestStatus
+from app.models import TestCase, Feature, User, TestStatus, GenerationJobKind
 from app.schemas.test_case import TestCaseCreate, TestCaseUpdate, TestCaseResponse
+from app.schemas.generation_job import GenerationJobResponse
 from app.services.ai_generator import AIGeneratorService
+from app.services.generation_jobs import GenerationJobService, RUN_GENERATION_JOB
+from app.services.task_queue import task_queue
 
 logger = logging.getLogger(__name__)
 
@@ -140,13 +145,105 @@ async def generate_ai_test_cases(
         logger.error(f"Generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _streamed_test_case(test_case: TestCase) -> dict:
+    return {
+        "id": str(test_case.id),
+        "user_story_id": str(test_case.user_story_id),
+        "title": test_case.title,
+        "description": test_case.description,
+        "steps": test_case.steps,
+        "expected_result": test_case.expected_result,
+        "priority": test_case.priority,
+        "test_type": test_case.test_type,
+        "status": test_case.status
+    }
+
+@router.post("/features/{feature_id}/generate-test-cases/stream")
+async def stream_ai_test_cases(
+    feature_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Generate test cases with Server-Sent Events.
+    Emits a `test_case` event as soon as each test case is parsed and persisted,
+    then `done` (or `error`).
+    """
+    result = await db.execute(select(Feature).where(Feature.id == feature_id))
+    feature = result.scalar_one_or_none()
+    
+    if not feature:
+        raise HTTPException(status_code=404, detail="Feature not found")
+        
+    await deps.verify_project_access(feature.project_id, current_user, db)
+    user_id = current_user.id
+
+    async def event_stream():
+        # The request-scoped session is closed before the body streams, so use our own
+        async with AsyncSessionLocal() as stream_db:
+            ai_service = AIGeneratorService(stream_db)
+            story = await stream_db.get(Feature, feature_id)
+            count = 0
+            try:
+                async for test_case in ai_service.stream_test_cases_for_story(story, user_id):
+                    count += 1
+                    yield _sse_event("test_case", _streamed_test_case(test_case))
+            except Exception as e:
+                logger.error(f"Streaming generation failed: {str(e)}")
+                await stream_db.rollback()
+                yield _sse_event("error", {"detail": str(e), "test_cases_created": count})
+                return
+            yield _sse_event("done", {"test_cases_created": count})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post(
+    "/features/{feature_id}/generate-test-cases/jobs",
+    response_model=GenerationJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_ai_test_case_job(
+    feature_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Queue AI test case generation for a story and return the job immediately"""
+    result = await db.execute(select(Feature).where(Feature.id == feature_id))
+    feature = result.scalar_one_or_none()
+    
+    if not feature:
+        raise HTTPException(status_code=404, detail="Feature not found")
+        
+    await deps.verify_project_access(feature.project_id, current_user, db)
+    
+    job = await GenerationJobService(db).create_job(
+        story=feature,
+        user=current_user,
+        kind=GenerationJobKind.STORY
+    )
+    # Commit before enqueueing so the worker can see the job
+    await db.commit()
+    task_queue.enqueue(RUN_GENERATION_JOB, job.id)
+    return job
+
 @router.post("/epics/{epic_id}/bulk-generate-test-cases")
 async def bulk_generate_test_cases_for_epic(
     epic_id: uuid.UUID,
+    concurrent: bool = True,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
-    """Generate test cases for all child stories of an Epic"""
+    """
+    Generate test cases for all child stories of an Epic.
+    Stories are generated concurrently (bounded per provider/model) unless concurrent=false.
+    """
     # Verify the epic exists
     result = await db.execute(select(Feature).where(Feature.id == epic_id))
     epic = result.scalar_one_or_none()
@@ -165,56 +262,40 @@ async def bulk_generate_test_cases_for_epic(
     if not child_stories:
         raise HTTPException(status_code=400, detail="No child stories found for this Epic")
     
-    results = {
-        "total_stories": len(child_stories),
-        "stories_processed": 0,
-        "test_cases_generated": 0,
-        "stories": []
-    }
-    
     ai_service = AIGeneratorService(db)
-    for story in child_stories:
-        # Check if story already has test cases
-        existing_result = await db.execute(
-            select(TestCase).where(TestCase.user_story_id == story.id)
-        )
-        existing_cases = existing_result.scalars().all()
-        
-        if existing_cases:
-            results["stories"].append({
-                "id": str(story.id),
-                "jira_key": story.jira_key,
-                "name": story.name,
-                "status": "skipped",
-                "reason": f"Already has {len(existing_cases)} test cases"
-            })
-            continue
-        
-        try:
-            # Generate real test cases for this story
-            created_cases = await ai_service.generate_test_cases_for_story(
-                story_id=story.id,
-                user_id=current_user.id
-            )
-            
-            results["stories_processed"] += 1
-            results["test_cases_generated"] += len(created_cases)
-            results["stories"].append({
-                "id": str(story.id),
-                "jira_key": story.jira_key,
-                "name": story.name,
-                "status": "generated",
-                "test_cases_created": len(created_cases)
-            })
-        except Exception as e:
-            logger.error(f"Failed to generate for story {story.jira_key}: {str(e)}")
-            results["stories"].append({
-                "id": str(story.id),
-                "jira_key": story.jira_key,
-                "name": story.name,
-                "status": "failed",
-                "reason": str(e)
-            })
+    results = await ai_service.bulk_generate_for_stories(
+        child_stories,
+        user_id=current_user.id,
+        concurrent=concurrent
+    )
     
     await db.commit()
     return results
+
+@router.post(
+    "/epics/{epic_id}/bulk-generate-test-cases/jobs",
+    response_model=GenerationJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_epic_bulk_generation_job(
+    epic_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Queue test case generation for all child stories of an Epic"""
+    result = await db.execute(select(Feature).where(Feature.id == epic_id))
+    epic = result.scalar_one_or_none()
+    
+    if not epic:
+        raise HTTPException(status_code=404, detail="Epic not found")
+        
+    await deps.verify_project_access(epic.project_id, current_user, db)
+    
+    job = await GenerationJobService(db).create_job(
+        story=epic,
+        user=current_user,
+        kind=GenerationJobKind.EPIC
+    )
+    await db.commit()
+    task_queue.enqueue(RUN_GENERATION_JOB, job.id)
+    return job
@@ -50,17 +50,94 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/2")
     
+    # Background tasks: "local" runs them in-process, "celery" dispatches to app.worker
+    TASK_QUEUE_BACKEND: str = os.getenv("TASK_QUEUE_BACKEND", "local")
+    GENERATION_JOB_CHUNK_SIZE: int = int(os.getenv("GENERATION_JOB_CHUNK_SIZE", "10"))
+    # Local backend: jobs and batches are stamped this often while queued or running here;
+    # unstamped for TASK_STALE_SECONDS means their process died
+    TASK_HEARTBEAT_SECONDS: float = float(os.getenv("TASK_HEARTBEAT_SECONDS", "30"))
+    TASK_STALE_SECONDS: float = float(os.getenv("TASK_STALE_SECONDS", "120"))
+    
+    # Knowledge vectors: "qdrant" (QDRANT_HOST) or "local" (memory-mapped files under LOCAL_VECTOR_DIR)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "qdrant")
+    LOCAL_VECTOR_DIR: str = os.getenv("LOCAL_VECTOR_DIR", "data/vectors")
+    # Local projects with this many points get an HNSW index (needs hnswlib); smaller ones are scanned
+    LOCAL_VECTOR_HNSW: bool = os.getenv("LOCAL_VECTOR_HNSW", "true").lower() == "true"
+    LOCAL_VECTOR_HNSW_MIN_POINTS: int = int(os.getenv("LOCAL_VECTOR_HNSW_MIN_POINTS", "20000"))
+    LOCAL_VECTOR_HNSW_M: int = int(os.getenv("LOCAL_VECTOR_HNSW_M", "16"))
+    LOCAL_VECTOR_HNSW_EF_CONSTRUCT: int = int(os.getenv("LOCAL_VECTOR_HNSW_EF_CONSTRUCT", "100"))
+    LOCAL_VECTOR_HNSW_EF_SEARCH: int = int(os.getenv("LOCAL_VECTOR_HNSW_EF_SEARCH", "64"))
+
     # Qdrant Vector DB
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT: int = int(os.getenv("QDRANT_PORT", "6333"))
     QDRANT_COLLECTION_NAME: str = "test_cases"
     QDRANT_VECTOR_SIZE: int = 1536  # OpenAI ada-002 default
+    QDRANT_UPSERT_BATCH_SIZE: int = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+    # Connected on first use (warmed up in the background at API startup); after a
+    # failure, calls fail fast and RAG search returns nothing until the retry time
+    QDRANT_TIMEOUT_SECONDS: int = int(os.getenv("QDRANT_TIMEOUT_SECONDS", "5"))
+    QDRANT_RETRY_SECONDS: int = int(os.getenv("QDRANT_RETRY_SECONDS", "30"))
+    # "shared": one collection filtered by project_id payload index;
+    # "organization": a collection per organization (<name>_<organization id hex>)
+    QDRANT_TENANT_MODE: str = os.getenv("QDRANT_TENANT_MODE", "shared")
+    # Storage of new collections (existing ones keep theirs until rebuilt with
+    # migrate_vector_collection.py). Quantization: "none", "scalar" (int8, ~4x
+    # less RAM) or "product" (QDRANT_PRODUCT_COMPRESSION, up to x64); quantized
+    # vectors stay in RAM while the originals can live on disk for rescoring
+    QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "none")
+    QDRANT_SCALAR_QUANTILE: float = float(os.getenv("QDRANT_SCALAR_QUANTILE", "0.99"))
+    QDRANT_PRODUCT_COMPRESSION: str = os.getenv("QDRANT_PRODUCT_COMPRESSION", "x16")
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    QDRANT_VECTORS_ON_DISK: bool = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+    QDRANT_HNSW_M: int = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT: int = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    QDRANT_HNSW_ON_DISK: bool = os.getenv("QDRANT_HNSW_ON_DISK", "false").lower() == "true"
+    # Search: HNSW beam width (0 = server default); quantized searches fetch
+    # limit x oversampling candidates and rescore them with the original vectors
+    QDRANT_HNSW_EF_SEARCH: int = int(os.getenv("QDRANT_HNSW_EF_SEARCH", "0"))
+    QDRANT_QUANTIZATION_RESCORE: bool = os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() == "true"
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0"))
     
     # Jira
     JIRA_OAUTH_CLIENT_ID: str = os.getenv("JIRA_OAUTH_CLIENT_ID", "")
     JIRA_OAUTH_CLIENT_SECRET: str = os.getenv("JIRA_OAUTH_CLIENT_SECRET", "")
     JIRA_OAUTH_REDIRECT_URI: str = "http://localhost:8000/api/v1/jira/callback"
     JIRA_API_VERSION: str = "3"
+    # Shared HTTP client: pooled connections, retries with backoff (honours Retry-After on 429)
+    JIRA_HTTP2: bool = os.getenv("JIRA_HTTP2", "true").lower() == "true"
+    JIRA_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("JIRA_MAX_CONNECTIONS_PER_HOST", "10"))
+    JIRA_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("JIRA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    JIRA_HTTP_TIMEOUT: float = float(os.getenv("JIRA_HTTP_TIMEOUT", "30"))
+    JIRA_MAX_RETRIES: int = int(os.getenv("JIRA_MAX_RETRIES", "4"))
+    JIRA_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JIRA_RETRY_BACKOFF_SECONDS", "0.5"))
+    JIRA_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("JIRA_RETRY_MAX_DELAY_SECONDS", "60"))
+    # Project sync and epic imports: issues per search page; sync rows per upsert, pages buffered between fetch and write
+    JIRA_SYNC_PAGE_SIZE: int = int(os.getenv("JIRA_SYNC_PAGE_SIZE", "100"))
+    JIRA_SYNC_UPSERT_BATCH_SIZE: int = int(os.getenv("JIRA_SYNC_UPSERT_BATCH_SIZE", "200"))
+    JIRA_SYNC_QUEUE_PAGES: int = int(os.getenv("JIRA_SYNC_QUEUE_PAGES", "4"))
+    # Delta syncs re-read this many minutes before the stored `updated` watermark
+    JIRA_SYNC_WATERMARK_OVERLAP_MINUTES: int = int(os.getenv("JIRA_SYNC_WATERMARK_OVERLAP_MINUTES", "5"))
+    # Custom fields whose names contain one of these are fetched to build story descriptions
+    JIRA_DESCRIPTION_FIELD_KEYWORDS: str = os.getenv(
+        "JIRA_DESCRIPTION_FIELD_KEYWORDS",
+        "acceptance,criteria,user story,story details,definition of done,requirement,scenario,description",
+    )
+    # Schema types of those fields: text (string), select lists (option) and
+    # multi-selects/checkboxes (array of string or option values)
+    JIRA_DESCRIPTION_FIELD_TYPES: str = os.getenv("JIRA_DESCRIPTION_FIELD_TYPES", "string,option,array")
+    JIRA_FIELD_CACHE_TTL_SECONDS: int = int(os.getenv("JIRA_FIELD_CACHE_TTL_SECONDS", "3600"))
+    # Access tokens are refreshed this long before they expire, by one worker at a time
+    JIRA_TOKEN_REFRESH_MARGIN_SECONDS: int = int(os.getenv("JIRA_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+    JIRA_TOKEN_REFRESH_LOCK_SECONDS: int = int(os.getenv("JIRA_TOKEN_REFRESH_LOCK_SECONDS", "30"))
+    JIRA_TOKEN_CACHE_USE_REDIS: bool = os.getenv("JIRA_TOKEN_CACHE_USE_REDIS", "true").lower() == "true"
+    # How long the epic child lookup that worked for a project is reused
+    JIRA_EPIC_STRATEGY_CACHE_TTL_SECONDS: int = int(os.getenv("JIRA_EPIC_STRATEGY_CACHE_TTL_SECONDS", "86400"))
+    # Webhooks: shared secret for X-Hub-Signature (receiver disabled when empty),
+    # per-issue coalescing window and how long delivery ids are remembered
+    JIRA_WEBHOOK_SECRET: str = os.getenv("JIRA_WEBHOOK_SECRET", "")
+    JIRA_WEBHOOK_COALESCE_SECONDS: float = float(os.getenv("JIRA_WEBHOOK_COALESCE_SECONDS", "2"))
+    JIRA_WEBHOOK_DEDUPE_TTL_SECONDS: int = int(os.getenv("JIRA_WEBHOOK_DEDUPE_TTL_SECONDS", "86400"))
     
     # System LLM Keys (Optional fallback)
     SYSTEM_OPENAI_API_KEY: str = os.getenv("SYSTEM_OPENAI_API_KEY", "")
@@ -70,15 +147,36 @@ class Settings(BaseSettings):
     # LiteLLM Settings
     LITELLM_CACHE_ENABLED: bool = True
     LITELLM_CACHE_TTL: int = 3600  # 1 hour
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))  # in-memory LRU tier
+    LLM_CACHE_USE_REDIS: bool = os.getenv("LLM_CACHE_USE_REDIS", "true").lower() == "true"
     LITELLM_MAX_RETRIES: int = 3
     LITELLM_TIMEOUT: int = 60  # seconds
+    LLM_MAX_CONCURRENT_REQUESTS: int = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "200"))  # per provider
     
     # AI Generation Defaults
     DEFAULT_AI_PROVIDER: str = "openai"
     DEFAULT_AI_MODEL: str = "gpt-4-turbo"
     DEFAULT_TEMPERATURE: float = 0.7
     DEFAULT_MAX_TOKENS: int = 2000
-    
+
+    # Bulk generation concurrency
+    AI_GENERATION_MAX_CONCURRENCY: int = int(os.getenv("AI_GENERATION_MAX_CONCURRENCY", "4"))
+    # Per provider/model overrides, e.g. "openai=8,anthropic/claude-3-opus-20240229=2"
+    AI_GENERATION_CONCURRENCY_LIMITS: str = os.getenv("AI_GENERATION_CONCURRENCY_LIMITS", "")
+    AI_BULK_GENERATION_FLUSH_SIZE: int = int(os.getenv("AI_BULK_GENERATION_FLUSH_SIZE", "10"))
+
+    def get_generation_concurrency(self, provider: str, model: str = None) -> int:
+        """Resolve the generation concurrency limit for a provider/model pair"""
+        limits = {}
+        for item in self.AI_GENERATION_CONCURRENCY_LIMITS.split(','):
+            if '=' not in item:
+                continue
+            key, value = item.split('=', 1)
+            limits[key.strip()] = int(value.strip())
+        if model and f"{provider}/{model}" in limits:
+            return max(1, limits[f"{provider}/{model}"])
+        return max(1, limits.get(provider, self.AI_GENERATION_MAX_CONCURRENCY))
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
     
@@ -93,6 +191,12 @@ class Settings(BaseSettings):
     KNOWLEDGE_EMBEDDING_MODEL: str = os.getenv(
         "KNOWLEDGE_EMBEDDING_MODEL", "text-embedding-ada-002"
     )
+    # Embedding requests are batched up to this many inputs / estimated tokens
+    KNOWLEDGE_PROCESSING_CHUNK_SIZE: int = int(os.getenv("KNOWLEDGE_PROCESSING_CHUNK_SIZE", "500"))
+    KNOWLEDGE_EMBEDDING_BATCH_SIZE: int = int(os.getenv("KNOWLEDGE_EMBEDDING_BATCH_SIZE", "256"))
+    KNOWLEDGE_EMBEDDING_MAX_BATCH_TOKENS: int = int(
+        os.getenv("KNOWLEDGE_EMBEDDING_MAX_BATCH_TOKENS", "100000")
+    )
     
     class Config:
         env_file = ".env"
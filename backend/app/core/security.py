@@ -1,8 +1,16 @@
 """
-Security Utilities - Password hashing and verification
+Security Utilities - Password hashing and verification, secret encryption
 """
+import base64
+import hashlib
+from functools import lru_cache
+from typing import Optional, Union
+
+from cryptography.fernet import Fernet, InvalidToken
 from passlib.context import CryptContext
 
+from app.core.config import settings
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -53,3 +61,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     truncated = _truncate_password(plain_password).decode('utf-8', errors='ignore')
     return pwd_context.verify(truncated, hashed_password)
 
+
+@lru_cache(maxsize=1)
+def _secret_cipher() -> Fernet:
+    # Derived from SECRET_KEY, so every process can read what another wrote
+    key = hashlib.sha256(settings.SECRET_KEY.encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def encrypt_secret(value: str) -> str:
+    """
+    Encrypt a secret (e.g. an OAuth token) for storage outside the database
+    
+    Args:
+        value: Plain text secret
+        
+    Returns:
+        Fernet token keyed from SECRET_KEY
+    """
+    return _secret_cipher().encrypt(value.encode("utf-8")).decode("ascii")
+
+
+def decrypt_secret(token: Union[str, bytes]) -> Optional[str]:
+    """
+    Decrypt a secret written by encrypt_secret
+    
+    Args:
+        token: Fernet token, as text or as read from Redis
+        
+    Returns:
+        The plain text, or None if the token is invalid or SECRET_KEY changed
+    """
+    if isinstance(token, str):
+        token = token.encode("utf-8")
+    try:
+        return _secret_cipher().decrypt(token).decode("utf-8")
+    except InvalidToken:
+        return None
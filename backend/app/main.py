@@ -4,10 +4,17 @@ FastAPI Application Entry Point
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 
 from app.core.config import settings
-from app.api.v1 import auth, jira, test_cases, ai, analytics, projects, features, knowledge
+from app.services.llm_cache import completion_cache
+from app.services.jira_client import jira_http
+from app.services.jira_tokens import jira_tokens
+from app.services.knowledge_base.vector_service import vector_indexer
+from app.services.jira_webhooks import jira_webhooks
+from app.services.task_queue import task_queue
+from app.api.v1 import auth, jira, test_cases, ai, analytics, projects, features, knowledge, generation_jobs
 
 # Configure logging
 logging.basicConfig(
@@ -40,6 +47,7 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["Projects"])
 app.include_router(features.router, prefix="/api/v1", tags=["Features"])
 app.include_router(test_cases.router, prefix="/api/v1", tags=["Test Cases"])
+app.include_router(generation_jobs.router, prefix="/api/v1", tags=["Generation Jobs"])
 app.include_router(jira.router, prefix="/api/v1/jira", tags=["Jira Integration"])
 app.include_router(ai.router, prefix="/api/v1/ai", tags=["AI Generation"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
@@ -60,10 +68,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    vector_store = vector_indexer.health()
     return {
-        "status": "healthy",
+        # The API serves everything but RAG without the vector store
+        "status": "degraded" if vector_store["status"] == "unavailable" else "healthy",
         "service": "testgen-api",
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "vector_store": vector_store,
     }
 
 
@@ -72,18 +83,28 @@ async def startup_event():
     """Initialize services on startup"""
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
+    await jira_http.start()
+    # Local backend: stamp this process's jobs and recover those of processes that died
+    task_queue.start()
+    # In the background: a slow or unreachable Qdrant must not hold up startup
+    app.state.vector_warm_up = asyncio.create_task(vector_indexer.warm_up())
     # TODO: Initialize database connection pool
     # TODO: Initialize Redis connection
-    # TODO: Initialize Qdrant client
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down application...")
+    app.state.vector_warm_up.cancel()
+    await task_queue.close()
+    await jira_webhooks.flush()
+    await completion_cache.close()
+    await jira_http.close()
+    await jira_tokens.close()
+    await vector_indexer.close()
     # TODO: Close database connections
     # TODO: Close Redis connection
-    # TODO: Close Qdrant connection
 
 
 if __name__ == "__main__":
@@ -12,7 +12,10 @@ from app.models.knowledge import (
     KnowledgeEntry,
     KnowledgeBatchStatus,
     KnowledgeEntryStatus,
+    EmbeddingCacheEntry,
 )
+from app.models.generation_job import GenerationJob, GenerationJobStatus, GenerationJobKind
+from app.models.jira_sync import JiraSyncState
 
 __all__ = [
     "Organization", 
@@ -31,4 +34,9 @@ __all__ = [
     "KnowledgeEntry",
     "KnowledgeBatchStatus",
     "KnowledgeEntryStatus",
+    "EmbeddingCacheEntry",
+    "GenerationJob",
+    "GenerationJobStatus",
+    "GenerationJobKind",
+    "JiraSyncState",
 ]
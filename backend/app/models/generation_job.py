@@ -0,0 +1,69 @@
+"""
+Generation Job Model (asynchronous AI test case generation)
+"""
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, Boolean, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+import enum
+
+from app.core.database import Base
+
+
+class GenerationJobStatus(str, enum.Enum):
+    """Lifecycle status for a generation job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class GenerationJobKind(str, enum.Enum):
+    """What a generation job targets"""
+    STORY = "story"
+    EPIC = "epic"
+
+
+class GenerationJob(Base):
+    """Queued test case generation for a story or for all children of an epic"""
+    
+    __tablename__ = "generation_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_story_id = Column(UUID(as_uuid=True), ForeignKey("user_stories.id", ondelete="CASCADE"), nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    
+    kind = Column(String(20), default=GenerationJobKind.STORY.value, nullable=False)
+    status = Column(String(20), default=GenerationJobStatus.QUEUED.value, nullable=False, index=True)
+    provider = Column(String(50), nullable=True)
+    model = Column(String(100), nullable=True)
+    
+    # Progress: per-story reports in the same shape as the bulk generation report
+    total_stories = Column(Integer, default=0, nullable=False)
+    completed_stories = Column(Integer, default=0, nullable=False)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Stamped while queued or running on the local task queue (see task_queue.LocalTaskQueue)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (
+            GenerationJobStatus.COMPLETED.value,
+            GenerationJobStatus.FAILED.value,
+            GenerationJobStatus.CANCELLED.value,
+        )
+    
+    def __repr__(self):
+        return f"<GenerationJob {self.id} {self.kind} status={self.status}>"
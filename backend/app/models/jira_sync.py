@@ -0,0 +1,28 @@
+"""
+Jira Sync State Model (per-project incremental sync watermark)
+"""
+from sqlalchemy import Column, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class JiraSyncState(Base):
+    """High-water mark of Jira `updated` timestamps seen by a project's last sync"""
+
+    __tablename__ = "jira_sync_states"
+
+    project_id = Column(
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Latest `updated` value (UTC) among synced issues; the next sync asks only for newer ones
+    updated_watermark = Column(DateTime(timezone=True), nullable=True)
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<JiraSyncState {self.project_id} watermark={self.updated_watermark}>"
@@ -11,6 +11,7 @@ from sqlalchemy import (
     BigInteger,
     JSON,
     Index,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -70,6 +71,8 @@ class KnowledgeBatch(Base):
     checksum = Column(String(256), nullable=True)
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Stamped while queued or processing on the local task queue (see task_queue.LocalTaskQueue)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -139,3 +142,23 @@ class KnowledgeEntry(Base):
 
     def __repr__(self) -> str:  # pragma: no cover - repr helper
         return f"<KnowledgeEntry {self.id} jira={self.jira_key}>"
+
+
+class EmbeddingCacheEntry(Base):
+    """Content-addressed embedding vector, reused across uploads of unchanged rows"""
+
+    __tablename__ = "embedding_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    embedding_model = Column(String(128), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    vector = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("embedding_model", "content_hash", name="uq_embedding_cache_model_hash"),
+    )
+
+    def __repr__(self) -> str:  # pragma: no cover - repr helper
+        return f"<EmbeddingCacheEntry {self.embedding_model}:{self.content_hash[:12]}>"
@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+import uuid
+
+
+class GenerationJobResponse(BaseModel):
+    id: uuid.UUID
+    project_id: uuid.UUID
+    user_story_id: uuid.UUID
+    created_by: Optional[uuid.UUID] = None
+    kind: str
+    status: str
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    total_stories: int
+    completed_stories: int
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StoryProgress(BaseModel):
+    id: uuid.UUID
+    jira_key: Optional[str] = None
+    name: str
+    status: str
+    test_cases_created: Optional[int] = None
+    reason: Optional[str] = None
+
+
+class GenerationJobProgressResponse(BaseModel):
+    """Per-story progress for a generation job"""
+    job_id: uuid.UUID
+    status: str
+    total_stories: int
+    completed_stories: int
+    stories: List[StoryProgress] = []
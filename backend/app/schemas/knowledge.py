@@ -26,6 +26,8 @@ class KnowledgeBatchResponse(BaseModel):
     error_count: int
     error_details: Optional[Dict[str, Any]]
     column_mapping: Optional[Dict[str, Optional[str]]]
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
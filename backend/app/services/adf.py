@@ -0,0 +1,390 @@
+"""Atlassian Document Format (ADF) rendering to plain text or Markdown."""
+from __future__ import annotations
+
+import io
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Stack operations
+_NODE = 0        # render an ADF node
+_WRITE = 1       # write literal text
+_END_BLOCK = 2   # finish the current block (newline, blank line in Markdown)
+
+# Leaf nodes whose content is not text (attachments, template hints)
+_SKIPPED_NODES = {"media", "mediaInline", "placeholder", "extension", "inlineExtension"}
+# Containers rendered as a block: their children followed by a block break
+_BLOCK_CONTAINERS = {
+    "mediaSingle",
+    "mediaGroup",
+    "bodiedExtension",
+    "multiBodiedExtension",
+    "extensionFrame",
+    "layoutSection",
+    "layoutColumn",
+}
+_LIST_TYPES = {"bulletList", "orderedList", "taskList", "decisionList"}
+_LIST_MARKERS = {"bulletList": "- ", "taskList": "- ", "decisionList": "- "}
+_MARK_WRAPPERS = {"strong": "**", "em": "*", "strike": "~~", "code": "`"}
+
+
+class _Context(NamedTuple):
+    prefix: str = ""        # written at the start of every line (list indent, "> ")
+    tight: bool = False     # no blank lines between blocks (list items, table rows)
+    in_cell: bool = False   # inside a table cell: everything stays on one line
+
+
+Stack = List[Tuple[int, Any, _Context]]
+
+
+class AdfRenderer:
+    """
+    Renders ADF in one pass over an explicit stack, writing into a single
+    buffer. Depth is limited only by memory, not the recursion limit. Every
+    ADF node type is handled; unknown nodes render their text and children
+    so new node types degrade gracefully instead of disappearing.
+
+    Runs of inline nodes (the bulk of any description) are joined and written
+    directly; only block structure goes through the stack. An instance renders
+    one document at a time.
+    """
+
+    def __init__(self, markdown: bool = False) -> None:
+        self.markdown = markdown
+        self._handlers: Dict[str, Callable[[Dict[str, Any], _Context, Stack], None]] = {
+            "paragraph": self._paragraph,
+            "caption": self._paragraph,
+            "heading": self._heading,
+            "codeBlock": self._code_block,
+            "blockquote": self._quote,
+            "panel": self._quote,
+            "rule": self._rule,
+            "expand": self._expand_section,
+            "nestedExpand": self._expand_section,
+            "table": self._table,
+            "blockCard": self._block_card,
+            "embedCard": self._block_card,
+            # Reached only outside their parent; keep the text without markers
+            "listItem": self._paragraph,
+            "taskItem": self._paragraph,
+            "decisionItem": self._paragraph,
+            "tableRow": self._paragraph,
+            "tableCell": self._paragraph,
+            "tableHeader": self._paragraph,
+        }
+        for list_type in _LIST_TYPES:
+            self._handlers[list_type] = self._list
+        for container in _BLOCK_CONTAINERS:
+            self._handlers[container] = self._container
+
+    def render(self, document: Any) -> Optional[str]:
+        if not isinstance(document, dict):
+            return None
+        self._out = io.StringIO()
+        self._at_line_start = True
+        self._need_blank = False
+        self._blank_prefix = ""
+        self._pending_space = False
+        self._written = False
+
+        stack: Stack = [(_NODE, document, _Context())]
+        handlers = self._handlers
+        while stack:
+            operation, value, context = stack.pop()
+            if operation == _NODE:
+                if not isinstance(value, dict):
+                    continue
+                handler = handlers.get(value.get("type"))
+                if handler is not None:
+                    handler(value, context, stack)
+                else:
+                    self._other(value, context, stack)
+            elif operation == _WRITE:
+                self._emit(value, context)
+            else:
+                self._end_block(context)
+
+        text = self._out.getvalue().strip()
+        return text or None
+
+    # Inline content
+
+    def _inline(self, node: Dict[str, Any]) -> Optional[str]:
+        """Text of an inline leaf node, or None when the node has structure"""
+        node_type = node.get("type")
+        if node_type == "text":
+            return self._marked_text(node) if self.markdown else node.get("text", "")
+        if node_type == "hardBreak":
+            return "\n"
+        if node_type in _SKIPPED_NODES:
+            return ""
+        attrs = node.get("attrs") or {}
+        if node_type == "mention":
+            return attrs.get("text") or f"@{attrs.get('id', '')}"
+        if node_type == "emoji":
+            return attrs.get("text") or attrs.get("shortName") or ""
+        if node_type == "status":
+            return f"[{attrs.get('text', '')}]"
+        if node_type == "date":
+            return self._format_date(attrs.get("timestamp"))
+        if node_type == "inlineCard":
+            url = self._card_url(attrs)
+            return f"<{url}>" if self.markdown and url else url
+        return None
+
+    def _inline_run(self, content: List[Any]) -> Optional[str]:
+        """Joined text of content made only of inline leaves, else None"""
+        parts = []
+        plain = not self.markdown
+        for child in content:
+            if not isinstance(child, dict):
+                continue
+            if plain and child.get("type") == "text":
+                parts.append(child.get("text", ""))
+                continue
+            piece = self._inline(child)
+            if piece is None:
+                return None
+            parts.append(piece)
+        return "".join(parts)
+
+    # Block handlers write their block directly or push work onto the stack.
+    # The stack is LIFO, so the last push runs first.
+
+    def _paragraph(self, node: Dict[str, Any], context: _Context, stack: Stack, lead: str = "") -> None:
+        content = node.get("content") or []
+        text = self._inline_run(content)
+        if text is not None:
+            self._emit(lead + text, context)
+            self._end_block(context)
+            return
+        stack.append((_END_BLOCK, None, context))
+        self._push_children(stack, content, context)
+        if lead:
+            stack.append((_WRITE, lead, context))
+
+    def _heading(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        level = (node.get("attrs") or {}).get("level") or 1
+        self._paragraph(node, context, stack, "#" * level + " " if self.markdown else "")
+
+    def _list(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        list_type = node.get("type")
+        items = node.get("content") or []
+        start = (node.get("attrs") or {}).get("order") or 1
+        item_contexts: Dict[int, _Context] = {}
+        stack.append((_END_BLOCK, None, context))
+        for index in range(len(items) - 1, -1, -1):
+            item = items[index]
+            if not isinstance(item, dict):
+                continue
+            if list_type == "orderedList":
+                marker = f"{start + index}. "
+            elif list_type == "taskList":
+                state = (item.get("attrs") or {}).get("state")
+                marker = "- [x] " if state == "DONE" else "- [ ] "
+            else:
+                marker = _LIST_MARKERS[list_type]
+            item_context = item_contexts.get(len(marker))
+            if item_context is None:
+                item_context = _Context(context.prefix + " " * len(marker), True, context.in_cell)
+                item_contexts[len(marker)] = item_context
+            if item.get("type") in _LIST_TYPES:
+                # taskLists nest lists directly, without an enclosing item
+                stack.append((_NODE, item, item_context))
+                continue
+            self._push_item(stack, marker, item.get("content") or [], context, item_context)
+        # A list nested in an item starts on its own line
+        stack.append((_END_BLOCK, None, context._replace(tight=True)))
+
+    def _push_item(self, stack: Stack, marker: str, body: List[Any], context: _Context, item_context: _Context) -> None:
+        # Task and decision items hold inline content and list items usually
+        # open with a paragraph; either way the marker and first line are one write
+        first = body[0] if body and isinstance(body[0], dict) else {}
+        if first.get("type") == "paragraph":
+            head = self._inline_run(first.get("content") or [])
+            rest = body[1:] if head is not None else body
+        else:
+            head = self._inline_run(body)
+            rest = [] if head is not None else body
+        stack.append((_END_BLOCK, None, item_context))
+        if rest:
+            self._push_children(stack, rest, item_context)
+            if head is not None:
+                stack.append((_END_BLOCK, None, item_context))
+        if head is None:
+            stack.append((_WRITE, marker, context))
+        elif "\n" in head:
+            # Continuation lines are indented under the marker
+            stack.append((_WRITE, head, item_context))
+            stack.append((_WRITE, marker, context))
+        else:
+            stack.append((_WRITE, marker + head, context))
+
+    def _code_block(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        # Marks never apply inside code
+        code = "".join(
+            child.get("text", "")
+            for child in node.get("content") or []
+            if isinstance(child, dict) and child.get("type") == "text"
+        )
+        if self.markdown:
+            language = (node.get("attrs") or {}).get("language") or ""
+            code = f"```{language}\n{code}\n```"
+        self._emit(code, context)
+        self._end_block(context)
+
+    def _quote(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        inner = context._replace(prefix=context.prefix + "> ") if self.markdown else context
+        stack.append((_END_BLOCK, None, context))
+        self._push_children(stack, node.get("content") or [], inner)
+
+    def _rule(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        if self.markdown:
+            self._emit("---", context)
+        self._end_block(context)
+
+    def _expand_section(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        stack.append((_END_BLOCK, None, context))
+        self._push_children(stack, node.get("content") or [], context)
+        title = (node.get("attrs") or {}).get("title")
+        if title:
+            stack.append((_END_BLOCK, None, context))
+            stack.append((_WRITE, f"**{title}**" if self.markdown else title, context))
+
+    def _table(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        rows = [row for row in node.get("content") or [] if isinstance(row, dict)]
+        row_context = context._replace(tight=True)
+        cell_context = row_context._replace(in_cell=True)
+        stack.append((_END_BLOCK, None, context))
+        for row_index in range(len(rows) - 1, -1, -1):
+            cells = [cell for cell in (rows[row_index].get("content") or []) if isinstance(cell, dict)]
+            if self.markdown and row_index == 0:
+                stack.append((_END_BLOCK, None, row_context))
+                stack.append((_WRITE, "|" + " --- |" * max(1, len(cells)), row_context))
+            stack.append((_END_BLOCK, None, row_context))
+            if self.markdown:
+                stack.append((_WRITE, " |", cell_context))
+            for cell_index in range(len(cells) - 1, -1, -1):
+                if cell_index:
+                    separator = " | "
+                else:
+                    separator = "| " if self.markdown else ""
+                content = cells[cell_index].get("content") or []
+                text = self._cell_text(content)
+                if text is not None:
+                    stack.append((_WRITE, separator + text, cell_context))
+                    continue
+                self._push_children(stack, content, cell_context)
+                if separator:
+                    stack.append((_WRITE, separator, cell_context))
+
+    def _cell_text(self, content: List[Any]) -> Optional[str]:
+        """Text of a cell holding only simple paragraphs, else None"""
+        texts = []
+        for child in content:
+            if not isinstance(child, dict) or child.get("type") != "paragraph":
+                return None
+            text = self._inline_run(child.get("content") or [])
+            if text is None:
+                return None
+            if text:
+                texts.append(text)
+        return " ".join(texts)
+
+    def _block_card(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        url = self._card_url(node.get("attrs") or {})
+        self._emit(f"<{url}>" if self.markdown and url else url, context)
+        self._end_block(context)
+
+    def _container(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        stack.append((_END_BLOCK, None, context))
+        self._push_children(stack, node.get("content") or [], context)
+
+    def _other(self, node: Dict[str, Any], context: _Context, stack: Stack) -> None:
+        # doc, inline leaves met outside a paragraph, and node types this
+        # renderer does not know about
+        text = self._inline(node)
+        if text is not None:
+            self._emit(text, context)
+            return
+        attrs = node.get("attrs") or {}
+        if isinstance(attrs.get("text"), str):
+            self._emit(attrs["text"], context)
+        self._push_children(stack, node.get("content") or [], context)
+
+    @staticmethod
+    def _push_children(stack: Stack, content: List[Any], context: _Context) -> None:
+        stack.extend([(_NODE, child, context) for child in reversed(content)])
+
+    # Output
+
+    def _emit(self, text: str, context: _Context) -> None:
+        if not text:
+            return
+        if context.in_cell:
+            text = text.replace("\n", " ")
+        elif "\n" in text:
+            for index, line in enumerate(text.split("\n")):
+                if index:
+                    self._out.write("\n")
+                    self._at_line_start = True
+                if line:
+                    self._emit(line, context)
+            return
+        out = self._out
+        if self._at_line_start:
+            if self._need_blank and self._written:
+                out.write(self._blank_prefix + "\n")
+            self._need_blank = False
+            out.write(context.prefix)
+        elif self._pending_space and text[0] != " ":
+            out.write(" ")
+        self._pending_space = False
+        out.write(text)
+        self._at_line_start = False
+        self._written = True
+
+    def _end_block(self, context: _Context) -> None:
+        if context.in_cell:
+            # Blocks inside a cell are separated by a space, written lazily
+            self._pending_space = not self._at_line_start
+            return
+        self._pending_space = False
+        if not self._at_line_start:
+            self._out.write("\n")
+            self._at_line_start = True
+        if self.markdown and not context.tight:
+            # The separating blank line belongs to the block that just ended
+            self._need_blank = True
+            self._blank_prefix = context.prefix.rstrip()
+
+    @staticmethod
+    def _marked_text(node: Dict[str, Any]) -> str:
+        text = node.get("text", "")
+        if not text:
+            return text
+        link = None
+        for mark in node.get("marks") or []:
+            mark_type = mark.get("type")
+            wrapper = _MARK_WRAPPERS.get(mark_type)
+            if wrapper:
+                text = f"{wrapper}{text}{wrapper}"
+            elif mark_type == "link":
+                link = (mark.get("attrs") or {}).get("href")
+        return f"[{text}]({link})" if link else text
+
+    @staticmethod
+    def _card_url(attrs: Dict[str, Any]) -> str:
+        return attrs.get("url") or ((attrs.get("data") or {}).get("url")) or ""
+
+    @staticmethod
+    def _format_date(timestamp: Any) -> str:
+        try:
+            moment = datetime.fromtimestamp(int(timestamp) / 1000, tz=timezone.utc)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return ""
+        return moment.date().isoformat()
+
+
+def render_adf(document: Any, markdown: bool = False) -> Optional[str]:
+    """Render an ADF document (or any ADF node) to plain text, or to Markdown"""
+    return AdfRenderer(markdown=markdown).render(document)
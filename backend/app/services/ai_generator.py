@@ -1,18 +1,42 @@
 """Service for AI-powered test case generation with RAG support."""
+import asyncio
 import json
 import logging
-from typing import List, Optional, Dict, Any
+import weakref
+from typing import AsyncIterator, List, Optional, Dict, Any, Sequence, Tuple
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 
+from app.core.config import settings
 from app.models import UserStory, TestCase, TestPriority, TestStatus
 from app.services.llm_orchestrator import llm_orchestrator
+from app.services.streaming_json import JSONObjectStreamParser
 from app.services.knowledge_base.vector_service import vector_indexer
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_MESSAGE = "You are a professional QA Engineer. Generate test cases in valid JSON format."
+
+# Generation semaphores shared across requests, keyed by event loop and (provider, model).
+# Worker processes run each job in a fresh loop, so semaphores must not outlive their loop.
+_generation_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_generation_semaphore(provider: str, model: Optional[str]) -> asyncio.Semaphore:
+    """Return the process-wide semaphore bounding concurrent generations for a provider/model"""
+    loop_semaphores = _generation_semaphores.setdefault(asyncio.get_running_loop(), {})
+    key = (provider, model or "")
+    semaphore = loop_semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.get_generation_concurrency(provider, model))
+        loop_semaphores[key] = semaphore
+    return semaphore
+
+
 class AIGeneratorService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -33,24 +57,32 @@ class AIGeneratorService:
         if not story:
             raise ValueError("User story not found")
 
-        # 2. Retrieve relevant historical test cases (RAG)
-        context_examples = []
-        if use_rag:
-            query = f"{story.name}\n{story.description}"
-            relevant = vector_indexer.search_relevant_entries(query, story.project_id, limit=3)
-            for hit in relevant:
-                payload = hit["payload"]
-                context_examples.append({
-                    "title": payload.get("title"),
-                    "description": payload.get("description"),
-                    "steps": payload.get("steps"),
-                    "expected_result": payload.get("expected_result")
-                })
+        # 2-4. Retrieve RAG context, build prompt and call the LLM
+        test_cases_data = await self.generate_test_case_data(
+            story, provider=provider, model=model, use_rag=use_rag
+        )
+
+        # 5. Persist test cases
+        created_cases = self.build_test_cases(story, user_id, test_cases_data)
+        self.db.add_all(created_cases)
+        await self.db.flush()
+        return created_cases
+
+    async def generate_test_case_data(
+        self,
+        story: UserStory,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        use_rag: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Run retrieval and the LLM call for an already loaded story.
+
+        Does not touch the database session, so it is safe to run for many
+        stories concurrently.
+        """
+        prompt = await self._build_story_prompt(story, use_rag)
 
-        # 3. Construct prompt
-        prompt = self._build_prompt(story, context_examples)
-        
-        # 4. Call LLM
         # In a real scenario, we'd fetch the user's API key. For now, we use system key via fallback.
         # TODO: Implement user API key retrieval
         llm_response = await llm_orchestrator.generate_completion(
@@ -58,47 +90,215 @@ class AIGeneratorService:
             user_api_key="", # Mock empty user key to trigger system fallback
             provider=provider,
             model=model,
-            system_message="You are a professional QA Engineer. Generate test cases in valid JSON format."
+            system_message=SYSTEM_MESSAGE
         )
 
         if not llm_response["success"]:
             logger.error(f"LLM generation failed: {llm_response.get('error')}")
             raise RuntimeError(f"AI Generation failed: {llm_response.get('error')}")
 
-        # 5. Parse and persist test cases
+        return self._parse_test_cases(llm_response["content"])
+
+    async def stream_test_cases_for_story(
+        self,
+        story: UserStory,
+        user_id: UUID,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        use_rag: bool = True
+    ) -> AsyncIterator[TestCase]:
+        """
+        Stream generated test cases for a story.
+
+        Tokens are parsed incrementally; each test case is persisted and
+        committed as soon as its JSON object closes, then yielded.
+        """
+        prompt = await self._build_story_prompt(story, use_rag)
+        parser = JSONObjectStreamParser()
+
+        async for delta in llm_orchestrator.stream_completion(
+            prompt=prompt,
+            user_api_key="",
+            provider=provider,
+            model=model,
+            system_message=SYSTEM_MESSAGE
+        ):
+            for case_data in parser.feed(delta):
+                test_case = self.build_test_cases(story, user_id, [case_data])[0]
+                self.db.add(test_case)
+                await self.db.commit()
+                yield test_case
+
+        if parser.has_partial_object:
+            logger.warning(f"Stream for story {story.jira_key} ended inside an unterminated test case")
+
+    def build_test_cases(
+        self,
+        story: UserStory,
+        user_id: UUID,
+        test_cases_data: List[Dict[str, Any]]
+    ) -> List[TestCase]:
+        """Map parsed LLM output onto TestCase rows (not yet added to the session)"""
+        return [
+            TestCase(
+                user_story_id=story.id,
+                created_by=user_id,
+                title=case_data.get("title", f"Test for {story.name}"),
+                description=case_data.get("description"),
+                steps=case_data.get("steps"),
+                expected_result=case_data.get("expected_result"),
+                priority=case_data.get("priority", TestPriority.MEDIUM.value),
+                test_type=case_data.get("test_type", "functional"),
+                status=TestStatus.DRAFT.value
+            )
+            for case_data in test_cases_data
+        ]
+
+    async def bulk_generate_for_stories(
+        self,
+        stories: Sequence[UserStory],
+        user_id: UUID,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        concurrent: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Generate test cases for many stories, skipping ones that already have cases.
+
+        LLM calls fan out concurrently, bounded by the shared provider/model
+        semaphore. Only this coroutine touches the session: finished stories are
+        persisted in batches of AI_BULK_GENERATION_FLUSH_SIZE, each inside its
+        own savepoint so a failing story cannot poison the rest of the batch.
+        """
+        results = {
+            "total_stories": len(stories),
+            "stories_processed": 0,
+            "test_cases_generated": 0,
+            "stories": []
+        }
+        if not stories:
+            return results
+
+        existing_counts = await self._count_existing_test_cases([story.id for story in stories])
+        reports: Dict[UUID, Dict[str, Any]] = {}
+        pending: List[UserStory] = []
+        for story in stories:
+            existing = existing_counts.get(story.id, 0)
+            if existing:
+                reports[story.id] = self.story_report(
+                    story, "skipped", reason=f"Already has {existing} test cases"
+                )
+            else:
+                pending.append(story)
+
+        semaphore = get_generation_semaphore(provider, model) if concurrent else asyncio.Semaphore(1)
+
+        async def _generate(story: UserStory):
+            async with semaphore:
+                try:
+                    data = await self.generate_test_case_data(story, provider=provider, model=model)
+                    return story, data, None
+                except Exception as e:
+                    return story, None, e
+
+        flush_size = max(1, settings.AI_BULK_GENERATION_FLUSH_SIZE)
+        ready: List[Tuple[UserStory, List[Dict[str, Any]]]] = []
+        tasks = [asyncio.create_task(_generate(story)) for story in pending]
         try:
-            raw_content = llm_response["content"]
+            for next_done in asyncio.as_completed(tasks):
+                story, data, error = await next_done
+                if error is not None:
+                    logger.error(f"Failed to generate for story {story.jira_key}: {str(error)}")
+                    reports[story.id] = self.story_report(story, "failed", reason=str(error))
+                    continue
+                ready.append((story, data))
+                if len(ready) >= flush_size:
+                    await self._persist_generated(ready, user_id, reports, results)
+                    ready = []
+            if ready:
+                await self._persist_generated(ready, user_id, reports, results)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # Keep the report in the original child order
+        results["stories"] = [reports[story.id] for story in stories]
+        return results
+
+    async def _persist_generated(
+        self,
+        ready: List[Tuple[UserStory, List[Dict[str, Any]]]],
+        user_id: UUID,
+        reports: Dict[UUID, Dict[str, Any]],
+        results: Dict[str, Any]
+    ) -> None:
+        for story, data in ready:
+            try:
+                async with self.db.begin_nested():
+                    created_cases = self.build_test_cases(story, user_id, data)
+                    self.db.add_all(created_cases)
+                    await self.db.flush()
+            except Exception as e:
+                logger.error(f"Failed to persist test cases for story {story.jira_key}: {str(e)}")
+                reports[story.id] = self.story_report(story, "failed", reason=str(e))
+                continue
+
+            results["stories_processed"] += 1
+            results["test_cases_generated"] += len(created_cases)
+            reports[story.id] = self.story_report(
+                story, "generated", test_cases_created=len(created_cases)
+            )
+
+    async def _count_existing_test_cases(self, story_ids: List[UUID]) -> Dict[UUID, int]:
+        result = await self.db.execute(
+            select(TestCase.user_story_id, func.count(TestCase.id))
+            .where(TestCase.user_story_id.in_(story_ids))
+            .group_by(TestCase.user_story_id)
+        )
+        return {story_id: count for story_id, count in result.all()}
+
+    @staticmethod
+    def story_report(story: UserStory, status: str, **extra: Any) -> Dict[str, Any]:
+        report = {
+            "id": str(story.id),
+            "jira_key": story.jira_key,
+            "name": story.name,
+            "status": status,
+        }
+        report.update(extra)
+        return report
+
+    async def _build_story_prompt(self, story: UserStory, use_rag: bool) -> str:
+        context_examples = []
+        if use_rag:
+            query = f"{story.name}\n{story.description}"
+            relevant = await vector_indexer.search_relevant_entries(query, story.project_id, limit=3)
+            for hit in relevant:
+                payload = hit["payload"]
+                context_examples.append({
+                    "title": payload.get("title"),
+                    "description": payload.get("description"),
+                    "steps": payload.get("steps"),
+                    "expected_result": payload.get("expected_result")
+                })
+        return self._build_prompt(story, context_examples)
+
+    def _parse_test_cases(self, raw_content: str) -> List[Dict[str, Any]]:
+        try:
+            content = raw_content
             # Clean possible markdown code blocks
-            if "```json" in raw_content:
-                raw_content = raw_content.split("```json")[1].split("```")[0].strip()
-            elif "```" in raw_content:
-                raw_content = raw_content.split("```")[1].split("```")[0].strip()
-                
-            test_cases_data = json.loads(raw_content)
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0].strip()
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0].strip()
+
+            test_cases_data = json.loads(content)
             if not isinstance(test_cases_data, list):
                 test_cases_data = [test_cases_data]
-            
-            created_cases = []
-            for case_data in test_cases_data:
-                test_case = TestCase(
-                    user_story_id=story.id,
-                    created_by=user_id,
-                    title=case_data.get("title", f"Test for {story.name}"),
-                    description=case_data.get("description"),
-                    steps=case_data.get("steps"),
-                    expected_result=case_data.get("expected_result"),
-                    priority=case_data.get("priority", TestPriority.MEDIUM.value),
-                    test_type=case_data.get("test_type", "functional"),
-                    status=TestStatus.DRAFT.value
-                )
-                self.db.add(test_case)
-                created_cases.append(test_case)
-            
-            await self.db.flush()
-            return created_cases
+            return test_cases_data
 
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response: {e}\nContent: {llm_response['content']}")
+            logger.error(f"Failed to parse LLM response: {e}\nContent: {raw_content}")
             raise RuntimeError("Failed to parse AI-generated test cases")
 
     def _build_prompt(self, story: UserStory, examples: List[Dict]) -> str:
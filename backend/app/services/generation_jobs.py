@@ -0,0 +1,257 @@
+"""Asynchronous generation jobs: persistence, execution and queue backends."""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import (
+    GenerationJob,
+    GenerationJobKind,
+    GenerationJobStatus,
+    User,
+    UserStory,
+)
+from app.services.ai_generator import AIGeneratorService
+from app.services.task_queue import register_heartbeat, register_sweep, register_task
+
+logger = logging.getLogger(__name__)
+
+RUN_GENERATION_JOB = "generation_jobs.run"
+INTERRUPTED_JOB_ERROR = "Interrupted: the API process running it stopped"
+ACTIVE_JOB_STATUSES = (GenerationJobStatus.QUEUED.value, GenerationJobStatus.RUNNING.value)
+
+
+class GenerationJobService:
+    """Creates, reads and cancels generation jobs"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(
+        self,
+        *,
+        story: UserStory,
+        user: User,
+        kind: GenerationJobKind,
+        provider: str = "openai",
+        model: Optional[str] = None,
+    ) -> GenerationJob:
+        job = GenerationJob(
+            project_id=story.project_id,
+            user_story_id=story.id,
+            created_by=user.id,
+            kind=kind.value,
+            status=GenerationJobStatus.QUEUED.value,
+            provider=provider,
+            model=model,
+            total_stories=0,
+            completed_stories=0,
+            cancel_requested=False,
+        )
+        self.db.add(job)
+        await self.db.flush()
+        return job
+
+    async def get_job(self, job_id: UUID) -> GenerationJob:
+        result = await self.db.execute(select(GenerationJob).where(GenerationJob.id == job_id))
+        job = result.scalar_one_or_none()
+        if not job:
+            raise ValueError("Generation job not found")
+        return job
+
+    async def request_cancel(self, job: GenerationJob) -> GenerationJob:
+        """
+        Request cancellation. Queued jobs are cancelled immediately; running jobs
+        stop before their next chunk of stories.
+        """
+        if job.is_finished:
+            return job
+        job.cancel_requested = True
+        if job.status == GenerationJobStatus.QUEUED.value:
+            job.status = GenerationJobStatus.CANCELLED.value
+            job.completed_at = datetime.now(timezone.utc)
+        await self.db.flush()
+        return job
+
+
+class GenerationJobRunner:
+    """Executes a single job in its own session; used by every queue backend"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.ai_service = AIGeneratorService(db)
+
+    async def run(self, job_id: UUID) -> None:
+        result = await self.db.execute(select(GenerationJob).where(GenerationJob.id == job_id))
+        job = result.scalar_one_or_none()
+        if not job:
+            logger.warning("Generation job %s not found", job_id)
+            return
+        if job.is_finished:
+            return
+        if job.cancel_requested:
+            await self._finish(job, GenerationJobStatus.CANCELLED)
+            return
+
+        job.status = GenerationJobStatus.RUNNING.value
+        job.started_at = datetime.now(timezone.utc)
+        await self.db.commit()
+
+        try:
+            stories = await self._load_stories(job)
+            job.total_stories = len(stories)
+            self._set_progress(job, {
+                story.id: AIGeneratorService.story_report(story, "pending") for story in stories
+            })
+            await self.db.commit()
+
+            if job.kind == GenerationJobKind.STORY.value:
+                await self._run_story(job, stories[0])
+            else:
+                await self._run_epic(job, stories)
+        except Exception as e:
+            logger.error(f"Generation job {job.id} failed: {str(e)}")
+            await self.db.rollback()
+            job.error = str(e)
+            await self._finish(job, GenerationJobStatus.FAILED)
+
+    async def _run_story(self, job: GenerationJob, story: UserStory) -> None:
+        created_cases = await self.ai_service.generate_test_cases_for_story(
+            story_id=story.id,
+            user_id=job.created_by,
+            provider=job.provider,
+            model=job.model,
+        )
+        await self.db.flush()
+        report = AIGeneratorService.story_report(
+            story, "generated", test_cases_created=len(created_cases)
+        )
+        self._update_progress(job, [report])
+        job.result = {"test_case_ids": [str(case.id) for case in created_cases]}
+        await self._finish(job, GenerationJobStatus.COMPLETED)
+
+    async def _run_epic(self, job: GenerationJob, stories: List[UserStory]) -> None:
+        results: Dict[str, Any] = {
+            "total_stories": len(stories),
+            "stories_processed": 0,
+            "test_cases_generated": 0,
+            "stories": []
+        }
+        chunk_size = max(1, settings.GENERATION_JOB_CHUNK_SIZE)
+        for start in range(0, len(stories), chunk_size):
+            if await self._cancel_requested(job):
+                job.result = results
+                await self._finish(job, GenerationJobStatus.CANCELLED)
+                return
+
+            chunk = stories[start:start + chunk_size]
+            self._update_progress(job, [AIGeneratorService.story_report(s, "running") for s in chunk])
+            await self.db.commit()
+
+            chunk_results = await self.ai_service.bulk_generate_for_stories(
+                chunk,
+                user_id=job.created_by,
+                provider=job.provider,
+                model=job.model,
+            )
+            results["stories_processed"] += chunk_results["stories_processed"]
+            results["test_cases_generated"] += chunk_results["test_cases_generated"]
+            results["stories"].extend(chunk_results["stories"])
+            self._update_progress(job, chunk_results["stories"])
+            job.result = dict(results)
+            await self.db.commit()
+
+        await self._finish(job, GenerationJobStatus.COMPLETED)
+
+    async def _load_stories(self, job: GenerationJob) -> List[UserStory]:
+        result = await self.db.execute(select(UserStory).where(UserStory.id == job.user_story_id))
+        story = result.scalar_one_or_none()
+        if not story:
+            raise ValueError("User story not found")
+        if job.kind == GenerationJobKind.STORY.value:
+            return [story]
+
+        result = await self.db.execute(select(UserStory).where(UserStory.epic_id == story.id))
+        children = result.scalars().all()
+        if not children:
+            raise ValueError("No child stories found for this Epic")
+        return list(children)
+
+    async def _cancel_requested(self, job: GenerationJob) -> bool:
+        result = await self.db.execute(
+            select(GenerationJob.cancel_requested).where(GenerationJob.id == job.id)
+        )
+        return bool(result.scalar_one())
+
+    async def _finish(self, job: GenerationJob, status: GenerationJobStatus) -> None:
+        job.status = status.value
+        job.completed_at = datetime.now(timezone.utc)
+        await self.db.commit()
+
+    @staticmethod
+    def _set_progress(job: GenerationJob, reports: Dict[UUID, Dict[str, Any]]) -> None:
+        job.progress = {"stories": list(reports.values())}
+
+    @staticmethod
+    def _update_progress(job: GenerationJob, reports: List[Dict[str, Any]]) -> None:
+        # JSON columns only detect reassignment, so always build a fresh dict
+        by_id = {report["id"]: report for report in reports}
+        stories = [by_id.get(item["id"], item) for item in (job.progress or {}).get("stories", [])]
+        job.progress = {"stories": stories}
+        job.completed_stories = sum(
+            1 for item in stories if item["status"] in ("generated", "skipped", "failed")
+        )
+
+
+@register_task(RUN_GENERATION_JOB)
+async def run_generation_job(job_id: str) -> None:
+    """Background task entry point, run by the local task queue or the Celery worker"""
+    async with AsyncSessionLocal() as db:
+        await GenerationJobRunner(db).run(UUID(job_id))
+
+
+@register_heartbeat(RUN_GENERATION_JOB)
+async def touch_generation_jobs(job_ids: List[str]) -> None:
+    """Stamp jobs this process is running on the local task queue"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id.in_([UUID(job_id) for job_id in job_ids]))
+            .where(GenerationJob.status.in_(ACTIVE_JOB_STATUSES))
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+
+
+@register_sweep
+async def fail_interrupted_jobs() -> int:
+    """
+    Mark queued or running jobs whose API process stopped as failed.
+
+    The local task queue runs jobs on the API event loop, so they stop with the
+    process and nothing would ever finish them. Every process stamps the jobs
+    it holds (touch_generation_jobs); only jobs nobody has stamped for
+    TASK_STALE_SECONDS are failed, so jobs of other live processes are left
+    alone. Jobs that were never stamped count from their last update.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.TASK_STALE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.status.in_(ACTIVE_JOB_STATUSES))
+            .where(func.coalesce(GenerationJob.heartbeat_at, GenerationJob.updated_at) < stale_before)
+            .values(
+                status=GenerationJobStatus.FAILED.value,
+                error=INTERRUPTED_JOB_ERROR,
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        await db.commit()
+        if result.rowcount:
+            logger.warning("Marked %d interrupted generation job(s) as failed", result.rowcount)
+        return result.rowcount
@@ -0,0 +1,197 @@
+"""Shared, pooled HTTP client for Atlassian APIs with retry and rate-limit backoff."""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import math
+import random
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+try:  # Optional: HTTP/2 needs the h2 package (httpx[http2])
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover - h2 not installed
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Retried for every method: the server did not process the request
+RETRY_ALWAYS_STATUSES = {429}
+# Retried only for idempotent methods
+RETRY_IDEMPOTENT_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class JiraHttpClient:
+    """
+    Long-lived httpx client shared by every Jira call.
+
+    Connections are pooled (HTTP/2 when available) and in-flight requests are
+    capped per host. Responses with 429 are retried after Jira's Retry-After
+    delay; transient 5xx and connection errors are retried with exponential
+    backoff. Clients are bound to the event loop that created them, so one is
+    kept per loop: the API process uses the one opened at startup, and each
+    Celery task (which runs in its own loop) gets a fresh one.
+    """
+
+    def __init__(
+        self,
+        *,
+        http2: bool,
+        max_connections_per_host: int,
+        max_keepalive_connections: int,
+        timeout: float,
+        max_retries: int,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+    ) -> None:
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 is not installed; Jira client falls back to HTTP/1.1")
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.max_keepalive_connections = max(0, max_keepalive_connections)
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled client for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    # All Jira traffic goes to two hosts; per-host caps are enforced below
+                    max_connections=self.max_connections_per_host * 2,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def start(self) -> None:
+        """Open the client for the current loop (called at application startup)"""
+        _ = self.client
+
+    async def close(self) -> None:
+        """Close the current loop's client and release its pooled connections"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # pragma: no cover - called outside a loop
+            return
+        client = self._clients.pop(loop, None)
+        self._host_semaphores.pop(loop, None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        loop_semaphores = self._host_semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = loop_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            loop_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request with retries. The final response is returned as-is
+        (including error statuses) so callers keep their status handling.
+        """
+        method = method.upper()
+        host = httpx.URL(url).host
+        attempt = 0
+        while True:
+            try:
+                async with self._host_slot(host):
+                    response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                # Nothing reached the server, so any method is safe to resend
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("Jira %s %s failed (%s); retrying in %.1fs", method, url, exc, delay)
+            except httpx.TransportError as exc:
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("Jira %s %s failed (%s); retrying in %.1fs", method, url, exc, delay)
+            else:
+                if not self._should_retry(method, response.status_code) or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                logger.warning(
+                    "Jira %s %s returned %d; retrying in %.1fs",
+                    method,
+                    url,
+                    response.status_code,
+                    delay,
+                )
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @staticmethod
+    def _should_retry(method: str, status_code: int) -> bool:
+        if status_code in RETRY_ALWAYS_STATUSES:
+            return True
+        return status_code in RETRY_IDEMPOTENT_STATUSES and method in IDEMPOTENT_METHODS
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self.backoff_seconds * (2 ** attempt)
+        return min(self.max_backoff_seconds, delay) * random.uniform(0.8, 1.2)
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Delay from a Retry-After header given as seconds or an HTTP date"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                # "-0000" parses as naive; HTTP dates are always UTC
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        if math.isnan(delay):
+            return None
+        return min(self.max_backoff_seconds, max(0.0, delay))
+
+
+jira_http = JiraHttpClient(
+    http2=settings.JIRA_HTTP2,
+    max_connections_per_host=settings.JIRA_MAX_CONNECTIONS_PER_HOST,
+    max_keepalive_connections=settings.JIRA_MAX_KEEPALIVE_CONNECTIONS,
+    timeout=settings.JIRA_HTTP_TIMEOUT,
+    max_retries=settings.JIRA_MAX_RETRIES,
+    backoff_seconds=settings.JIRA_RETRY_BACKOFF_SECONDS,
+    max_backoff_seconds=settings.JIRA_RETRY_MAX_DELAY_SECONDS,
+)
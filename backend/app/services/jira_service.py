@@ -1,14 +1,52 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import math
+import time
 import uuid
+from datetime import datetime, timezone
 import httpx
-from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.core.config import settings
 from app.models.feature import UserStory, JiraType
+from app.models.jira_sync import JiraSyncState
 from app.models.project import Project
 from app.models.user import User
+from app.services.adf import render_adf
+from app.services.jira_client import jira_http
+from app.services.jira_tokens import jira_tokens
+
+logger = logging.getLogger(__name__)
+
+# Project sync pages each issue type separately so the searches run concurrently
+SYNC_ISSUE_TYPES = ("Epic", "Story")
+SYNC_FIELDS = ["summary", "description", "issuetype", "status", "updated"]
+
+# Fields requested when importing issues, plus the site's description custom fields
+IMPORT_FIELDS = ["summary", "description", "issuetype", "status", "parent"]
+
+ISSUE_CREATED_EVENT = "jira:issue_created"
+ISSUE_UPDATED_EVENT = "jira:issue_updated"
+ISSUE_DELETED_EVENT = "jira:issue_deleted"
+# jira_status given to stories whose issue was deleted in Jira
+DELETED_IN_JIRA = "Deleted in Jira"
+
+# Ways of listing an epic's children: the Jira Software epic endpoint, then JQL
+# for team-managed (parent) and company-managed ("Epic Link") projects
+AGILE_EPIC_STRATEGY = "agile"
+EPIC_CHILD_STRATEGIES = {
+    AGILE_EPIC_STRATEGY: None,
+    "parent_quoted": 'parent = "{epic_key}"',
+    "parent": "parent = {epic_key}",
+    "epic_link_quoted": '"Epic Link" = "{epic_key}"',
+    "epic_link": '"Epic Link" = {epic_key}',
+}
+EXCLUDED_CHILD_TYPES = {"bug", "defect", "error", "fault"}
 
 class JiraService:
     def __init__(self):
@@ -16,6 +54,10 @@ class JiraService:
         self.token_url = "https://auth.atlassian.com/oauth/token"
         self.api_base = "https://api.atlassian.com/ex/jira"
         self.cloud_resource_url = "https://api.atlassian.com/oauth/token/accessible-resources"
+        # Description-related custom field ids per Jira site (cloud id) with their expiry
+        self._description_fields: Dict[str, Tuple[float, List[str]]] = {}
+        # Winning epic child strategy per (cloud id, project key) with its expiry
+        self._epic_child_strategies: Dict[Tuple[str, str], Tuple[float, str]] = {}
 
     def get_auth_url(self) -> str:
         """Generate OAuth 2.0 authorization URL"""
@@ -33,181 +75,294 @@ class JiraService:
 
     async def exchange_code_for_token(self, code: str) -> Dict[str, Any]:
         """Exchange auth code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.token_url,
-                json={
-                    "grant_type": "authorization_code",
-                    "client_id": settings.JIRA_OAUTH_CLIENT_ID,
-                    "client_secret": settings.JIRA_OAUTH_CLIENT_SECRET,
-                    "code": code,
-                    "redirect_uri": settings.JIRA_OAUTH_REDIRECT_URI,
-                },
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await jira_http.post(
+            self.token_url,
+            json={
+                "grant_type": "authorization_code",
+                "client_id": settings.JIRA_OAUTH_CLIENT_ID,
+                "client_secret": settings.JIRA_OAUTH_CLIENT_SECRET,
+                "code": code,
+                "redirect_uri": settings.JIRA_OAUTH_REDIRECT_URI,
+            },
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def get_accessible_resources(self, access_token: str) -> List[Dict[str, Any]]:
         """Get accessible Jira Cloud resources (sites)"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                self.cloud_resource_url,
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await jira_http.get(
+            self.cloud_resource_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh the Jira access token using the refresh token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.token_url,
-                json={
-                    "grant_type": "refresh_token",
-                    "client_id": settings.JIRA_OAUTH_CLIENT_ID,
-                    "client_secret": settings.JIRA_OAUTH_CLIENT_SECRET,
-                    "refresh_token": refresh_token,
-                },
-            )
-            if response.status_code != 200:
-                raise ValueError("Failed to refresh Jira token. Please reconnect.")
-            return response.json()
+        return await jira_tokens.request_refresh(refresh_token)
 
     async def _get_valid_token(self, user: User, db: AsyncSession) -> str:
-        """Get a valid access token, refreshing if expired"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        # Check if token is expired (with 5 min buffer)
-        if user.jira_token_expires_at:
-            # Handle timezone-aware and naive datetime comparison
-            now = datetime.utcnow()
-            expires_at = user.jira_token_expires_at
-            
-            # Remove timezone info if present for comparison
-            if hasattr(expires_at, 'tzinfo') and expires_at.tzinfo is not None:
-                expires_at = expires_at.replace(tzinfo=None)
-            
-            if now >= expires_at - timedelta(minutes=5):
-                logger.info(f"Token expired for user {user.id}, refreshing...")
-                
-                if not user.jira_refresh_token:
-                    raise ValueError("No refresh token available. Please reconnect Jira.")
-                
-                # Refresh the token
-                token_data = await self.refresh_access_token(user.jira_refresh_token)
-                
-                # Update user with new tokens
-                user.jira_access_token = token_data["access_token"]
-                if "refresh_token" in token_data:
-                    user.jira_refresh_token = token_data["refresh_token"]
-                user.jira_token_expires_at = datetime.utcnow() + timedelta(
-                    seconds=token_data.get("expires_in", 3600)
-                )
-                await db.commit()
-                await db.refresh(user)
-                logger.info(f"Token refreshed successfully for user {user.id}")
-        
-        return user.jira_access_token
+        """
+        Get a valid access token, refreshing if expired. Tokens come from the
+        shared token cache, which refreshes at most once per user at a time and
+        persists refreshed tokens in its own session.
+        """
+        return await jira_tokens.get_access_token(user)
+
+    async def _import_fields(
+        self, user: User, access_token: str, core_fields: List[str] = IMPORT_FIELDS
+    ) -> str:
+        """
+        Field projection for imported and synced issues: the core fields plus
+        the custom fields that carry story text on this site. Falls back to
+        every field when discovery is unavailable.
+        """
+        custom_fields = await self._discover_description_fields(user, access_token)
+        if custom_fields is None:
+            return "*all"
+        return ",".join(core_fields + custom_fields)
+
+    async def _discover_description_fields(self, user: User, access_token: str) -> Optional[List[str]]:
+        """
+        Ids of custom fields whose names suggest story content (acceptance
+        criteria, user story, ...) and whose schema type is one of
+        JIRA_DESCRIPTION_FIELD_TYPES, looked up once per site and cached for
+        JIRA_FIELD_CACHE_TTL_SECONDS. Returns None if the field list is unavailable.
+        """
+        cached = self._cached_description_fields(user.jira_cloud_id)
+        if cached is not None:
+            return cached
+
+        response = await jira_http.get(
+            f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/field",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        if response.status_code != 200:
+            logger.warning(f"Jira field discovery failed with status {response.status_code}; requesting all fields")
+            return None
+
+        keywords = [
+            keyword.strip().lower()
+            for keyword in settings.JIRA_DESCRIPTION_FIELD_KEYWORDS.split(",")
+            if keyword.strip()
+        ]
+        field_types = {
+            field_type.strip().lower()
+            for field_type in settings.JIRA_DESCRIPTION_FIELD_TYPES.split(",")
+            if field_type.strip()
+        }
+        field_ids = [
+            field["id"]
+            for field in response.json()
+            if field.get("custom")
+            and _renders_as_text(field.get("schema") or {}, field_types)
+            and any(keyword in (field.get("name") or "").lower() for keyword in keywords)
+        ]
+        logger.info(f"Discovered {len(field_ids)} description fields for Jira site {user.jira_cloud_id}")
+        self._description_fields[user.jira_cloud_id] = (
+            time.monotonic() + settings.JIRA_FIELD_CACHE_TTL_SECONDS,
+            field_ids,
+        )
+        return field_ids
+
+    def _cached_description_fields(self, cloud_id: Optional[str]) -> Optional[List[str]]:
+        cached = self._description_fields.get(cloud_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    async def _project_description_fields(self, project_id: uuid.UUID, db: AsyncSession) -> Optional[List[str]]:
+        """
+        Description custom fields of the Jira site a project imports from, for
+        events that carry no user (webhooks). Discovered with the token of a
+        Jira-connected member of the project's organization, preferring its
+        creator. None when there is none or discovery fails, matching the
+        "*all" fallback of imports.
+        """
+        result = await db.execute(
+            select(User)
+            .join(Project, Project.organization_id == User.organization_id)
+            .where(Project.id == project_id)
+            .where(User.jira_cloud_id.isnot(None))
+            .where(User.jira_access_token.isnot(None))
+            .order_by((User.id == Project.created_by).desc())
+            .limit(1)
+        )
+        user = result.scalar_one_or_none()
+        if user is None:
+            return None
+        cached = self._cached_description_fields(user.jira_cloud_id)
+        if cached is not None:
+            return cached
+        try:
+            access_token = await self._get_valid_token(user, db)
+            return await self._discover_description_fields(user, access_token)
+        except Exception as exc:
+            logger.warning(f"Jira field discovery for project {project_id} failed: {str(exc)}")
+            return None
 
     async def _fetch_issue(self, jira_key: str, user: User, db: AsyncSession) -> Dict[str, Any]:
         """Fetch a single issue from Jira by key"""
         access_token = await self._get_valid_token(user, db)
+        fields = await self._import_fields(user, access_token)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/issue/{jira_key}",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"expand": "names", "fields": "*all"}
-            )
-            
-            if response.status_code == 404:
-                raise ValueError(f"Issue {jira_key} not found in Jira")
-            if response.status_code == 401:
-                raise ValueError("Jira token expired. Please reconnect.")
-            
-            response.raise_for_status()
-            return response.json()
+        response = await jira_http.get(
+            f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/issue/{jira_key}",
+            headers={"Authorization": f"Bearer {access_token}"},
+            params={"fields": fields}
+        )
+        
+        if response.status_code == 404:
+            raise ValueError(f"Issue {jira_key} not found in Jira")
+        if response.status_code == 401:
+            raise ValueError("Jira token expired. Please reconnect.")
+        
+        response.raise_for_status()
+        return response.json()
 
     async def _fetch_epic_children(self, epic_key: str, user: User, db: AsyncSession) -> List[Dict[str, Any]]:
-        """Fetch all child issues belonging to an Epic using multiple methods."""
-        import logging
-        logger = logging.getLogger(__name__)
+        """
+        Fetch every child issue of an Epic. The ways of listing children
+        (EPIC_CHILD_STRATEGIES) are raced and the first to find any wins; the
+        winner is remembered per Jira site and project so later imports go
+        straight to it, and its results are read to the last page.
+        """
         logger.info(f"Fetching children for epic {epic_key}")
         
         access_token = await self._get_valid_token(user, db)
+        fields = await self._import_fields(user, access_token)
+        cache_key = (user.jira_cloud_id, epic_key.rsplit("-", 1)[0])
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Method 1: Try Jira's specific endpoint for Epic children (Jira Software API)
-            try:
-                # Try the agile/epic endpoint
-                response = await client.get(
-                    f"{self.api_base}/{user.jira_cloud_id}/rest/agile/1.0/epic/{epic_key}/issue",
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    params={"maxResults": 100}
-                )
-                logger.info(f"Agile epic endpoint status: {response.status_code}")
-                if response.status_code == 200:
-                    data = response.json()
-                    issues = data.get("issues", [])
-                    if issues:
-                        logger.info(f"Found {len(issues)} children via agile API")
-                        return issues
-            except Exception as e:
-                logger.warning(f"Agile epic endpoint failed: {e}")
-            
-            # Method 2: Try JQL search with different syntaxes using new API
-            jql_queries = [
-                f'parent = "{epic_key}"',       # Next-gen projects (quoted)
-                f'parent = {epic_key}',          # Next-gen projects (unquoted)  
-                f'"Epic Link" = "{epic_key}"',   # Classic projects (quoted)
-                f'"Epic Link" = {epic_key}',     # Classic projects (unquoted)
+        strategies = list(EPIC_CHILD_STRATEGIES)
+        found = None
+        cached = self._epic_child_strategies.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            strategy = cached[1]
+            found = await self._probe_epic_children(strategy, epic_key, user, access_token, fields)
+            # An empty result may mean the project changed type; race the others
+            strategies.remove(strategy)
+        if found is None:
+            raced = await self._race_epic_child_strategies(strategies, epic_key, user, access_token, fields)
+            if raced is None:
+                logger.info(f"No children found for epic {epic_key}")
+                return []
+            strategy, found = raced
+            self._epic_child_strategies[cache_key] = (
+                time.monotonic() + settings.JIRA_EPIC_STRATEGY_CACHE_TTL_SECONDS,
+                strategy,
+            )
+        
+        first_page, pages = found
+        issues = list(first_page)
+        async for page in pages:
+            issues.extend(page)
+        
+        if strategy != AGILE_EPIC_STRATEGY:
+            # JQL matches every child type; only keep stories, tasks, etc.
+            children = [
+                issue for issue in issues
+                if ((issue.get("fields") or {}).get("issuetype") or {}).get("name", "").lower()
+                not in EXCLUDED_CHILD_TYPES
             ]
-            
-            for jql in jql_queries:
-                try:
-                    logger.info(f"Trying JQL: {jql}")
-                    # Using new /search/jql endpoint (old /search is deprecated and returns 410)
-                    # Request all fields to ensure full description is included
-                    response = await client.get(
-                        f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/search/jql",
-                        params={"jql": jql, "maxResults": 100, "fields": "*all"},
-                        headers={"Authorization": f"Bearer {access_token}"},
-                    )
-                    
-                    logger.info(f"JQL response status: {response.status_code}")
-                    
-                    if response.status_code == 401:
-                        raise ValueError("Jira token expired. Please reconnect.")
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        issues = data.get("issues", [])
-                        
-                        # Filter out defects/bugs - only keep stories, tasks, etc.
-                        filtered_issues = []
-                        excluded_types = ['bug', 'defect', 'error', 'fault']
-                        for issue in issues:
-                            issue_type = issue.get("fields", {}).get("issuetype", {}).get("name", "").lower()
-                            if issue_type not in excluded_types:
-                                filtered_issues.append(issue)
-                            else:
-                                logger.info(f"Excluding {issue.get('key')} (type: {issue_type})")
-                        
-                        logger.info(f"Found {len(filtered_issues)} children (excluded {len(issues) - len(filtered_issues)} defects) with JQL: {jql}")
-                        if filtered_issues:
-                            return filtered_issues
-                    elif response.status_code == 400:
-                        logger.info(f"JQL syntax not valid: {jql}")
-                        continue
-                except Exception as e:
-                    logger.warning(f"Error for JQL {jql}: {e}")
-                    continue
-            
-            logger.info(f"No children found for epic {epic_key}")
-            return []
+            logger.info(f"Excluded {len(issues) - len(children)} defects from epic {epic_key}")
+            issues = children
+        logger.info(f"Found {len(issues)} children for epic {epic_key} via {strategy}")
+        return issues
+
+    async def _race_epic_child_strategies(
+        self,
+        strategies: List[str],
+        epic_key: str,
+        user: User,
+        access_token: str,
+        fields: str,
+    ) -> Optional[Tuple[str, Tuple[List[Dict[str, Any]], AsyncIterator[List[Dict[str, Any]]]]]]:
+        """Probe the strategies concurrently; the first to return issues wins and the rest are cancelled"""
+        tasks = {
+            asyncio.create_task(self._probe_epic_children(strategy, epic_key, user, access_token, fields)): strategy
+            for strategy in strategies
+        }
+        winner = None
+        try:
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Ties go to the earlier strategy
+                for task in sorted(done, key=lambda task: strategies.index(tasks[task])):
+                    if task.result() is not None:
+                        winner = task
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for task in tasks:
+                if task is not winner and not task.cancelled() and task.exception() is None and task.result():
+                    await task.result()[1].aclose()
+        if winner is None:
+            return None
+        return tasks[winner], winner.result()
 
+    async def _probe_epic_children(
+        self,
+        strategy: str,
+        epic_key: str,
+        user: User,
+        access_token: str,
+        fields: str,
+    ) -> Optional[Tuple[List[Dict[str, Any]], AsyncIterator[List[Dict[str, Any]]]]]:
+        """
+        Fetch a strategy's first page. Returns it with the iterator over the
+        remaining pages, or None when the strategy finds nothing or Jira
+        rejects it (e.g. JQL naming a field the project does not have).
+        """
+        pages = self._epic_child_pages(strategy, epic_key, user, access_token, fields)
+        try:
+            first_page = await pages.__anext__()
+        except StopAsyncIteration:
+            return None
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            logger.info(f"Epic child strategy {strategy} failed for {epic_key}: {e}")
+            await pages.aclose()
+            return None
+        if not first_page:
+            await pages.aclose()
+            return None
+        return first_page, pages
 
+    async def _epic_child_pages(
+        self,
+        strategy: str,
+        epic_key: str,
+        user: User,
+        access_token: str,
+        fields: str,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of an epic's children using one strategy"""
+        if strategy != AGILE_EPIC_STRATEGY:
+            jql = EPIC_CHILD_STRATEGIES[strategy].format(epic_key=epic_key)
+            async for issues in self.search_issue_pages(jql, user, access_token, fields.split(",")):
+                yield issues
+            return
+        
+        # Jira Software epic endpoint, paged by startAt
+        start_at = 0
+        while True:
+            response = await jira_http.get(
+                f"{self.api_base}/{user.jira_cloud_id}/rest/agile/1.0/epic/{epic_key}/issue",
+                headers={"Authorization": f"Bearer {access_token}"},
+                params={"startAt": start_at, "maxResults": settings.JIRA_SYNC_PAGE_SIZE, "fields": fields},
+            )
+            if response.status_code == 401:
+                raise ValueError("Jira token expired. Please reconnect.")
+            response.raise_for_status()
+            
+            data = response.json()
+            issues = data.get("issues", [])
+            yield issues
+            start_at += len(issues)
+            if not issues or start_at >= data.get("total", 0):
+                return
 
     def _extract_description(self, description_raw: Any) -> Optional[str]:
         """Extract plain text from Jira ADF (Atlassian Document Format) description"""
@@ -223,30 +378,17 @@ class JiraService:
         return str(description_raw) if description_raw else None
     
     def _extract_adf_text(self, node: dict) -> Optional[str]:
-        """Recursively extract text from ADF nodes"""
-        texts = []
-        
-        # Handle text nodes directly
-        if node.get("type") == "text":
-            return node.get("text", "")
-        
-        # Process content array
-        content = node.get("content", [])
-        for item in content:
-            if item.get("type") == "text":
-                texts.append(item.get("text", ""))
-            elif item.get("type") in ["paragraph", "heading", "bulletList", "orderedList", "listItem", "blockquote", "codeBlock", "panel", "table", "tableRow", "tableCell", "tableHeader"]:
-                # Recursively extract text from nested elements
-                nested_text = self._extract_adf_text(item)
-                if nested_text:
-                    texts.append(nested_text)
-            elif item.get("type") == "hardBreak":
-                texts.append("\n")
-        
-        return "\n".join(filter(None, texts)) if texts else None
+        """Extract text from an ADF document or node"""
+        return render_adf(node)
     
-    def _build_story_description(self, fields: Dict[str, Any]) -> Optional[str]:
-        """Build a complete description from Jira fields including custom fields"""
+    def _build_story_description(
+        self, fields: Dict[str, Any], custom_fields: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """
+        Build a complete description from Jira fields including custom fields.
+        ``custom_fields`` limits which custom fields are used, for payloads
+        that carry every field (webhooks) rather than the import projection.
+        """
         parts = []
         
         # Try standard description first
@@ -259,6 +401,8 @@ class JiraService:
         for key, value in fields.items():
             if not key.startswith("customfield_"):
                 continue
+            if custom_fields is not None and key not in custom_fields:
+                continue
             if value is None:
                 continue
                 
@@ -322,7 +466,7 @@ class JiraService:
         
         fields = issue["fields"]
         summary = fields.get("summary", "No Summary")
-        description = self._build_story_description(fields)  # Build from all fields
+        description = self._build_story_description(fields)  # Build from all requested fields
         issue_type = fields["issuetype"]["name"].lower()
         status = fields["status"]["name"]
         
@@ -348,38 +492,8 @@ class JiraService:
         # If Epic, fetch and import child stories
         if is_epic:
             children = await self._fetch_epic_children(jira_key, user, db)
-            
-            for child in children:
-                child_key = child["key"]
-                child_fields = child["fields"]
-                
-                # Check if child already exists
-                existing_child = await db.execute(
-                    select(UserStory).where(UserStory.jira_key == child_key)
-                )
-                if existing_child.scalar_one_or_none():
-                    continue
-                
-                # Build description from all available fields (description + custom fields)
-                import logging
-                logger = logging.getLogger(__name__)
-                
-                extracted_desc = self._build_story_description(child_fields)
-                logger.info(f"Child {child_key} built description: {extracted_desc[:200] if extracted_desc else 'None'}...")
-                
-                child_story = UserStory(
-                    project_id=project_id,
-                    epic_id=user_story.id,  # Link to parent Epic
-                    name=child_fields.get("summary", "No Summary"),
-                    description=extracted_desc,
-                    jira_key=child_key,
-                    jira_type=JiraType.STORY.value,
-                    jira_status=child_fields["status"]["name"],
-                    synced_at=datetime.utcnow()
-                )
-                db.add(child_story)
-                child_stories.append(child_key)
-                imported_count += 1
+            child_stories = await self._insert_epic_children(project_id, user_story.id, children, db)
+            imported_count += len(child_stories)
         
         await db.commit()
         
@@ -395,10 +509,152 @@ class JiraService:
             "imported_count": imported_count
         }
 
-    async def sync_project_features(self, project_id: uuid.UUID, db: AsyncSession, user: User) -> int:
+    async def _insert_epic_children(
+        self,
+        project_id: uuid.UUID,
+        epic_id: uuid.UUID,
+        children: List[Dict[str, Any]],
+        db: AsyncSession,
+    ) -> List[str]:
+        """
+        Insert an epic's children not yet imported: one query for existing
+        keys and one multi-row INSERT, whatever the number of children.
+        Returns the imported keys in Jira's order.
+        """
+        rows_by_key: Dict[str, Dict[str, Any]] = {}
+        synced_at = datetime.utcnow()
+        for child in children:
+            child_key = child["key"]
+            child_fields = child["fields"]
+            # Build description from all available fields (description + custom fields)
+            extracted_desc = self._build_story_description(child_fields)
+            logger.debug(f"Child {child_key} built description: {extracted_desc[:200] if extracted_desc else 'None'}...")
+            rows_by_key[child_key] = {
+                "id": uuid.uuid4(),
+                "project_id": project_id,
+                "epic_id": epic_id,  # Link to parent Epic
+                "name": child_fields.get("summary", "No Summary"),
+                "description": extracted_desc,
+                "jira_key": child_key,
+                "jira_type": JiraType.STORY.value,
+                "jira_status": child_fields["status"]["name"],
+                "synced_at": synced_at,
+            }
+        if not rows_by_key:
+            return []
+
+        existing = await db.execute(
+            select(UserStory.jira_key).where(UserStory.jira_key.in_(list(rows_by_key)))
+        )
+        for existing_key in existing.scalars().all():
+            rows_by_key.pop(existing_key, None)
+        if rows_by_key:
+            await db.execute(_insert_ignoring_existing_keys(db), list(rows_by_key.values()))
+        return list(rows_by_key)
+
+    async def apply_issue_event(
+        self, webhook_event: str, issue: Dict[str, Any], db: AsyncSession
+    ) -> Optional[UserStory]:
+        """
+        Apply one webhook issue event to its UserStory as a single-row upsert.
+        Issues not imported yet are created in the project whose Jira key
+        matches, when exactly one does. Deleted issues keep their story (and its
+        test cases) and are marked with the DELETED_IN_JIRA status. The caller
+        commits.
         """
-        Sync features from Jira using real API.
-        Requires user to have linked Jira account.
+        jira_key = issue["key"]
+        fields = issue.get("fields") or {}
+        result = await db.execute(select(UserStory).where(UserStory.jira_key == jira_key))
+        story = result.scalar_one_or_none()
+
+        if webhook_event == ISSUE_DELETED_EVENT:
+            if story:
+                story.jira_status = DELETED_IN_JIRA
+                story.synced_at = datetime.utcnow()
+            return story
+
+        if story is None:
+            project_key = (fields.get("project") or {}).get("key")
+            if not project_key:
+                return None
+            projects = await db.execute(
+                select(Project.id).where(Project.jira_project_key == project_key).limit(2)
+            )
+            project_ids = projects.scalars().all()
+            if len(project_ids) != 1:
+                logger.info(
+                    "Skipping webhook for %s: %d projects use Jira key %s",
+                    jira_key,
+                    len(project_ids),
+                    project_key,
+                )
+                return None
+            story = UserStory(project_id=project_ids[0], jira_key=jira_key)
+            db.add(story)
+
+        issue_type = ((fields.get("issuetype") or {}).get("name") or "").lower()
+        story.name = fields.get("summary") or story.name or "No Summary"
+        story.jira_type = (JiraType.EPIC if "epic" in issue_type else JiraType.STORY).value
+        story.jira_status = (fields.get("status") or {}).get("name") or story.jira_status
+        story.synced_at = datetime.utcnow()
+        # Webhooks carry every field; use the custom fields an import would request
+        custom_fields = await self._project_description_fields(story.project_id, db)
+        story.description = self._build_story_description(fields, custom_fields)
+
+        parent_key = (fields.get("parent") or {}).get("key")
+        if parent_key:
+            parent = await db.execute(
+                select(UserStory.id)
+                .where(UserStory.jira_key == parent_key)
+                .where(UserStory.project_id == story.project_id)
+                .where(UserStory.jira_type == JiraType.EPIC.value)
+            )
+            story.epic_id = parent.scalar_one_or_none() or story.epic_id
+        return story
+
+    async def search_issue_pages(
+        self,
+        jql: str,
+        user: User,
+        access_token: str,
+        fields: List[str],
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of issues from /search/jql, following nextPageToken to the last page"""
+        params: Dict[str, Any] = {
+            "jql": jql,
+            "maxResults": page_size or settings.JIRA_SYNC_PAGE_SIZE,
+            "fields": ",".join(fields),
+        }
+        while True:
+            response = await jira_http.get(
+                f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/search/jql",
+                params=params,
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            if response.status_code == 401:
+                raise ValueError("Jira token expired. Please reconnect.")
+            response.raise_for_status()
+
+            data = response.json()
+            yield data.get("issues", [])
+            next_token = data.get("nextPageToken")
+            if data.get("isLast") or not next_token:
+                return
+            params["nextPageToken"] = next_token
+
+    async def sync_project_features(
+        self, project_id: uuid.UUID, db: AsyncSession, user: User, full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Sync Epics and Stories from Jira into the project.
+
+        After the first run only issues updated since the project's stored
+        watermark are requested, and changed stories are updated in place, so
+        scheduled syncs cost a few API calls; ``full`` forces a complete scan.
+        Each issue type is paged through /search/jql concurrently, and pages are
+        handed to a single writer through a bounded queue, so fetching overlaps
+        with database writes and memory stays flat however large the project is.
         """
         if not user.jira_access_token or not user.jira_cloud_id:
             raise ValueError("User not connected to Jira")
@@ -409,55 +665,202 @@ class JiraService:
         if not project:
             raise ValueError("Project not found")
 
-        # Fetch issues from Jira
-        jql = f"project = {project.jira_project_key} AND issuetype in (Epic, Story)"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.api_base}/{user.jira_cloud_id}/rest/api/3/search",
-                params={"jql": jql, "maxResults": 100},
-                headers={"Authorization": f"Bearer {user.jira_access_token}"},
-            )
-            
-            if response.status_code == 401:
-                raise ValueError("Jira token expired. Please reconnect.")
-            
-            response.raise_for_status()
-            data = response.json()
+        sync_state = await db.get(JiraSyncState, project_id)
+        if sync_state is None:
+            sync_state = JiraSyncState(project_id=project_id)
+            db.add(sync_state)
+        watermark = None if full else _as_utc(sync_state.updated_watermark)
+        started_at = datetime.now(timezone.utc)
+
+        access_token = await self._get_valid_token(user, db)
+        # The same custom fields as imports, so syncs rebuild the same description
+        fields = (await self._import_fields(user, access_token, SYNC_FIELDS)).split(",")
+        report: Dict[str, Any] = {
+            "mode": "delta" if watermark else "full",
+            "pages": 0,
+            "issues": 0,
+            "upserts": 0,
+            "created": 0,
+            "updated": 0,
+        }
+        newest_update = watermark
+        pages: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.JIRA_SYNC_QUEUE_PAGES))
+        base_jql = f"project = {project.jira_project_key}"
+        if watermark:
+            base_jql += f" AND updated >= {self._updated_since_clause(watermark, started_at)}"
+
+        async def fetch(jql: str) -> None:
+            async for issues in self.search_issue_pages(jql, user, access_token, fields):
+                report["pages"] += 1
+                await pages.put(issues)
+
+        async def produce() -> None:
+            tasks = [
+                asyncio.create_task(fetch(f"{base_jql} AND issuetype = {issue_type}"))
+                for issue_type in SYNC_ISSUE_TYPES
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await pages.put(None)
 
-        issues = data.get("issues", [])
-        added_count = 0
+        async def write(batch: List[Dict[str, Any]]) -> None:
+            created, updated = await self._upsert_synced_issues(project_id, batch, db)
+            report["created"] += created
+            report["updated"] += updated
+            report["upserts"] += created + updated
 
-        # Get existing keys
-        existing_result = await db.execute(select(UserStory).where(UserStory.project_id == project_id))
-        existing_keys = {s.jira_key for s in existing_result.scalars().all()}
+        producer = asyncio.create_task(produce())
+        try:
+            pending: List[Dict[str, Any]] = []
+            batch_size = max(1, settings.JIRA_SYNC_UPSERT_BATCH_SIZE)
+            while (issues := await pages.get()) is not None:
+                report["issues"] += len(issues)
+                for issue in issues:
+                    issue_updated = _parse_jira_datetime(issue["fields"].get("updated"))
+                    if issue_updated and (newest_update is None or issue_updated > newest_update):
+                        newest_update = issue_updated
+                pending.extend(issues)
+                while len(pending) >= batch_size:
+                    await write(pending[:batch_size])
+                    pending = pending[batch_size:]
+            if pending:
+                await write(pending)
+            await producer  # surfaces fetch errors
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+        # Only advance the watermark once every page has been written
+        sync_state.updated_watermark = newest_update
+        sync_state.last_synced_at = started_at
+        if not watermark:
+            sync_state.last_full_sync_at = started_at
+        await db.commit()
+
+        report["watermark"] = newest_update.isoformat() if newest_update else None
+        logger.info("Jira sync for project %s: %s", project_id, report)
+        return report
+
+    @staticmethod
+    def _updated_since_clause(watermark: datetime, now: datetime) -> str:
+        """
+        Relative JQL duration reaching back past the watermark. Absolute JQL
+        dates are read in the Jira user's timezone, relative ones are not;
+        the overlap re-reads a few minutes, which upserts make harmless.
+        """
+        minutes = math.ceil(max(0.0, (now - watermark).total_seconds()) / 60)
+        return f"-{minutes + settings.JIRA_SYNC_WATERMARK_OVERLAP_MINUTES}m"
 
+    async def _upsert_synced_issues(
+        self, project_id: uuid.UUID, issues: List[Dict[str, Any]], db: AsyncSession
+    ) -> Tuple[int, int]:
+        """
+        Insert new issues in one multi-row statement and refresh the project's
+        existing stories in one executemany UPDATE, then commit. Returns
+        (created, updated) counts.
+        """
+        rows_by_key: Dict[str, Dict[str, Any]] = {}
+        synced_at = datetime.utcnow()
         for issue in issues:
-            key = issue["key"]
-            if key in existing_keys:
-                continue
-                
             fields = issue["fields"]
-            summary = fields.get("summary", "No Summary")
-            description = self._extract_description(fields.get("description"))
             issue_type = fields["issuetype"]["name"].lower()
             jira_type = JiraType.EPIC if "epic" in issue_type else JiraType.STORY
-            status = fields["status"]["name"]
-
-            new_story = UserStory(
-                project_id=project_id,
-                name=summary,
-                description=description,
-                jira_key=key,
-                jira_type=jira_type.value,
-                jira_status=status,
-                synced_at=datetime.utcnow()
+            rows_by_key[issue["key"]] = {
+                "id": uuid.uuid4(),
+                "project_id": project_id,
+                "name": fields.get("summary") or "No Summary",
+                "description": self._build_story_description(fields),
+                "jira_key": issue["key"],
+                "jira_type": jira_type.value,
+                "jira_status": fields["status"]["name"],
+                "synced_at": synced_at,
+            }
+
+        existing = await db.execute(
+            select(UserStory.jira_key, UserStory.project_id)
+            .where(UserStory.jira_key.in_(list(rows_by_key)))
+        )
+        changed: List[Dict[str, Any]] = []
+        for jira_key, story_project_id in existing.all():
+            row = rows_by_key.pop(jira_key)
+            # Keys are unique across projects; never touch another project's story
+            if story_project_id == project_id:
+                changed.append({
+                    "key": jira_key,
+                    "name": row["name"],
+                    "description": row["description"],
+                    "jira_status": row["jira_status"],
+                    "synced_at": synced_at,
+                })
+
+        if rows_by_key:
+            # A concurrent import may have added some keys since the lookup
+            await db.execute(_insert_ignoring_existing_keys(db), list(rows_by_key.values()))
+        if changed:
+            table = UserStory.__table__
+            await db.execute(
+                update(table)
+                .where(table.c.jira_key == bindparam("key"))
+                .values(
+                    name=bindparam("name"),
+                    description=bindparam("description"),
+                    jira_status=bindparam("jira_status"),
+                    synced_at=bindparam("synced_at"),
+                    updated_at=func.now(),
+                ),
+                changed,
             )
-            db.add(new_story)
-            added_count += 1
-                
         await db.commit()
-        return added_count
+        return len(rows_by_key), len(changed)
+
+
+def _renders_as_text(schema: Dict[str, Any], field_types: Set[str]) -> bool:
+    """
+    Whether a field of this schema is one _build_story_description can render.
+    Arrays qualify only when their items do (lists of users or sprints do not).
+    """
+    field_type = schema.get("type")
+    if field_type not in field_types:
+        return False
+    if field_type == "array":
+        return schema.get("items") in field_types - {"array"}
+    return True
+
+
+def _parse_jira_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a Jira timestamp such as 2024-05-01T10:15:30.000+0000 into aware UTC"""
+    if not value:
+        return None
+    try:
+        return _as_utc(datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z"))
+    except ValueError:
+        logger.warning("Unrecognised Jira timestamp %r", value)
+        return None
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Aware UTC. Naive values are read as UTC (SQLite drops the offset): the
+    database driver would otherwise take them for the host's local time.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _insert_ignoring_existing_keys(db: AsyncSession):
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return pg_insert(UserStory).on_conflict_do_nothing(index_elements=["jira_key"])
+    if dialect == "sqlite":
+        return sqlite_insert(UserStory).on_conflict_do_nothing(index_elements=["jira_key"])
+    return insert(UserStory)
+
 
 jira_service = JiraService()
 
@@ -0,0 +1,312 @@
+"""Jira OAuth access tokens: per-user cache with single-flight refresh."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import decrypt_secret, encrypt_secret
+from app.models.user import User
+from app.services.jira_client import jira_http
+
+try:  # Optional at runtime: tokens are then cached per process only
+    from redis import asyncio as redis_asyncio  # type: ignore
+except Exception:  # pragma: no cover - redis client not installed
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://auth.atlassian.com/oauth/token"
+# Deletes the refresh lock only if it still holds our value: after it expires
+# another worker may own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class JiraTokenManager:
+    """
+    Hands out valid Jira access tokens per user.
+
+    Tokens are cached in memory and, when configured, in Redis so every
+    worker sees a refresh as soon as it happens. A token close to expiry is
+    refreshed once per user: concurrent callers in a process wait on the same
+    refresh and, with Redis, a short lock lets one worker refresh while the
+    others wait for the new token to appear. Tokens are encrypted in Redis
+    (encrypt_secret). Atlassian rotates the refresh token on every refresh, so
+    refreshing twice would invalidate the first result. Refreshed tokens are
+    written to the User row in a separate session and copied onto the caller's
+    User without marking it dirty.
+    """
+
+    REDIS_RETRY_SECONDS = 30
+    LOCK_POLL_SECONDS = 0.2
+
+    def __init__(
+        self,
+        *,
+        refresh_margin_seconds: int,
+        lock_seconds: int,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "jira:token:",
+        session_factory: Callable = AsyncSessionLocal,
+    ) -> None:
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.lock_seconds = lock_seconds
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.session_factory = session_factory
+        # user id -> {"access_token", "refresh_token", "expires_at" (epoch seconds)}
+        self._memory: Dict[UUID, Dict[str, Any]] = {}
+        self._refreshes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[UUID, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self._counters = {"memory_hits": 0, "redis_hits": 0, "row_reads": 0, "refreshes": 0, "joined_refreshes": 0}
+
+    async def get_access_token(self, user: User) -> str:
+        """A valid access token for the user, refreshing it at most once at a time"""
+        entry = await self._cached(user.id)
+        row = self._from_user(user)
+        if entry is None or self._expires_later(row, entry):
+            # First use, or another process refreshed without a shared cache
+            entry = row
+            self._counters["row_reads"] += 1
+        if self._is_fresh(entry):
+            self._apply(user, entry)
+            return entry["access_token"]
+
+        loop_refreshes = self._refreshes.setdefault(asyncio.get_running_loop(), {})
+        task = loop_refreshes.get(user.id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(user.id, entry))
+            loop_refreshes[user.id] = task
+            task.add_done_callback(lambda _: loop_refreshes.pop(user.id, None))
+        else:
+            self._counters["joined_refreshes"] += 1
+        # A cancelled caller must not cancel the refresh other callers wait on
+        entry = await asyncio.shield(task)
+        self._apply(user, entry)
+        return entry["access_token"]
+
+    async def store(self, user_id: UUID, token_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache tokens from an OAuth response (initial connect or refresh)"""
+        entry = {
+            "access_token": token_data["access_token"],
+            "refresh_token": token_data.get("refresh_token"),
+            "expires_at": time.time() + token_data.get("expires_in", 3600),
+        }
+        self._memory[user_id] = entry
+        client = self._get_redis()
+        if client is not None:
+            ttl = max(1, int(entry["expires_at"] - time.time()))
+            try:
+                await client.set(self._key(user_id), encrypt_secret(json.dumps(entry)), ex=ttl)
+            except Exception as exc:  # pragma: no cover - network errors
+                self._redis_failed()
+                logger.warning("Jira token write to Redis failed: %s", exc)
+        return entry
+
+    async def invalidate(self, user_id: UUID) -> None:
+        self._memory.pop(user_id, None)
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.delete(self._key(user_id))
+        except Exception as exc:  # pragma: no cover - network errors
+            self._redis_failed()
+            logger.warning("Jira token delete from Redis failed: %s", exc)
+
+    async def request_refresh(self, refresh_token: str) -> Dict[str, Any]:
+        """Exchange a refresh token at Atlassian's token endpoint"""
+        response = await jira_http.post(
+            TOKEN_URL,
+            json={
+                "grant_type": "refresh_token",
+                "client_id": settings.JIRA_OAUTH_CLIENT_ID,
+                "client_secret": settings.JIRA_OAUTH_CLIENT_SECRET,
+                "refresh_token": refresh_token,
+            },
+        )
+        if response.status_code != 200:
+            raise ValueError("Failed to refresh Jira token. Please reconnect.")
+        return response.json()
+
+    async def _refresh(self, user_id: UUID, stale: Dict[str, Any]) -> Dict[str, Any]:
+        client = self._get_redis()
+        lock_key = self._key(user_id) + ":refresh"
+        lock_value = uuid.uuid4().hex
+        locked = False
+        if client is not None:
+            try:
+                locked = bool(await client.set(lock_key, lock_value, nx=True, ex=self.lock_seconds))
+            except Exception as exc:  # pragma: no cover - network errors
+                self._redis_failed()
+                logger.warning("Jira token lock in Redis failed: %s", exc)
+                client = None
+        if client is not None and not locked:
+            entry = await self._wait_for_other_refresh(user_id)
+            if entry is not None:
+                return entry
+            # The other worker gave up; the row holds its latest refresh token
+            stale = await self._load_row(user_id) or stale
+            if self._is_fresh(stale):
+                return stale
+        try:
+            return await self._refresh_now(user_id, stale)
+        finally:
+            if locked:
+                try:
+                    await client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_value)
+                except Exception:  # pragma: no cover - the lock expires anyway
+                    pass
+
+    async def _refresh_now(self, user_id: UUID, stale: Dict[str, Any]) -> Dict[str, Any]:
+        if not stale.get("refresh_token"):
+            raise ValueError("No refresh token available. Please reconnect Jira.")
+        logger.info(f"Token expired for user {user_id}, refreshing...")
+        token_data = await self.request_refresh(stale["refresh_token"])
+        if "refresh_token" not in token_data:
+            token_data = {**token_data, "refresh_token": stale["refresh_token"]}
+        self._counters["refreshes"] += 1
+
+        async with self.session_factory() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    jira_access_token=token_data["access_token"],
+                    jira_refresh_token=token_data["refresh_token"],
+                    jira_token_expires_at=datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600)),
+                )
+            )
+            await db.commit()
+        logger.info(f"Token refreshed successfully for user {user_id}")
+        return await self.store(user_id, token_data)
+
+    async def _wait_for_other_refresh(self, user_id: UUID) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + self.lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_SECONDS)
+            entry = await self._cached(user_id)
+            if entry is not None and self._is_fresh(entry):
+                return entry
+        return None
+
+    async def _load_row(self, user_id: UUID) -> Optional[Dict[str, Any]]:
+        async with self.session_factory() as db:
+            result = await db.execute(select(User).where(User.id == user_id))
+            user = result.scalar_one_or_none()
+        return self._from_user(user) if user is not None else None
+
+    async def _cached(self, user_id: UUID) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(user_id)
+        if entry is not None and self._is_fresh(entry):
+            self._counters["memory_hits"] += 1
+            return entry
+
+        client = self._get_redis()
+        if client is None:
+            return entry
+        try:
+            raw = await client.get(self._key(user_id))
+        except Exception as exc:  # pragma: no cover - network errors
+            self._redis_failed()
+            logger.warning("Jira token read from Redis failed: %s", exc)
+            return entry
+        decrypted = decrypt_secret(raw) if raw is not None else None
+        if decrypted is None:
+            # Missing, or written under another SECRET_KEY (or before encryption)
+            return entry
+        self._counters["redis_hits"] += 1
+        entry = json.loads(decrypted)
+        self._memory[user_id] = entry
+        return entry
+
+    @staticmethod
+    def _expires_later(entry: Dict[str, Any], other: Dict[str, Any]) -> bool:
+        if entry.get("access_token") == other.get("access_token"):
+            return False
+        return (entry.get("expires_at") or 0) > (other.get("expires_at") or 0)
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        expires_at = entry.get("expires_at")
+        if expires_at is None:
+            return True
+        return time.time() < expires_at - self.refresh_margin_seconds
+
+    @staticmethod
+    def _from_user(user: User) -> Dict[str, Any]:
+        expires_at = user.jira_token_expires_at
+        if expires_at is not None:
+            # Stored as naive UTC
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            expires_at = expires_at.timestamp()
+        return {
+            "access_token": user.jira_access_token,
+            "refresh_token": user.jira_refresh_token,
+            "expires_at": expires_at,
+        }
+
+    @staticmethod
+    def _apply(user: User, entry: Dict[str, Any]) -> None:
+        """Bring the caller's User up to date without adding it to their next flush"""
+        if user.jira_access_token == entry["access_token"]:
+            return
+        expires_at = entry.get("expires_at")
+        values = {
+            "jira_access_token": entry["access_token"],
+            "jira_refresh_token": entry.get("refresh_token") or user.jira_refresh_token,
+            "jira_token_expires_at": (
+                datetime.utcfromtimestamp(expires_at) if expires_at is not None else None
+            ),
+        }
+        for name, value in values.items():
+            set_committed_value(user, name, value)
+
+    def _key(self, user_id: UUID) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = redis_asyncio.from_url(self.redis_url)
+        return self._redis
+
+    def _redis_failed(self) -> None:
+        self._redis_disabled_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "cached_users": len(self._memory)}
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+jira_tokens = JiraTokenManager(
+    refresh_margin_seconds=settings.JIRA_TOKEN_REFRESH_MARGIN_SECONDS,
+    lock_seconds=settings.JIRA_TOKEN_REFRESH_LOCK_SECONDS,
+    redis_url=settings.REDIS_URL if settings.JIRA_TOKEN_CACHE_USE_REDIS else None,
+)
@@ -0,0 +1,151 @@
+"""Jira webhook ingestion: signature checks, de-duplication and per-issue coalescing."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.jira_service import (
+    ISSUE_CREATED_EVENT,
+    ISSUE_DELETED_EVENT,
+    ISSUE_UPDATED_EVENT,
+    jira_service,
+)
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EVENTS = {ISSUE_CREATED_EVENT, ISSUE_UPDATED_EVENT, ISSUE_DELETED_EVENT}
+# Upper bound on remembered delivery ids
+MAX_SEEN_EVENTS = 10000
+
+
+class JiraWebhookProcessor:
+    """
+    Receives Jira issue webhooks and applies them to UserStory rows.
+
+    Deliveries are de-duplicated by id (Jira retries reuse the same
+    X-Atlassian-Webhook-Identifier). Events for the same issue that arrive
+    within the coalescing window collapse into the newest one, so a burst of
+    edits costs a single upsert. The id memory is per process; duplicates that
+    reach another worker are still harmless because every apply is an upsert.
+    """
+
+    def __init__(
+        self,
+        *,
+        secret: str,
+        coalesce_seconds: float,
+        dedupe_ttl_seconds: int,
+        session_factory: Callable = AsyncSessionLocal,
+    ) -> None:
+        self.secret = secret
+        self.coalesce_seconds = max(0.0, coalesce_seconds)
+        self.dedupe_ttl_seconds = dedupe_ttl_seconds
+        self.session_factory = session_factory
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._counters = {"received": 0, "duplicates": 0, "ignored": 0, "coalesced": 0, "applied": 0, "failed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    def verify_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """Check an X-Hub-Signature header of the form sha256=<hex HMAC of the body>"""
+        if not self.secret or not signature:
+            return False
+        method, _, received = signature.partition("=")
+        if method.lower() != "sha256" or not received:
+            return False
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, received.strip().lower())
+
+    @staticmethod
+    def event_id(body: bytes, identifier: Optional[str]) -> str:
+        """Delivery id from Jira's header, or a digest of the body when it is absent"""
+        return identifier or hashlib.sha256(body).hexdigest()
+
+    async def receive(self, payload: Dict[str, Any], event_id: str) -> str:
+        """
+        Accept a verified event. Returns "accepted", "coalesced" (merged into a
+        pending event for the same issue), "duplicate" or "ignored".
+        """
+        self._counters["received"] += 1
+        if self._already_seen(event_id):
+            self._counters["duplicates"] += 1
+            return "duplicate"
+
+        issue = payload.get("issue") or {}
+        issue_key = issue.get("key")
+        if payload.get("webhookEvent") not in SUPPORTED_EVENTS or not issue_key:
+            self._counters["ignored"] += 1
+            return "ignored"
+
+        pending = self._pending.get(issue_key)
+        if pending is None or payload.get("timestamp", 0) >= pending.get("timestamp", 0):
+            self._pending[issue_key] = payload
+        if issue_key in self._timers:
+            self._counters["coalesced"] += 1
+            return "coalesced"
+        self._timers[issue_key] = asyncio.create_task(self._apply_later(issue_key))
+        return "accepted"
+
+    async def flush(self) -> None:
+        """Apply every pending event now (used at shutdown and in tests)"""
+        for issue_key, timer in list(self._timers.items()):
+            timer.cancel()
+            self._timers.pop(issue_key, None)
+        while self._pending:
+            issue_key, payload = self._pending.popitem()
+            await self.apply(payload)
+
+    async def apply(self, payload: Dict[str, Any]) -> None:
+        """Upsert the event's issue in its own session"""
+        async with self.session_factory() as db:
+            try:
+                story = await jira_service.apply_issue_event(payload["webhookEvent"], payload["issue"], db)
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                self._counters["failed"] += 1
+                logger.error("Applying Jira webhook for %s failed: %s", payload["issue"].get("key"), exc)
+                return
+        self._counters["applied"] += 1
+        if story is None:
+            logger.info("Jira webhook for %s matched no project", payload["issue"].get("key"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "pending": len(self._pending)}
+
+    async def _apply_later(self, issue_key: str) -> None:
+        await asyncio.sleep(self.coalesce_seconds)
+        self._timers.pop(issue_key, None)
+        payload = self._pending.pop(issue_key, None)
+        if payload is not None:
+            await self.apply(payload)
+
+    def _already_seen(self, event_id: str) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            oldest_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.dedupe_ttl_seconds and len(self._seen) < MAX_SEEN_EVENTS:
+                break
+            self._seen.pop(oldest_id)
+        if event_id in self._seen:
+            return True
+        self._seen[event_id] = now
+        return False
+
+
+jira_webhooks = JiraWebhookProcessor(
+    secret=settings.JIRA_WEBHOOK_SECRET,
+    coalesce_seconds=settings.JIRA_WEBHOOK_COALESCE_SECONDS,
+    dedupe_ttl_seconds=settings.JIRA_WEBHOOK_DEDUPE_TTL_SECONDS,
+)
@@ -1,14 +1,20 @@
 """Knowledge base ingestion service"""
 from __future__ import annotations
 
+import enum
 import hashlib
+import json
 import logging
-from typing import Dict, List, Optional, Set
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models import (
     KnowledgeBatch,
     KnowledgeEntry,
@@ -19,11 +25,39 @@ from app.models import (
     UserStory,
 )
 from app.services.knowledge_storage import knowledge_storage_client
-from app.services.knowledge_base.parser import parser, ParsedFile
+from app.services.knowledge_base.parser import parser, ParsedRow
+from app.services.knowledge_base.embedding_cache import EmbeddingCache
 from app.services.knowledge_base.vector_service import vector_indexer
 
 logger = logging.getLogger(__name__)
 
+# Rows per multi-row INSERT statement
+BULK_INSERT_CHUNK_SIZE = 1000
+# KnowledgeEntry fields read by the vector indexer when building documents and payloads
+INDEXED_FIELDS = (
+    "id",
+    "organization_id",
+    "project_id",
+    "user_story_id",
+    "jira_key",
+    "title",
+    "description",
+    "steps",
+    "expected_result",
+    "priority",
+    "test_type",
+)
+
+
+class KnowledgeIngestMode(str, enum.Enum):
+    """How an upload is reconciled with the project's existing knowledge entries"""
+
+    # Insert rows not already present; existing entries are left untouched
+    APPEND = "append"
+    # The file is the project's full knowledge set: unchanged entries move to
+    # the new batch, new rows are inserted and entries missing from it are discarded
+    SYNC = "sync"
+
 
 class KnowledgeBatchService:
     """Coordinates creation, processing, and status updates for knowledge uploads"""
@@ -41,6 +75,7 @@ class KnowledgeBatchService:
         file_size_bytes: Optional[int],
     ) -> KnowledgeBatch:
         batch = KnowledgeBatch(
+            id=uuid.uuid4(),
             organization_id=project.organization_id,
             project_id=project.id,
             uploaded_by=user.id,
@@ -48,12 +83,15 @@ class KnowledgeBatchService:
             file_type=file_type,
             file_size_bytes=file_size_bytes,
             status=KnowledgeBatchStatus.UPLOAD_PENDING.value,
+            row_count=0,
+            processed_count=0,
+            error_count=0,
         )
-        self.db.add(batch)
-        await self.db.flush()
-
+        # The storage URI is derived from the id, so set it before the row is inserted
         object_path = self._original_object_path(batch)
         batch.original_file_uri = knowledge_storage_client.build_uri(object_path)
+        self.db.add(batch)
+        await self.db.flush()
         return batch
 
     async def list_batches_for_project(self, project_id: UUID) -> List[KnowledgeBatch]:
@@ -72,7 +110,11 @@ class KnowledgeBatchService:
         user_story_id: Optional[UUID] = None,
         limit: int = 100,
     ) -> List[KnowledgeEntry]:
-        query = select(KnowledgeEntry).where(KnowledgeEntry.project_id == project_id)
+        query = (
+            select(KnowledgeEntry)
+            .where(KnowledgeEntry.project_id == project_id)
+            .where(KnowledgeEntry.status == KnowledgeEntryStatus.ACTIVE.value)
+        )
         if jira_key:
             query = query.where(KnowledgeEntry.jira_key == jira_key)
         if user_story_id:
@@ -85,11 +127,11 @@ class KnowledgeBatchService:
         self,
         batch: KnowledgeBatch,
         *,
-        file_bytes: bytes,
+        file_obj: BinaryIO,
         content_type: Optional[str] = None,
     ) -> None:
         object_path = self._original_object_path(batch)
-        knowledge_storage_client.upload_bytes(object_path, file_bytes, content_type)
+        knowledge_storage_client.upload_file(object_path, file_obj, content_type)
 
     async def get_batch(self, batch_id: UUID) -> KnowledgeBatch:
         result = await self.db.execute(
@@ -100,91 +142,315 @@ class KnowledgeBatchService:
             raise ValueError("Knowledge batch not found")
         return batch
 
-    async def process_batch(self, batch: KnowledgeBatch) -> KnowledgeBatch:
+    async def process_batch(
+        self,
+        batch: KnowledgeBatch,
+        mode: KnowledgeIngestMode = KnowledgeIngestMode.APPEND,
+    ) -> KnowledgeBatch:
+        """
+        Parse, persist, embed and index a batch. The file is streamed from
+        storage and handled one chunk of rows at a time, so memory does not
+        grow with file size; row_count therefore grows as rows are read.
+        Commits after every chunk so status and progress are visible while it
+        runs; callers must own the session (see pipeline.process_knowledge_batch).
+
+        Rows are diffed against the project's active entries by
+        (jira_key, source_row_hash): only new rows are inserted and embedded,
+        so re-uploads cost in proportion to what changed (see KnowledgeIngestMode).
+        """
         logger.info("Processing knowledge batch %s", batch.id)
         batch.status = KnowledgeBatchStatus.PROCESSING.value
-        await self.db.flush()
+        batch.started_at = datetime.utcnow()
+        batch.completed_at = None
+        batch.row_count = 0
+        batch.processed_count = 0
+        batch.error_count = 0
+        await self.db.commit()
 
         object_path = self._original_object_path(batch)
-        file_bytes = knowledge_storage_client.download_bytes(object_path)
-        parsed_file = parser.parse(file_bytes, batch.file_type)
-        column_map = parser.detect_columns(parsed_file.headers)
+        with knowledge_storage_client.open_stream(object_path) as source:
+            row_stream = parser.stream(
+                source, batch.file_type, chunk_size=settings.KNOWLEDGE_PROCESSING_CHUNK_SIZE
+            )
+            column_map = parser.detect_columns(row_stream.headers)
+            batch.column_mapping = column_map
+            await self.db.commit()
+
+            matched_ids: Set[UUID] = set()
+            reindexed = 0
+            for rows in row_stream.chunks:
+                batch.row_count += len(rows)
+                rows, unchanged, unindexed = await self._match_existing(batch, rows, column_map, matched_ids)
+                if mode == KnowledgeIngestMode.SYNC:
+                    await self._adopt_entries(batch, unchanged)
+                entries = await self._persist_entries(batch, rows, column_map)
+                # Unchanged rows whose earlier indexing failed get another try
+                retried = await self._load_entries(unindexed)
+                await self._index_entries(entries + retried)
+                reindexed += len(retried)
+                batch.processed_count += len(entries) + len(unchanged)
+                await self.db.commit()
+
+        discarded = 0
+        if mode == KnowledgeIngestMode.SYNC:
+            discarded = await self._discard_missing_entries(batch)
+        logger.info(
+            "Knowledge batch %s (%s): %d unchanged (%d indexed again), %d inserted, %d discarded",
+            batch.id,
+            mode.value,
+            len(matched_ids),
+            reindexed,
+            batch.processed_count - len(matched_ids),
+            discarded,
+        )
 
-        batch.row_count = len(parsed_file.rows)
-        batch.column_mapping = column_map
-        entries = await self._persist_entries(batch, parsed_file, column_map)
-        await self.db.flush()
-        await self._index_entries(entries)
-        batch.processed_count = len(entries)
         batch.status = KnowledgeBatchStatus.COMPLETED.value
-        await self.db.flush()
+        batch.completed_at = datetime.utcnow()
+        await self.db.commit()
         return batch
 
+    async def mark_failed(self, batch: KnowledgeBatch, exc: Exception) -> None:
+        batch.status = KnowledgeBatchStatus.FAILED.value
+        batch.error_details = {"message": str(exc)}
+        batch.completed_at = datetime.utcnow()
+        await self.db.commit()
+
+    async def _match_existing(
+        self,
+        batch: KnowledgeBatch,
+        rows: List[ParsedRow],
+        column_map: Dict[str, Optional[str]],
+        matched_ids: Set[UUID],
+    ) -> Tuple[List[ParsedRow], List[Tuple[UUID, int]], List[UUID]]:
+        """
+        Split rows into those with no matching active entry and the
+        (entry id, row number) pairs of rows that are already stored. Each
+        existing entry matches at most one row, so duplicate rows in a file are
+        kept as duplicates; matched_ids tracks entries claimed by earlier chunks.
+
+        Also returns the ids of matched entries that have no Qdrant point
+        (their indexing failed), so the caller can index them again.
+
+        Entries stored before row hashes became content-only still carry the
+        legacy hash; a row matching one of those by it has the entry's hash
+        rewritten, so each entry is matched that way at most once.
+        """
+        keyed_rows = []
+        for row in rows:
+            normalized = parser.normalize_row(row, column_map)
+            jira_key = normalized.get("jira_key")
+            keyed_rows.append((
+                row,
+                (jira_key, self._hash_row(normalized), self._legacy_hash_row(normalized)) if jira_key else None,
+            ))
+
+        hashes = {row_hash for _, key in keyed_rows if key for row_hash in key[1:]}
+        if not hashes:
+            return rows, [], []
+        result = await self.db.execute(
+            select(
+                KnowledgeEntry.id,
+                KnowledgeEntry.jira_key,
+                KnowledgeEntry.source_row_hash,
+                KnowledgeEntry.qdrant_point_id,
+            )
+            .where(KnowledgeEntry.project_id == batch.project_id)
+            .where(KnowledgeEntry.status == KnowledgeEntryStatus.ACTIVE.value)
+            .where(KnowledgeEntry.batch_id != batch.id)
+            .where(KnowledgeEntry.source_row_hash.in_(list(hashes)))
+        )
+        candidates: Dict[Tuple[str, str], List[UUID]] = {}
+        indexed: Set[UUID] = set()
+        for entry_id, jira_key, row_hash, point_id in result.all():
+            if entry_id not in matched_ids:
+                candidates.setdefault((jira_key, row_hash), []).append(entry_id)
+            if point_id:
+                indexed.add(entry_id)
+
+        new_rows: List[ParsedRow] = []
+        unchanged: List[Tuple[UUID, int]] = []
+        unindexed: List[UUID] = []
+        rehashed: List[Dict[str, Any]] = []
+        for row, key in keyed_rows:
+            existing = None
+            if key:
+                jira_key, row_hash, legacy_hash = key
+                existing = candidates.get((jira_key, row_hash))
+                if not existing and candidates.get((jira_key, legacy_hash)):
+                    existing = candidates[(jira_key, legacy_hash)]
+                    rehashed.append({"entry_id": existing[-1], "row_hash": row_hash})
+            if existing:
+                entry_id = existing.pop()
+                matched_ids.add(entry_id)
+                unchanged.append((entry_id, row.row_number))
+                if entry_id not in indexed:
+                    unindexed.append(entry_id)
+            else:
+                new_rows.append(row)
+        if rehashed:
+            table = KnowledgeEntry.__table__
+            await self.db.execute(
+                update(table)
+                .where(table.c.id == bindparam("entry_id"))
+                .values(source_row_hash=bindparam("row_hash")),
+                rehashed,
+            )
+        return new_rows, unchanged, unindexed
+
+    async def _load_entries(self, entry_ids: List[UUID]) -> List[SimpleNamespace]:
+        """Load the fields the vector indexer needs for existing entries"""
+        if not entry_ids:
+            return []
+        result = await self.db.execute(
+            select(*[getattr(KnowledgeEntry, field) for field in INDEXED_FIELDS])
+            .where(KnowledgeEntry.id.in_(entry_ids))
+        )
+        return [SimpleNamespace(**row._mapping) for row in result.all()]
+
+    async def _adopt_entries(self, batch: KnowledgeBatch, unchanged: List[Tuple[UUID, int]]) -> None:
+        """Move unchanged entries into the new batch; their Qdrant points stay as they are"""
+        if not unchanged:
+            return
+        table = KnowledgeEntry.__table__
+        await self.db.execute(
+            update(table)
+            .where(table.c.id == bindparam("entry_id"))
+            .values(batch_id=batch.id, source_row_number=bindparam("row_number")),
+            [{"entry_id": entry_id, "row_number": row_number} for entry_id, row_number in unchanged],
+        )
+
+    async def _discard_missing_entries(self, batch: KnowledgeBatch) -> int:
+        """Discard active entries absent from a SYNC upload and drop their Qdrant points"""
+        result = await self.db.execute(
+            select(KnowledgeEntry.id, KnowledgeEntry.qdrant_point_id)
+            .where(KnowledgeEntry.project_id == batch.project_id)
+            .where(KnowledgeEntry.status == KnowledgeEntryStatus.ACTIVE.value)
+            .where(KnowledgeEntry.batch_id != batch.id)
+        )
+        missing = result.all()
+        if not missing:
+            return 0
+
+        point_ids = [point_id for _, point_id in missing if point_id]
+        try:
+            await vector_indexer.delete_points(
+                point_ids, project_id=batch.project_id, organization_id=batch.organization_id
+            )
+        except Exception as exc:  # pragma: no cover - external services
+            logger.error("Removing discarded knowledge points failed: %s", exc)
+
+        entry_ids = [entry_id for entry_id, _ in missing]
+        for start in range(0, len(entry_ids), BULK_INSERT_CHUNK_SIZE):
+            await self.db.execute(
+                update(KnowledgeEntry)
+                .where(KnowledgeEntry.id.in_(entry_ids[start:start + BULK_INSERT_CHUNK_SIZE]))
+                .values(status=KnowledgeEntryStatus.DISCARDED.value)
+                .execution_options(synchronize_session=False)
+            )
+        await self.db.commit()
+        return len(entry_ids)
+
     async def _persist_entries(
         self,
         batch: KnowledgeBatch,
-        parsed_file: ParsedFile,
+        rows: List[ParsedRow],
         column_map: Dict[str, Optional[str]],
-    ) -> List[KnowledgeEntry]:
-        entries: List[KnowledgeEntry] = []
+    ) -> List[SimpleNamespace]:
+        """
+        Insert a chunk of rows with multi-row INSERT statements, bypassing the
+        ORM unit of work. Returns lightweight records carrying just the fields
+        the vector indexer needs; no KnowledgeEntry instances are kept alive.
+        """
         jira_column = column_map.get("jira_key")
         jira_keys = set()
         if jira_column:
-            for row in parsed_file.rows:
+            for row in rows:
                 jira_value = row.data.get(jira_column)
                 if jira_value:
                     jira_keys.add(jira_value)
         # TODO: Support manual mapping when Jira key is missing
-        user_stories = await self._load_user_stories(batch.project_id, jira_keys)
-        story_by_key = {story.jira_key: story for story in user_stories if story.jira_key}
+        story_ids = await self._load_story_ids(batch.project_id, jira_keys)
 
-        for row in parsed_file.rows:
+        values: List[Dict[str, Any]] = []
+        for row in rows:
             normalized = parser.normalize_row(row, column_map)
             jira_key = normalized.get("jira_key")
             if not jira_key:
                 batch.error_count += 1
                 continue
 
-            source_hash = self._hash_row(normalized)
-            user_story = story_by_key.get(jira_key)
-            entry = KnowledgeEntry(
-                batch_id=batch.id,
-                organization_id=batch.organization_id,
-                project_id=batch.project_id,
-                user_story_id=user_story.id if user_story else None,
-                jira_key=jira_key,
-                title=normalized.get("title") or "",
-                description=normalized.get("description"),
-                steps=normalized.get("steps"),
-                expected_result=normalized.get("expected_result"),
-                priority=normalized.get("priority"),
-                test_type=normalized.get("test_type"),
-                raw_payload=normalized,
-                source_row_number=row.row_number,
-                source_row_hash=source_hash,
-                status=KnowledgeEntryStatus.ACTIVE.value,
+            values.append({
+                "id": uuid.uuid4(),
+                "batch_id": batch.id,
+                "organization_id": batch.organization_id,
+                "project_id": batch.project_id,
+                "user_story_id": story_ids.get(jira_key),
+                "jira_key": jira_key,
+                "title": normalized.get("title") or "",
+                "description": normalized.get("description"),
+                "steps": normalized.get("steps"),
+                "expected_result": normalized.get("expected_result"),
+                "priority": normalized.get("priority"),
+                "test_type": normalized.get("test_type"),
+                "raw_payload": normalized,
+                "source_row_number": row.row_number,
+                "source_row_hash": self._hash_row(normalized),
+                "status": KnowledgeEntryStatus.ACTIVE.value,
+            })
+
+        for start in range(0, len(values), BULK_INSERT_CHUNK_SIZE):
+            await self.db.execute(
+                insert(KnowledgeEntry), values[start:start + BULK_INSERT_CHUNK_SIZE]
             )
-            self.db.add(entry)
-            entries.append(entry)
-        return entries
+        return [SimpleNamespace(**{field: value[field] for field in INDEXED_FIELDS}) for value in values]
 
-    async def _index_entries(self, entries: List[KnowledgeEntry]) -> None:
+    async def _index_entries(self, entries: List[SimpleNamespace]) -> None:
         if not entries:
             return
+        embedding_cache = EmbeddingCache(self.db)
         try:
-            vector_indexer.index_entries(entries)
+            cached_vectors = await embedding_cache.get_many(
+                vector_indexer.model, vector_indexer.document_hashes(entries)
+            )
+            new_vectors = await vector_indexer.index_entries(entries, cached_vectors=cached_vectors)
+            await embedding_cache.put_many(vector_indexer.model, new_vectors)
         except Exception as exc:  # pragma: no cover - external services
             logger.error("Vector indexing failed: %s", exc)
+        await self._mark_indexed(entries)
+
+    async def _mark_indexed(self, entries: List[SimpleNamespace]) -> None:
+        """
+        Record point ids of entries the vector store accepted, in one
+        executemany UPDATE; the indexer sets them only after a confirmed upsert
+        """
+        params = [
+            {
+                "entry_id": entry.id,
+                "point_id": entry.qdrant_point_id,
+                "model": entry.embedding_model,
+            }
+            for entry in entries
+            if getattr(entry, "qdrant_point_id", None)
+        ]
+        if not params:
+            return
+        table = KnowledgeEntry.__table__
+        await self.db.execute(
+            update(table)
+            .where(table.c.id == bindparam("entry_id"))
+            .values(qdrant_point_id=bindparam("point_id"), embedding_model=bindparam("model")),
+            params,
+        )
 
-    async def _load_user_stories(self, project_id: UUID, jira_keys: Set[str]):
+    async def _load_story_ids(self, project_id: UUID, jira_keys: Set[str]) -> Dict[str, UUID]:
         if not jira_keys:
-            return []
+            return {}
         result = await self.db.execute(
-            select(UserStory)
+            select(UserStory.jira_key, UserStory.id)
             .where(UserStory.project_id == project_id)
             .where(UserStory.jira_key.in_(list(jira_keys)))
         )
-        return result.scalars().all()
+        return {jira_key: story_id for jira_key, story_id in result.all() if jira_key}
 
     def _original_object_path(self, batch: KnowledgeBatch) -> str:
         return knowledge_storage_client.build_original_path(
@@ -194,10 +460,16 @@ class KnowledgeBatchService:
             batch.file_name,
         )
 
-    def _hash_row(self, normalized_row: Dict[str, Optional[str]]) -> str:
-        serialized = str(normalized_row).encode("utf-8")
+    def _hash_row(self, normalized_row: Dict[str, Any]) -> str:
+        # Content only: moving a row within the file must not change its hash
+        content = {key: value for key, value in normalized_row.items() if key != "source_row_number"}
+        serialized = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
         return hashlib.sha256(serialized).hexdigest()
 
+    def _legacy_hash_row(self, normalized_row: Dict[str, Any]) -> str:
+        # The hash entries were stored with before _hash_row: includes the row number
+        return hashlib.sha256(str(normalized_row).encode("utf-8")).hexdigest()
+
 
 async def get_batch_service(db: AsyncSession) -> KnowledgeBatchService:
     return KnowledgeBatchService(db)
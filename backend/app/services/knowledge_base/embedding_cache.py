@@ -0,0 +1,62 @@
+"""Postgres-backed embedding cache keyed by (embedding model, document hash)."""
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Keep IN lists and multi-row inserts to a reasonable size per statement
+QUERY_CHUNK_SIZE = 1000
+
+
+class EmbeddingCache:
+    """Looks up and stores embedding vectors so unchanged documents are never re-embedded"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        unique_hashes = list(dict.fromkeys(hashes))
+        vectors: Dict[str, List[float]] = {}
+        for start in range(0, len(unique_hashes), QUERY_CHUNK_SIZE):
+            chunk = unique_hashes[start:start + QUERY_CHUNK_SIZE]
+            result = await self.db.execute(
+                select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector)
+                .where(EmbeddingCacheEntry.embedding_model == model)
+                .where(EmbeddingCacheEntry.content_hash.in_(chunk))
+            )
+            vectors.update({content_hash: vector for content_hash, vector in result.all()})
+        return vectors
+
+    async def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        rows = [
+            {"embedding_model": model, "content_hash": content_hash, "vector": vector}
+            for content_hash, vector in vectors.items()
+        ]
+        statement = self._insert_ignoring_duplicates()
+        for start in range(0, len(rows), QUERY_CHUNK_SIZE):
+            await self.db.execute(statement, rows[start:start + QUERY_CHUNK_SIZE])
+        logger.info("Cached %d new embeddings for model %s", len(rows), model)
+
+    def _insert_ignoring_duplicates(self):
+        # Concurrent uploads may embed the same document; first writer wins
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            return pg_insert(EmbeddingCacheEntry).on_conflict_do_nothing(
+                index_elements=["embedding_model", "content_hash"]
+            )
+        if dialect == "sqlite":
+            return sqlite_insert(EmbeddingCacheEntry).on_conflict_do_nothing(
+                index_elements=["embedding_model", "content_hash"]
+            )
+        return insert(EmbeddingCacheEntry)
@@ -0,0 +1,437 @@
+"""In-process knowledge vector index on local disk, used with VECTOR_BACKEND=local."""
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.knowledge_base.vector_backends import VectorPoint
+
+try:  # Optional: without it every search is an exact scan
+    import hnswlib  # type: ignore
+except Exception:  # pragma: no cover - hnswlib not installed
+    hnswlib = None
+
+try:  # Lets a Celery worker and the API write to the same directory
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Rows added to an index per hnswlib call while building it
+INDEX_BUILD_CHUNK = 10_000
+
+
+class _Segment:
+    """
+    One project's points in one collection.
+
+    vectors.f32 holds unit-length float32 rows and is memory-mapped for
+    search; points.jsonl is an append-only log assigning point ids (and
+    payloads) to rows, or freeing a row on delete. Every process replays log
+    lines it has not seen before using the segment, so points written by
+    another process (a Celery worker indexing for the API) show up on the next
+    search. Writers hold a file lock while assigning rows.
+
+    Once the segment is big enough an HNSW index (labels are row numbers) is
+    built on a background thread; searches scan all rows until it is ready.
+    The index is saved as hnsw-<log offset>.bin, and a process that loads it
+    replays only the log written after that offset.
+    """
+
+    def __init__(self, directory: Path, dimensions: int, backend: "LocalVectorBackend") -> None:
+        self.directory = directory
+        self.dimensions = dimensions
+        self.backend = backend
+        self.vectors_path = directory / "vectors.f32"
+        self.log_path = directory / "points.jsonl"
+        self.ids: List[Optional[str]] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {}
+        self.free: Set[int] = set()
+        self.live = np.zeros(0, dtype=bool)
+        self.offset = 0
+        self.matrix: Optional[np.memmap] = None
+        self.index = None
+        self.saved_offset = 0
+        self.building = False
+        # Rows changed while the index builds, applied to it once it is attached
+        self.pending_rows: Optional[Set[int]] = None
+
+    def open(self) -> "_Segment":
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / "meta.json"
+        if meta_path.exists():
+            dimensions = json.loads(meta_path.read_text())["dimensions"]
+            if dimensions != self.dimensions:
+                raise ValueError(
+                    f"{self.directory} holds {dimensions}-dimensional vectors, expected {self.dimensions}"
+                )
+        else:
+            meta_path.write_text(json.dumps({"dimensions": self.dimensions}))
+        self._load_index()
+        self.refresh()
+        return self
+
+    def _load_index(self) -> None:
+        if not self.backend.hnsw:
+            return
+        snapshots = sorted(self._index_snapshots())
+        if not snapshots:
+            return
+        offset, path = snapshots[-1]
+        try:
+            self.refresh(until=offset)
+            index = hnswlib.Index(space="ip", dim=self.dimensions)
+            index.load_index(str(path))
+        except Exception as exc:
+            # Replaced by another process mid-load, or unreadable: rebuilt when needed
+            logger.warning("Ignoring vector index %s: %s", path, exc)
+            return
+        self.index = index
+        self.saved_offset = offset
+
+    def _index_snapshots(self) -> List[Tuple[int, Path]]:
+        snapshots = []
+        for path in self.directory.glob("hnsw-*.bin"):
+            try:
+                snapshots.append((int(path.stem.split("-", 1)[1]), path))
+            except ValueError:
+                continue
+        return snapshots
+
+    def refresh(self, until: Optional[int] = None) -> None:
+        """Apply log lines written since the last refresh, by any process"""
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if until is not None:
+            size = min(size, until)
+        if size <= self.offset:
+            return
+        with open(self.log_path, "rb") as log:
+            log.seek(self.offset)
+            data = log.read(size - self.offset)
+        # A writer in another process may be mid-line
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self.offset += end
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        row = record["row"]
+        point_id = record["id"]
+        if row >= len(self.ids):
+            grow = row + 1 - len(self.ids)
+            self.ids.extend([None] * grow)
+            self.payloads.extend([None] * grow)
+            if row >= len(self.live):
+                live = np.zeros(max(row + 1, 2 * len(self.live)), dtype=bool)
+                live[:len(self.live)] = self.live
+                self.live = live
+        previous = self.ids[row]
+        if previous is not None and self.rows.get(previous) == row:
+            del self.rows[previous]
+        if record.get("deleted"):
+            self.ids[row] = None
+            self.payloads[row] = None
+            self.live[row] = False
+            self.free.add(row)
+        else:
+            self.ids[row] = point_id
+            self.payloads[row] = record["payload"]
+            self.rows[point_id] = row
+            self.live[row] = True
+            self.free.discard(row)
+        self._update_index(row)
+
+    def _update_index(self, row: int) -> None:
+        if self.pending_rows is not None:
+            self.pending_rows.add(row)
+        if self.index is None:
+            return
+        if self.live[row]:
+            if self.index.get_current_count() >= self.index.get_max_elements():
+                self.index.resize_index(2 * self.index.get_max_elements())
+            # Adding an existing label replaces its vector and undeletes it
+            self.index.add_items(self._vectors(row + 1)[row:row + 1], [row])
+        else:
+            try:
+                self.index.mark_deleted(row)
+            except RuntimeError:
+                pass  # never indexed
+
+    def _vectors(self, rows: int) -> np.ndarray:
+        """The vector file mapped to at least ``rows`` rows"""
+        if self.matrix is None or self.matrix.shape[0] < rows:
+            file_rows = self.vectors_path.stat().st_size // (self.dimensions * 4)
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(file_rows, self.dimensions))
+        return self.matrix
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        lock_path = self.directory / "write.lock"
+        with open(lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def upsert(self, points: List[VectorPoint]) -> None:
+        vectors = _unit_rows([point.vector for point in points], self.dimensions)
+        with self._write_lock():
+            assigned: Dict[str, int] = {}
+            free = sorted(self.free, reverse=True)
+            next_row = len(self.ids)
+            lines = []
+            fd = os.open(self.vectors_path, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                for point, vector in zip(points, vectors):
+                    row = assigned.get(point.id, self.rows.get(point.id))
+                    if row is None:
+                        if free:
+                            row = free.pop()
+                        else:
+                            row, next_row = next_row, next_row + 1
+                    assigned[point.id] = row
+                    os.pwrite(fd, vector.tobytes(), row * self.dimensions * 4)
+                    lines.append(json.dumps({"id": point.id, "row": row, "payload": point.payload}) + "\n")
+            finally:
+                os.close(fd)
+            # Vectors first: a reader only uses rows once the log names them
+            with open(self.log_path, "a") as log:
+                log.write("".join(lines))
+            self.refresh()
+
+    def delete(self, point_ids: List[str]) -> None:
+        if not any(point_id in self.rows for point_id in point_ids):
+            return
+        with self._write_lock():
+            lines = [
+                json.dumps({"id": point_id, "row": self.rows[point_id], "deleted": True}) + "\n"
+                for point_id in dict.fromkeys(point_ids)
+                if point_id in self.rows
+            ]
+            with open(self.log_path, "a") as log:
+                log.write("".join(lines))
+            self.refresh()
+
+    def search(self, vector: List[float], limit: int) -> List[Dict[str, Any]]:
+        self.refresh()
+        k = min(limit, len(self.rows))
+        if k <= 0:
+            return []
+        query = _unit_rows([vector], self.dimensions)[0]
+        hits = None
+        if self.index is not None:
+            self.index.set_ef(max(self.backend.hnsw_ef_search, k))
+            try:
+                labels, distances = self.index.knn_query(query, k=k)
+                # "ip" distance is 1 - dot product, and rows are unit length
+                hits = [(int(row), 1.0 - float(distance)) for row, distance in zip(labels[0], distances[0])]
+            except RuntimeError:
+                # Too few reachable points left after deletes; scan instead
+                hits = None
+        else:
+            self._start_index_build()
+        if hits is None:
+            rows = len(self.ids)
+            scores = self._vectors(rows)[:rows] @ query
+            if self.free:
+                scores[~self.live[:rows]] = -np.inf
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            hits = [(int(row), float(scores[row])) for row in top]
+        return [
+            {"id": self.ids[row], "score": score, "payload": self.payloads[row]}
+            for row, score in hits
+        ]
+
+    def _start_index_build(self) -> None:
+        if not self.backend.hnsw or self.building or len(self.rows) < self.backend.hnsw_min_points:
+            return
+        self.building = True
+        self.pending_rows = set()
+        rows = len(self.ids)
+        live_rows = np.flatnonzero(self.live[:rows])
+        threading.Thread(
+            target=self._build_index,
+            args=(self._vectors(rows), live_rows),
+            name=f"vector-index-{self.directory.name}",
+            daemon=True,
+        ).start()
+
+    def _build_index(self, matrix: np.ndarray, live_rows: np.ndarray) -> None:
+        logger.info("Building vector index for %s (%d points)", self.directory, len(live_rows))
+        try:
+            index = hnswlib.Index(space="ip", dim=self.dimensions)
+            index.init_index(
+                max_elements=max(2 * len(live_rows), 1024),
+                ef_construction=self.backend.hnsw_ef_construct,
+                M=self.backend.hnsw_m,
+            )
+            for start in range(0, len(live_rows), INDEX_BUILD_CHUNK):
+                chunk = live_rows[start:start + INDEX_BUILD_CHUNK]
+                index.add_items(matrix[chunk], chunk)
+        except Exception as exc:
+            logger.error("Building vector index for %s failed: %s", self.directory, exc)
+            index = None
+        # Attached on the backend's thread, between reads and writes
+        self.backend._executor.submit(self._attach_index, index)
+
+    def _attach_index(self, index) -> None:
+        pending, self.pending_rows = self.pending_rows or set(), None
+        self.building = False
+        if index is None:
+            return
+        self.index = index
+        for row in pending:
+            self._update_index(row)
+        logger.info("Vector index for %s ready", self.directory)
+        self.save_index()
+
+    def save_index(self) -> None:
+        if self.index is None or self.saved_offset == self.offset:
+            return
+        path = self.directory / f"hnsw-{self.offset}.bin"
+        temporary = path.with_suffix(".tmp")
+        self.index.save_index(str(temporary))
+        os.replace(temporary, path)
+        self.saved_offset = self.offset
+        for offset, old_path in self._index_snapshots():
+            if offset < self.offset:
+                old_path.unlink(missing_ok=True)
+
+
+def _unit_rows(vectors: List[List[float]], dimensions: int) -> np.ndarray:
+    """Vectors as unit-length float32 rows, so cosine similarity is a dot product"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[1] != dimensions:
+        raise ValueError(f"Expected {dimensions}-dimensional vectors, got shape {matrix.shape}")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorBackend:
+    """
+    Keeps knowledge vectors in memory-mapped files under a local directory:
+    <directory>/<collection>/<project id>/. Every search filters on project_id,
+    so each project is its own segment and a search only touches that
+    project's rows: an exact scan (a few milliseconds for 20k 1536-dimension
+    vectors) or, with hnswlib installed and LOCAL_VECTOR_HNSW_MIN_POINTS
+    reached, an HNSW index (about a millisecond at 100k).
+
+    All file and index work runs on one worker thread, so searches never block
+    the event loop and never see a half-applied write.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        directory: str,
+        vector_size: int,
+        *,
+        hnsw: bool = True,
+        hnsw_min_points: int = 20_000,
+        hnsw_m: int = 16,
+        hnsw_ef_construct: int = 100,
+        hnsw_ef_search: int = 64,
+    ) -> None:
+        self.directory = Path(directory)
+        self.vector_size = vector_size
+        self.hnsw = hnsw and hnswlib is not None
+        if hnsw and hnswlib is None:
+            logger.info("hnswlib is not installed; local vector search scans every point")
+        self.hnsw_min_points = hnsw_min_points
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.hnsw_ef_search = hnsw_ef_search
+        self._segments: Dict[Tuple[str, str], _Segment] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-vectors")
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _segment(self, collection_name: str, project_id: str) -> _Segment:
+        key = (collection_name, project_id)
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = _Segment(self.directory / collection_name / project_id, self.vector_size, self).open()
+            self._segments[key] = segment
+        return segment
+
+    async def check(self) -> None:
+        await self._run(functools.partial(self.directory.mkdir, parents=True, exist_ok=True))
+
+    async def ensure_collection(self, collection_name: str, create: bool) -> bool:
+        def ensure() -> bool:
+            path = self.directory / collection_name
+            if path.is_dir():
+                return True
+            if not create:
+                return False
+            path.mkdir(parents=True, exist_ok=True)
+            return True
+
+        return await self._run(ensure)
+
+    async def upsert(self, collection_name: str, points: List[VectorPoint]) -> None:
+        by_project: Dict[str, List[VectorPoint]] = {}
+        for point in points:
+            by_project.setdefault(str(point.payload["project_id"]), []).append(point)
+
+        def upsert() -> None:
+            for project_id, project_points in by_project.items():
+                self._segment(collection_name, project_id).upsert(project_points)
+
+        await self._run(upsert)
+
+    async def delete(self, collection_name: str, point_ids: List[str], project_id: str) -> None:
+        def delete() -> None:
+            # Only the project's own segment is opened, not every project in the collection
+            if not (self.directory / collection_name / project_id).is_dir():
+                return
+            segment = self._segment(collection_name, project_id)
+            segment.refresh()
+            segment.delete(point_ids)
+
+        await self._run(delete)
+
+    async def search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        project_id: str,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        def search() -> List[Dict[str, Any]]:
+            if not (self.directory / collection_name / project_id).is_dir():
+                return []
+            return self._segment(collection_name, project_id).search(vector, limit)
+
+        return await self._run(search)
+
+    async def close(self) -> None:
+        """Save indexes that changed, so the next start does not rebuild them"""
+        def save() -> None:
+            for segment in self._segments.values():
+                segment.save_index()
+
+        await self._run(save)
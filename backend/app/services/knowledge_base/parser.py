@@ -6,10 +6,10 @@ import io
 import json
 import logging
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
 
-import pandas as pd
+from openpyxl import load_workbook
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,16 @@ class ParsedFile:
     file_type: str
 
 
+@dataclass
+class RowStream:
+    """Headers plus a lazy iterator of row chunks; consume chunks while the source is open"""
+    headers: List[str]
+    chunks: Iterator[List[ParsedRow]]
+    file_type: str
+
+
 SUPPORTED_EXTENSIONS = {"csv", "xlsx"}
+DEFAULT_CHUNK_SIZE = 500
 
 
 class KnowledgeFileParser:
@@ -36,27 +45,78 @@ class KnowledgeFileParser:
     REQUIRED_COLUMNS = {"title", "jira_key"}
 
     def parse(self, file_bytes: bytes, file_extension: str) -> ParsedFile:
+        """Parse a whole file into memory. Prefer stream() for large uploads."""
+        row_stream = self.stream(io.BytesIO(file_bytes), file_extension)
+        rows = [row for chunk in row_stream.chunks for row in chunk]
+        return ParsedFile(rows=rows, headers=row_stream.headers, file_type=row_stream.file_type)
+
+    def stream(
+        self,
+        source: BinaryIO,
+        file_extension: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> RowStream:
+        """
+        Read rows incrementally from a binary file object, yielding them in
+        chunks so memory stays bounded by chunk_size rather than file size.
+        """
         ext = file_extension.lower().lstrip(".")
         if ext not in SUPPORTED_EXTENSIONS:
             raise ValueError(f"Unsupported file extension: {ext}")
 
         if ext == "csv":
-            return self._parse_csv(file_bytes)
-        return self._parse_excel(file_bytes)
-
-    def _parse_csv(self, file_bytes: bytes) -> ParsedFile:
-        stream = io.StringIO(file_bytes.decode("utf-8"))
+            headers, rows = self._stream_csv(source)
+        else:
+            headers, rows = self._stream_excel(source)
+        return RowStream(headers=headers, chunks=self._chunked(rows, chunk_size), file_type=ext)
+
+    def _stream_csv(self, source: BinaryIO):
+        # utf-8-sig also strips the BOM Excel adds when exporting CSV
+        stream = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
         reader = csv.DictReader(stream)
-        rows = [ParsedRow(idx + 2, row) for idx, row in enumerate(reader)]  # +2 for header line
-        headers = reader.fieldnames or []
-        return ParsedFile(rows=rows, headers=headers, file_type="csv")
-
-    def _parse_excel(self, file_bytes: bytes) -> ParsedFile:
-        stream = io.BytesIO(file_bytes)
-        df = pd.read_excel(stream)
-        headers = list(df.columns)
-        rows = [ParsedRow(idx + 2, df.iloc[idx].to_dict()) for idx in range(len(df))]
-        return ParsedFile(rows=rows, headers=headers, file_type="xlsx")
+        headers = list(reader.fieldnames or [])
+        rows = (ParsedRow(idx + 2, row) for idx, row in enumerate(reader))  # +2 for header line
+        return headers, rows
+
+    def _stream_excel(self, source: BinaryIO):
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        sheet = workbook.worksheets[0]
+        values = sheet.iter_rows(values_only=True)
+        header_row = next(values, None) or ()
+        headers = [str(cell).strip() if cell is not None else "" for cell in header_row]
+
+        def rows() -> Iterator[ParsedRow]:
+            try:
+                for idx, cells in enumerate(values):
+                    if all(cell is None for cell in cells):
+                        continue
+                    data = {
+                        header: self._cell_to_text(cell)
+                        for header, cell in zip(headers, cells)
+                        if header
+                    }
+                    yield ParsedRow(idx + 2, data)
+            finally:
+                workbook.close()
+
+        return headers, rows()
+
+    @staticmethod
+    def _cell_to_text(cell: Any) -> Optional[str]:
+        if cell is None:
+            return None
+        if isinstance(cell, float) and cell.is_integer():
+            return str(int(cell))
+        return str(cell)
+
+    @staticmethod
+    def _chunked(rows: Iterator[ParsedRow], chunk_size: int) -> Iterator[List[ParsedRow]]:
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, max(1, chunk_size)))
+            if not chunk:
+                return
+            yield chunk
 
     def detect_columns(self, headers: List[str]) -> Dict[str, Optional[str]]:
         header_map = {h.lower().strip(): h for h in headers}
@@ -0,0 +1,94 @@
+"""Background processing pipeline for uploaded knowledge batches"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import func, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import KnowledgeBatch, KnowledgeBatchStatus
+from app.services.knowledge_base.batch_service import KnowledgeBatchService, KnowledgeIngestMode
+from app.services.task_queue import register_heartbeat, register_sweep, register_task, task_queue
+
+logger = logging.getLogger(__name__)
+
+PROCESS_KNOWLEDGE_BATCH = "knowledge.process_batch"
+INTERRUPTED_BATCH_ERROR = "Interrupted: the API process handling it stopped. Upload the file again to finish it."
+ACTIVE_BATCH_STATUSES = (KnowledgeBatchStatus.PENDING.value, KnowledgeBatchStatus.PROCESSING.value)
+
+
+def enqueue_batch(batch_id: UUID, mode: KnowledgeIngestMode = KnowledgeIngestMode.APPEND) -> None:
+    """Queue a stored batch for processing; the batch must be committed as PENDING"""
+    task_queue.enqueue(PROCESS_KNOWLEDGE_BATCH, batch_id, mode.value)
+
+
+@register_task(PROCESS_KNOWLEDGE_BATCH)
+async def process_knowledge_batch(batch_id: str, mode: str = KnowledgeIngestMode.APPEND.value) -> None:
+    """
+    Run a batch through parse -> persist -> embed -> index in its own session.
+    Only PENDING batches are picked up, so duplicate deliveries are no-ops.
+    """
+    async with AsyncSessionLocal() as db:
+        service = KnowledgeBatchService(db)
+        try:
+            batch = await service.get_batch(UUID(batch_id))
+        except ValueError:
+            logger.warning("Knowledge batch %s not found", batch_id)
+            return
+        if batch.status != KnowledgeBatchStatus.PENDING.value:
+            logger.info("Skipping knowledge batch %s in status %s", batch.id, batch.status)
+            return
+
+        try:
+            await service.process_batch(batch, KnowledgeIngestMode(mode))
+        except Exception as exc:
+            logger.error("Knowledge batch %s failed: %s", batch.id, exc)
+            await db.rollback()
+            await service.mark_failed(batch, exc)
+
+
+@register_heartbeat(PROCESS_KNOWLEDGE_BATCH)
+async def touch_knowledge_batches(batch_ids: List[str]) -> None:
+    """Stamp batches this process holds on the local task queue"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(KnowledgeBatch)
+            .where(KnowledgeBatch.id.in_([UUID(batch_id) for batch_id in batch_ids]))
+            .where(KnowledgeBatch.status.in_(ACTIVE_BATCH_STATUSES))
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+
+
+@register_sweep
+async def fail_interrupted_batches() -> int:
+    """
+    Mark pending or processing batches whose API process stopped as failed,
+    scoped like generation_jobs.fail_interrupted_jobs: only batches nobody has
+    stamped for TASK_STALE_SECONDS.
+
+    They are not processed again in place: rows a batch had already inserted
+    would be inserted a second time. Uploading the file again finishes the
+    work cheaply, since those rows match as unchanged (and are indexed if
+    they were not yet).
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.TASK_STALE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(KnowledgeBatch)
+            .where(KnowledgeBatch.status.in_(ACTIVE_BATCH_STATUSES))
+            .where(func.coalesce(KnowledgeBatch.heartbeat_at, KnowledgeBatch.updated_at) < stale_before)
+            .values(
+                status=KnowledgeBatchStatus.FAILED.value,
+                error_details={"message": INTERRUPTED_BATCH_ERROR},
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        await db.commit()
+        if result.rowcount:
+            logger.warning("Marked %d interrupted knowledge batch(es) as failed", result.rowcount)
+        return result.rowcount
@@ -0,0 +1,504 @@
+"""
+Vector storage backends for knowledge entries.
+
+KnowledgeVectorService embeds documents and handles tenancy; a backend only
+stores and searches vectors. Every backend has a ``name`` and these coroutines:
+
+    ensure_collection(collection_name, create) -> bool   exists (after creating it if asked)
+    check()                                               raise if the store is unreachable
+    upsert(collection_name, points)                       points: VectorPoint
+    delete(collection_name, point_ids, project_id)        points of that project (payload project_id)
+    search(collection_name, vector, project_id, limit)    [{"id", "score", "payload"}], best first,
+                                                          only points whose payload project_id matches
+    close()
+
+QdrantVectorBackend talks to a Qdrant server (or its in-process local mode);
+LocalVectorBackend (local_vector_backend) keeps vectors on local disk.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models as qmodels
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Keyword payload indexes every collection gets; search filters on project_id
+PAYLOAD_INDEX_FIELDS = ("project_id", "organization_id", "jira_key")
+
+QUANTIZATION_MODES = ("none", "scalar", "product")
+
+# Collections are created as <name>_v<N> behind an alias <name>, so they can be
+# rebuilt under new storage settings and swapped in (see rebuild_collection)
+VERSION_SUFFIX = re.compile(r"_v(\d+)$")
+
+# Stamped into every point's payload on upsert (Unix time on the writer's
+# clock), so a rebuild can find points changed in place while it was copying
+INDEXED_AT_FIELD = "indexed_at"
+# Allowance for clock differences between writers and the host running a rebuild
+CATCH_UP_MARGIN_SECONDS = 60.0
+# Catch-up passes before deleting a plain collection, until both hold the same points
+LEGACY_CATCH_UP_PASSES = 5
+
+
+class VectorPoint(NamedTuple):
+    id: str
+    vector: List[float]
+    payload: Dict[str, Any]
+
+
+class QdrantVectorBackend:
+    """
+    Stores vectors in Qdrant. Like the Jira client, the Qdrant client is bound
+    to the loop that created it, so one is kept per loop.
+
+    Collections are created with the QDRANT_QUANTIZATION, on-disk and HNSW
+    settings current at the time; rebuild_collection applies changed settings
+    to an existing collection.
+    """
+
+    name = "qdrant"
+    payload_index_fields = PAYLOAD_INDEX_FIELDS
+
+    def __init__(self, vector_size: int, batch_size: int, location: Optional[str] = None) -> None:
+        self.vector_size = vector_size
+        self.batch_size = batch_size
+        # ":memory:" or a path runs Qdrant in-process (benchmarks); otherwise QDRANT_HOST
+        self.location = location
+        self.quantization = settings.QDRANT_QUANTIZATION.lower()
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown Qdrant quantization {self.quantization!r}, expected one of {QUANTIZATION_MODES}"
+            )
+        self.quantization_config = self._quantization_config()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncQdrantClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        """The Qdrant client for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            if self.location:
+                client = AsyncQdrantClient(location=self.location, timeout=settings.QDRANT_TIMEOUT_SECONDS)
+            else:
+                client = AsyncQdrantClient(
+                    host=settings.QDRANT_HOST,
+                    port=settings.QDRANT_PORT,
+                    timeout=settings.QDRANT_TIMEOUT_SECONDS,
+                )
+            self._clients[loop] = client
+        return client
+
+    async def close(self) -> None:
+        """Close the current loop's client"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # pragma: no cover - called outside a loop
+            return
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+    async def check(self) -> None:
+        await self.client.get_collections()
+
+    async def ensure_collection(self, collection_name: str, create: bool) -> bool:
+        """Check a collection, creating it if asked, and add missing payload indexes"""
+        try:
+            info = await self.client.get_collection(collection_name)
+            indexed = set(info.payload_schema or {})
+        except (UnexpectedResponse, ValueError) as exc:
+            if not _collection_missing(exc):
+                raise
+            if self._newest_version(collection_name, await self._collection_names()):
+                # A rebuild deleted the plain collection of this name and has
+                # not created the alias yet; calls use the copy meanwhile
+                # (see _on_collection)
+                return True
+            if not create:
+                return False
+            physical_name = f"{collection_name}_v1"
+            logger.info("Creating Qdrant collection %s as %s", collection_name, physical_name)
+            try:
+                await self._create_physical_collection(physical_name)
+            except Exception:
+                # Another worker may have created it first; pointing the
+                # alias at it again is harmless
+                if physical_name not in await self._collection_names():
+                    raise
+            await self._point_alias(collection_name, physical_name)
+            indexed = set()
+        # Built in the background on existing collections; filtered search
+        # keeps working meanwhile, just unindexed
+        await self._create_payload_indexes(collection_name, indexed, wait=False)
+        return True
+
+    async def upsert(self, collection_name: str, points: List[VectorPoint]) -> None:
+        indexed_at = time.time()
+        structs = [
+            qmodels.PointStruct(
+                id=point.id, vector=point.vector, payload={**point.payload, INDEXED_AT_FIELD: indexed_at}
+            )
+            for point in points
+        ]
+        await self._on_collection(
+            collection_name,
+            lambda name: self.client.upsert(collection_name=name, wait=True, points=structs),
+        )
+
+    async def delete(self, collection_name: str, point_ids: List[str], project_id: str) -> None:
+        # Point ids are unique across projects, so the project is not needed here
+        for start in range(0, len(point_ids), self.batch_size):
+            selector = qmodels.PointIdsList(points=point_ids[start:start + self.batch_size])
+            await self._on_collection(
+                collection_name,
+                lambda name: self.client.delete(collection_name=name, points_selector=selector, wait=True),
+            )
+
+    async def search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        project_id: str,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        # Filter by project_id (a keyword payload index, see PAYLOAD_INDEX_FIELDS)
+        project_filter = qmodels.Filter(
+            must=[
+                qmodels.FieldCondition(
+                    key="project_id",
+                    match=qmodels.MatchValue(value=project_id),
+                )
+            ]
+        )
+        results = await self._on_collection(
+            collection_name,
+            lambda name: self.client.search(
+                collection_name=name,
+                query_vector=vector,
+                query_filter=project_filter,
+                search_params=self._search_params(),
+                limit=limit,
+            ),
+        )
+        return [
+            {
+                "id": hit.id,
+                "score": hit.score,
+                "payload": hit.payload
+            }
+            for hit in results
+        ]
+
+    async def _create_physical_collection(self, collection_name: str) -> None:
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=qmodels.VectorParams(
+                size=self.vector_size,
+                distance=qmodels.Distance.COSINE,
+                on_disk=settings.QDRANT_VECTORS_ON_DISK,
+            ),
+            hnsw_config=qmodels.HnswConfigDiff(
+                m=settings.QDRANT_HNSW_M,
+                ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                on_disk=settings.QDRANT_HNSW_ON_DISK,
+            ),
+            quantization_config=self.quantization_config,
+        )
+
+    def _quantization_config(self) -> Optional[qmodels.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8,
+                    quantile=settings.QDRANT_SCALAR_QUANTILE,
+                    always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+                )
+            )
+        if self.quantization == "product":
+            return qmodels.ProductQuantization(
+                product=qmodels.ProductQuantizationConfig(
+                    compression=qmodels.CompressionRatio(settings.QDRANT_PRODUCT_COMPRESSION.lower()),
+                    always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+                )
+            )
+        return None
+
+    def _search_params(self) -> Optional[qmodels.SearchParams]:
+        quantization = None
+        if self.quantization != "none":
+            quantization = qmodels.QuantizationSearchParams(
+                rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+                oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+            )
+        hnsw_ef = settings.QDRANT_HNSW_EF_SEARCH or None
+        if quantization is None and hnsw_ef is None:
+            return None
+        return qmodels.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+    async def _create_payload_indexes(self, collection_name: str, indexed: set, wait: bool) -> None:
+        for field_name in self.payload_index_fields:
+            if field_name not in indexed:
+                await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=qmodels.PayloadSchemaType.KEYWORD,
+                    wait=wait,
+                )
+
+    async def _on_collection(self, collection_name: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Run ``call`` on a collection name, or on its newest <name>_v<N> if the
+        name does not exist. That is where a plain collection from before
+        aliases lives between rebuild_collection deleting it and creating the
+        alias, so calls keep working through that gap.
+        """
+        try:
+            return await call(collection_name)
+        except (UnexpectedResponse, ValueError) as exc:
+            if not _collection_missing(exc):
+                raise
+            fallback = self._newest_version(collection_name, await self._collection_names())
+            if fallback is None:
+                raise
+            return await call(fallback)
+
+    @staticmethod
+    def _newest_version(collection_name: str, names: set) -> Optional[str]:
+        pattern = re.compile(rf"^{re.escape(collection_name)}_v(\d+)$")
+        versions = {int(match.group(1)): name for name in names if (match := pattern.match(name))}
+        return versions[max(versions)] if versions else None
+
+    async def _point_alias(self, alias_name: str, collection_name: str) -> None:
+        """Create or move an alias in one atomic request"""
+        operations: List[Any] = []
+        if alias_name in await self.aliases():
+            operations.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=alias_name)))
+        operations.append(
+            qmodels.CreateAliasOperation(
+                create_alias=qmodels.CreateAlias(collection_name=collection_name, alias_name=alias_name)
+            )
+        )
+        await self.client.update_collection_aliases(change_aliases_operations=operations)
+
+    async def _collection_names(self) -> set:
+        response = await self.client.get_collections()
+        return {collection.name for collection in response.collections}
+
+    async def aliases(self) -> Dict[str, str]:
+        response = await self.client.get_aliases()
+        return {alias.alias_name: alias.collection_name for alias in response.aliases}
+
+    async def managed_collections(self, base_name: str) -> List[str]:
+        """
+        Names (aliases, or plain collections from before aliases) under
+        ``base_name``: the shared collection and the per-organization ones
+        """
+        names = set(await self.aliases()) | await self._collection_names()
+        pattern = re.compile(rf"^{re.escape(base_name)}(_[0-9a-f]{{32}})?$")
+        return sorted(name for name in names if pattern.match(name))
+
+    async def rebuild_collection(
+        self,
+        collection_name: str,
+        keep_old: bool = False,
+        index_timeout: float = 3600,
+    ) -> str:
+        """
+        Rebuild a collection under the current storage settings while it keeps
+        serving. Points are copied with their vectors (nothing is re-embedded)
+        into <name>_v<N+1>. Once its index is built, points added, changed or
+        deleted during the copy are caught up, the alias is moved to it
+        atomically, and a last catch-up applies writes that reached the old
+        collection just before the move. Returns the new collection's name.
+
+        A plain collection from before aliases is copied into <name>_v1 the
+        same way. Qdrant cannot give an alias the name of an existing
+        collection, so the plain one is deleted only once the copy holds the
+        same points, and the alias is created right after; calls reaching the
+        name in between are served from the copy (_on_collection). A rebuild
+        stopped in that gap is finished by running it again.
+
+        Writes are not blocked, so a few can still be missed: a write the old
+        collection applies after the last catch-up has read it, a write to a
+        plain collection between its last catch-up and its deletion, a point
+        deleted through the alias right after the move that was also written
+        just before it (it comes back), and changes from a writer whose clock
+        is more than CATCH_UP_MARGIN_SECONDS off. Indexing the affected entries
+        again repairs them.
+        """
+        aliases = await self.aliases()
+        names = await self._collection_names()
+        source = aliases.get(collection_name)
+        legacy = source is None and collection_name in names
+        if source is None and not legacy:
+            target = self._newest_version(collection_name, names)
+            if target is None:
+                raise ValueError(f"Qdrant collection {collection_name} not found")
+            await self._point_alias(collection_name, target)
+            logger.info("%s now serves from %s", collection_name, target)
+            return target
+        if legacy:
+            source = collection_name
+        match = VERSION_SUFFIX.search(source)
+        target = f"{collection_name}_v{int(match.group(1)) + 1 if match else 1}"
+        if target in names:
+            logger.info("Dropping %s left over from an earlier rebuild", target)
+            await self.client.delete_collection(target)
+
+        logger.info("Rebuilding %s: copying %s into %s", collection_name, source, target)
+        await self._create_physical_collection(target)
+        await self._create_payload_indexes(target, set(), wait=True)
+        copy_started = time.time()
+        copied = await self._copy_points(source, target)
+        logger.info("Copied %d points into %s, waiting for its index", copied, target)
+        await self._wait_until_indexed(target, index_timeout)
+        since = await self._catch_up(source, target, since=copy_started)
+
+        if legacy:
+            await self._catch_up_until_equal(source, target, since)
+            await self.client.delete_collection(source)
+            await self._point_alias(collection_name, target)
+        else:
+            swapped_at = time.time()
+            await self._point_alias(collection_name, target)
+            # Writes the old collection took before the alias moved
+            await self._catch_up(source, target, since=since, swapped_at=swapped_at)
+        if (await self.aliases()).get(collection_name) != target:
+            raise RuntimeError(f"Alias {collection_name} does not point to {target}; {source} was kept")
+        logger.info("%s now serves from %s", collection_name, target)
+        if not legacy and not keep_old:
+            await self.client.delete_collection(source)
+        return target
+
+    async def _copy_points(self, source: str, target: str) -> int:
+        copied = 0
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=source,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            await self._copy_records(records, target)
+            copied += len(records)
+            if offset is None:
+                return copied
+
+    async def _copy_records(self, records: List[qmodels.Record], target: str) -> None:
+        if not records:
+            return
+        await self.client.upsert(
+            collection_name=target,
+            wait=True,
+            points=[
+                qmodels.PointStruct(id=record.id, vector=record.vector, payload=record.payload)
+                for record in records
+            ],
+        )
+
+    async def _point_stamps(self, collection_name: str) -> Dict[Any, float]:
+        """Write stamps by point id (0 for points written before stamps existed)"""
+        stamps: Dict[Any, float] = {}
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=collection_name,
+                limit=self.batch_size * 16,
+                offset=offset,
+                with_payload=[INDEXED_AT_FIELD],
+                with_vectors=False,
+            )
+            stamps.update((record.id, (record.payload or {}).get(INDEXED_AT_FIELD, 0.0)) for record in records)
+            if offset is None:
+                return stamps
+
+    async def _catch_up(
+        self, source: str, target: str, since: float, swapped_at: Optional[float] = None
+    ) -> float:
+        """
+        Apply what changed in the source since ``since`` to the target: new
+        points, points rewritten in place, and deletions. Once the target is
+        live (``swapped_at`` given) it takes writes of its own, so only points
+        the source wrote recently are copied and only points stamped before the
+        swap are deleted. Returns when this pass started, for the next one.
+        """
+        started = time.time()
+        source_stamps = await self._point_stamps(source)
+        target_stamps = await self._point_stamps(target)
+        recent = since - CATCH_UP_MARGIN_SECONDS
+        copy_ids = [
+            point_id for point_id, stamp in source_stamps.items()
+            if (point_id not in target_stamps and (swapped_at is None or stamp >= recent))
+            or (point_id in target_stamps and stamp >= recent and stamp > target_stamps[point_id])
+        ]
+        removed = [
+            point_id for point_id, stamp in target_stamps.items()
+            if point_id not in source_stamps
+            and (swapped_at is None or stamp < swapped_at - CATCH_UP_MARGIN_SECONDS)
+        ]
+        for start in range(0, len(copy_ids), self.batch_size):
+            records = await self.client.retrieve(
+                collection_name=source,
+                ids=copy_ids[start:start + self.batch_size],
+                with_payload=True,
+                with_vectors=True,
+            )
+            await self._copy_records(records, target)
+        for start in range(0, len(removed), self.batch_size):
+            await self.client.delete(
+                collection_name=target,
+                points_selector=qmodels.PointIdsList(points=removed[start:start + self.batch_size]),
+                wait=True,
+            )
+        logger.info("Caught up %s: %d points copied, %d deleted", target, len(copy_ids), len(removed))
+        return started
+
+    async def _catch_up_until_equal(self, source: str, target: str, since: float) -> None:
+        """Catch up until both hold the same points, before the source is deleted"""
+        for _ in range(LEGACY_CATCH_UP_PASSES):
+            since = await self._catch_up(source, target, since=since)
+            source_count = (await self.client.count(source, exact=True)).count
+            target_count = (await self.client.count(target, exact=True)).count
+            if source_count == target_count:
+                return
+        raise RuntimeError(
+            f"{target} holds {target_count} points and {source} {source_count} after "
+            f"{LEGACY_CATCH_UP_PASSES} catch-up passes; {source} was kept"
+        )
+
+    async def _wait_until_indexed(self, collection_name: str, timeout: float) -> None:
+        """Searches on a collection still building its HNSW graph fall back to full scans"""
+        deadline = time.monotonic() + timeout
+        while True:
+            info = await self.client.get_collection(collection_name)
+            if info.status == qmodels.CollectionStatus.GREEN:
+                return
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{collection_name} is still {info.status.value} after {timeout:.0f} s")
+            await asyncio.sleep(5)
+
+
+def _collection_missing(exc: Exception) -> bool:
+    """
+    Whether a Qdrant error means the collection does not exist: 404 from the
+    server, ValueError from local mode. Anything else (timeouts, refused
+    connections) must not look like a missing collection.
+    """
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code == 404
+    return isinstance(exc, ValueError) and "not found" in str(exc)
@@ -1,42 +1,241 @@
-"""Vectorization and Qdrant indexing for knowledge entries."""
+"""Vectorization and vector-store indexing for knowledge entries."""
 from __future__ import annotations
 
+import array
+import asyncio
+import base64
+import hashlib
 import logging
-from typing import Iterable, List, Optional
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
 
-from litellm import embedding as litellm_embedding
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qmodels
+from litellm import aembedding as litellm_aembedding
+from sqlalchemy import select
 
 from app.core.config import settings
-from app.models import KnowledgeEntry
+from app.core.database import AsyncSessionLocal
+from app.models import KnowledgeEntry, Project
+from app.services.knowledge_base.local_vector_backend import LocalVectorBackend
+from app.services.knowledge_base.vector_backends import QdrantVectorBackend, VectorPoint
+
+try:  # Optional: fall back to a character-based estimate without tiktoken
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover - tiktoken not installed
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on inputs per embedding request accepted by each provider
+PROVIDER_MAX_EMBEDDING_INPUTS = {
+    "openai": 2048,
+    "azure": 2048,
+    "google": 250,
+}
+
+# "shared": one collection, tenants separated by payload filters.
+# "organization": one collection per organization, still filtered by project.
+TENANT_MODES = ("shared", "organization")
+
+# Providers that can return embeddings as base64 float32. Parsing a JSON float
+# list runs on the event loop (~0.1 s per 256x256 batch in the OpenAI SDK);
+# decoding base64 is a single C call.
+BASE64_EMBEDDING_PROVIDERS = {"openai", "azure"}
+
+_token_encoder = None
+_token_encoder_loaded = False
+_token_encoder_lock = threading.Lock()
+
+
+def _get_token_encoder():
+    """
+    Load the tokenizer once. It reads BPE files and may download them, so it
+    is loaded on a worker thread (_load_token_encoder), never on the loop.
+    """
+    global _token_encoder, _token_encoder_loaded
+    if not _token_encoder_loaded:
+        with _token_encoder_lock:
+            if not _token_encoder_loaded:
+                if tiktoken is not None:
+                    try:
+                        _token_encoder = tiktoken.get_encoding("cl100k_base")
+                    except Exception as exc:  # pragma: no cover - offline without cached encoding
+                        logger.warning("Token encoder unavailable, estimating by length: %s", exc)
+                _token_encoder_loaded = True
+    return _token_encoder
+
+
+async def _load_token_encoder() -> None:
+    if not _token_encoder_loaded:
+        await asyncio.to_thread(_get_token_encoder)
+
+
+def _build_vector_backend(location: Optional[str], vector_size: int, batch_size: int):
+    backend = settings.VECTOR_BACKEND.lower()
+    if location or backend != "local":
+        if backend != "qdrant" and not location:
+            # Never fall back to local storage: vectors already in Qdrant would
+            # silently stop being searched
+            logger.warning("Unknown VECTOR_BACKEND %s; using Qdrant", backend)
+        return QdrantVectorBackend(vector_size, batch_size, location=location)
+    logger.info("Storing knowledge vectors locally at %s (VECTOR_BACKEND=local)", settings.LOCAL_VECTOR_DIR)
+    return LocalVectorBackend(
+        settings.LOCAL_VECTOR_DIR,
+        vector_size,
+        hnsw=settings.LOCAL_VECTOR_HNSW,
+        hnsw_min_points=settings.LOCAL_VECTOR_HNSW_MIN_POINTS,
+        hnsw_m=settings.LOCAL_VECTOR_HNSW_M,
+        hnsw_ef_construct=settings.LOCAL_VECTOR_HNSW_EF_CONSTRUCT,
+        hnsw_ef_search=settings.LOCAL_VECTOR_HNSW_EF_SEARCH,
+    )
+
 
 class KnowledgeVectorService:
-    """Generates embeddings using system-level API keys and stores them in Qdrant."""
+    """
+    Generates embeddings using system-level API keys and stores them in a
+    vector backend: Qdrant, or with VECTOR_BACKEND=local an index on local disk
+    (see vector_backends).
+
+    Every network call (embeddings and the vector store) is async so indexing
+    and search never block the event loop.
 
-    def __init__(self) -> None:
+    Nothing connects at construction: a collection is checked (and created if
+    missing) on first use or by ``warm_up``. When the store cannot be reached,
+    calls fail fast for QDRANT_RETRY_SECONDS instead of waiting on the network
+    each time, and RAG search degrades to no results.
+
+    With QDRANT_TENANT_MODE=organization each organization gets its own
+    collection, so a filtered search only scans that organization's points.
+    """
+
+    def __init__(
+        self,
+        location: Optional[str] = None,
+        tenant_mode: Optional[str] = None,
+        session_factory: Callable = AsyncSessionLocal,
+        backend: Any = None,
+    ) -> None:
         self.provider = settings.KNOWLEDGE_EMBEDDING_PROVIDER.lower()
         self.model = settings.KNOWLEDGE_EMBEDDING_MODEL
-        self.client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
         self.collection_name = settings.QDRANT_COLLECTION_NAME
         self.vector_size = settings.QDRANT_VECTOR_SIZE
-        self._ensure_collection()
+        self.upsert_batch_size = max(1, settings.QDRANT_UPSERT_BATCH_SIZE)
+        self.tenant_mode = (tenant_mode or settings.QDRANT_TENANT_MODE).lower()
+        if self.tenant_mode not in TENANT_MODES:
+            raise ValueError(f"Unknown Qdrant tenant mode {self.tenant_mode!r}, expected one of {TENANT_MODES}")
+        # ``location`` (":memory:" or a path) runs Qdrant in-process, for benchmarks
+        self.backend = backend or _build_vector_backend(location, self.vector_size, self.upsert_batch_size)
+        self.session_factory = session_factory
+        self._ready_collections: set = set()
+        # loop -> {(collection, create): bootstrap task}
+        self._bootstraps: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, bool], asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Projects never move between organizations
+        self._project_organizations: Dict[UUID, UUID] = {}
+        self._available: Optional[bool] = None
+        self._last_error: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._retry_at = 0.0
+
+    async def close(self) -> None:
+        """Release the current loop's connection to the vector store"""
+        await self.backend.close()
+
+    def collection_for(self, organization_id: Optional[UUID] = None) -> str:
+        """The collection holding an organization's points"""
+        if self.tenant_mode == "shared":
+            return self.collection_name
+        if organization_id is None:
+            raise ValueError("organization_id is required when QDRANT_TENANT_MODE is 'organization'")
+        return f"{self.collection_name}_{UUID(str(organization_id)).hex}"
 
-    def _ensure_collection(self) -> None:
+    async def warm_up(self) -> Dict[str, Any]:
+        """Connect, bootstrap the collection and load the tokenizer ahead of the first request"""
+        await _load_token_encoder()
         try:
-            self.client.get_collection(self.collection_name)
-        except Exception:  # pragma: no cover - network/collection bootstrap
-            logger.info("Creating Qdrant collection %s", self.collection_name)
-            self.client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config=qmodels.VectorParams(
-                    size=self.vector_size,
-                    distance=qmodels.Distance.COSINE,
-                ),
-            )
+            if self.tenant_mode == "shared":
+                await self._ensure_collection(self.collection_name)
+            else:
+                # Organization collections are created when first indexed into
+                await self._check_connection()
+        except Exception as exc:
+            logger.warning("Vector store warm-up failed, RAG is unavailable for now: %r", exc)
+        return self.health()
+
+    def health(self) -> Dict[str, Any]:
+        """Last known vector store state, without touching the network"""
+        if self._available is None:
+            status = "unknown"
+        else:
+            status = "ok" if self._available else "unavailable"
+        return {
+            "status": status,
+            "backend": self.backend.name,
+            "collection": self.collection_name,
+            "tenant_mode": self.tenant_mode,
+            "checked_at": (
+                datetime.fromtimestamp(self._checked_at, timezone.utc).isoformat()
+                if self._checked_at is not None
+                else None
+            ),
+            "last_error": self._last_error,
+        }
+
+    async def _ensure_collection(self, collection_name: str, create: bool = True) -> bool:
+        """
+        Make sure a collection exists with its payload indexes. With
+        ``create=False`` a missing collection is reported instead of created.
+        """
+        if collection_name in self._ready_collections:
+            return True
+        if time.monotonic() < self._retry_at:
+            raise RuntimeError(f"Vector store unavailable: {self._last_error}")
+        # Concurrent first uses on a loop share one bootstrap per collection
+        loop_bootstraps = self._bootstraps.setdefault(asyncio.get_running_loop(), {})
+        key = (collection_name, create)
+        task = loop_bootstraps.get(key)
+        if task is None:
+            task = asyncio.create_task(self._bootstrap_collection(collection_name, create))
+            loop_bootstraps[key] = task
+            task.add_done_callback(lambda _: loop_bootstraps.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _bootstrap_collection(self, collection_name: str, create: bool) -> bool:
+        try:
+            exists = await self.backend.ensure_collection(collection_name, create)
+        except Exception as exc:
+            self._record_failure(exc)
+            raise
+        if exists:
+            self._ready_collections.add(collection_name)
+        self._record_success()
+        return exists
+
+    async def _check_connection(self) -> None:
+        try:
+            await self.backend.check()
+        except Exception as exc:
+            self._record_failure(exc)
+            raise
+        self._record_success()
+
+    def _record_success(self) -> None:
+        self._available = True
+        self._last_error = None
+        self._checked_at = time.time()
+
+    def _record_failure(self, exc: Exception) -> None:
+        """Fail fast until the retry time, then re-check the collections"""
+        self._ready_collections.clear()
+        self._available = False
+        self._last_error = str(exc) or type(exc).__name__
+        self._checked_at = time.time()
+        self._retry_at = time.monotonic() + settings.QDRANT_RETRY_SECONDS
 
     def _resolve_api_key(self) -> str:
         provider_to_key = {
@@ -51,14 +250,33 @@ class KnowledgeVectorService:
             )
         return api_key
 
-    def index_entries(self, entries: Iterable[KnowledgeEntry]) -> None:
+    async def index_entries(
+        self,
+        entries: Iterable[KnowledgeEntry],
+        cached_vectors: Optional[Dict[str, List[float]]] = None,
+    ) -> Dict[str, List[float]]:
+        """
+        Embed and upsert entries. Documents whose hash is in ``cached_vectors``
+        reuse that vector and skip the embedding API. Returns the newly computed
+        vectors keyed by document hash so the caller can cache them.
+
+        Entries may be ORM rows or lightweight records with the same fields.
+        qdrant_point_id and embedding_model are set on an entry once the
+        vector store has accepted its point, so when a later upsert raises,
+        the entries stored before it are still marked and the rest are not.
+        """
         entries_list = list(entries)
+        new_vectors: Dict[str, List[float]] = {}
         if not entries_list:
-            return
-
-        api_key = self._resolve_api_key()
-        points: List[qmodels.PointStruct] = []
+            return new_vectors
 
+        # Checked before embedding so an unreachable vector store costs no API calls
+        collections = {self.collection_for(entry.organization_id) for entry in entries_list}
+        for collection_name in collections:
+            await self._ensure_collection(collection_name)
+        cached_vectors = cached_vectors or {}
+        points: Dict[str, List[Tuple[KnowledgeEntry, VectorPoint]]] = {name: [] for name in collections}
+        to_embed: List[Tuple[KnowledgeEntry, str]] = []
         for entry in entries_list:
             document = self._build_document(entry)
             if not document.strip():
@@ -66,100 +284,260 @@ class KnowledgeVectorService:
                     "Skipping entry %s due to empty document text", entry.id
                 )
                 continue
-
-            try:
-                response = litellm_embedding(
-                    model=self.model,
-                    input=document,
-                    api_key=api_key,
+            cached_vector = cached_vectors.get(self.document_hash(document))
+            if cached_vector is not None:
+                points[self.collection_for(entry.organization_id)].append(
+                    (entry, self._build_point(entry, cached_vector))
                 )
-            except Exception as exc:  # pragma: no cover - external API error
-                logger.error("Embedding failed for entry %s: %s", entry.id, exc)
-                continue
+            else:
+                to_embed.append((entry, document))
+        reused = sum(len(pending) for pending in points.values())
 
-            embedding_vector = response["data"][0]["embedding"]
-            point_id = str(entry.id)
-            payload = {
-                "entry_id": point_id,
-                "project_id": str(entry.project_id),
-                "organization_id": str(entry.organization_id),
-                "user_story_id": str(entry.user_story_id)
-                if entry.user_story_id
-                else None,
-                "jira_key": entry.jira_key,
-                "priority": entry.priority,
-                "test_type": entry.test_type,
-                "title": entry.title,
-            }
-            points.append(
-                qmodels.PointStruct(
-                    id=point_id,
-                    vector=embedding_vector,
-                    payload=payload,
+        indexed = 0
+        if to_embed:
+            api_key = self._resolve_api_key()
+            await _load_token_encoder()
+            for batch in self._embedding_batches(to_embed):
+                vectors = await self._embed_batch([document for _, document in batch], api_key)
+                for (entry, document), embedding_vector in zip(batch, vectors):
+                    if embedding_vector is None:
+                        continue
+                    new_vectors[self.document_hash(document)] = embedding_vector
+                    points[self.collection_for(entry.organization_id)].append(
+                        (entry, self._build_point(entry, embedding_vector))
+                    )
+                for collection_name, pending in points.items():
+                    while len(pending) >= self.upsert_batch_size:
+                        indexed += await self._upsert_points(collection_name, pending[:self.upsert_batch_size])
+                        del pending[:self.upsert_batch_size]
+        for collection_name, pending in points.items():
+            for start in range(0, len(pending), self.upsert_batch_size):
+                indexed += await self._upsert_points(
+                    collection_name, pending[start:start + self.upsert_batch_size]
                 )
-            )
-            entry.qdrant_point_id = point_id
-            entry.embedding_model = self.model
 
+        logger.info(
+            "Indexed %d knowledge entries into %s (%d reused cached embeddings)",
+            indexed,
+            ", ".join(sorted(collections)),
+            reused,
+        )
+        return new_vectors
+
+    def document_hashes(self, entries: Iterable[KnowledgeEntry]) -> List[str]:
+        """Content hashes of the documents that would be embedded for entries"""
+        return [self.document_hash(self._build_document(entry)) for entry in entries]
+
+    @staticmethod
+    def document_hash(document: str) -> str:
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    def _build_point(self, entry: KnowledgeEntry, embedding_vector: List[float]) -> VectorPoint:
+        point_id = str(entry.id)
+        payload = {
+            "entry_id": point_id,
+            "project_id": str(entry.project_id),
+            "organization_id": str(entry.organization_id),
+            "user_story_id": str(entry.user_story_id)
+            if entry.user_story_id
+            else None,
+            "jira_key": entry.jira_key,
+            "priority": entry.priority,
+            "test_type": entry.test_type,
+            "title": entry.title,
+        }
+        return VectorPoint(id=point_id, vector=embedding_vector, payload=payload)
+
+    async def _upsert_points(
+        self, collection_name: str, points: List[Tuple[KnowledgeEntry, VectorPoint]]
+    ) -> int:
         if not points:
+            return 0
+        try:
+            await self.backend.upsert(collection_name, [point for _, point in points])
+        except Exception as exc:
+            self._record_failure(exc)
+            raise
+        for entry, point in points:
+            entry.qdrant_point_id = point.id
+            entry.embedding_model = self.model
+        return len(points)
+
+    async def delete_points(
+        self, point_ids: List[str], project_id: UUID, organization_id: Optional[UUID] = None
+    ) -> None:
+        """
+        Remove points of one project, in chunks of the upsert batch size.
+        ``organization_id`` selects the collection when collections are per
+        organization.
+        """
+        if not point_ids:
+            return
+        collection_name = self.collection_for(organization_id)
+        if not await self._ensure_collection(collection_name, create=False):
             return
+        try:
+            await self.backend.delete(collection_name, point_ids, str(project_id))
+        except Exception as exc:
+            self._record_failure(exc)
+            raise
 
-        self.client.upsert(
-            collection_name=self.collection_name,
-            wait=True,
-            points=points,
-        )
-        logger.info(
-            "Indexed %d knowledge entries into collection %s",
-            len(points),
-            self.collection_name,
+    def _embedding_batches(
+        self, documents: List[Tuple[KnowledgeEntry, str]]
+    ) -> Iterator[List[Tuple[KnowledgeEntry, str]]]:
+        """Group documents into requests bounded by input count and estimated tokens"""
+        max_inputs = min(
+            settings.KNOWLEDGE_EMBEDDING_BATCH_SIZE,
+            PROVIDER_MAX_EMBEDDING_INPUTS.get(self.provider, settings.KNOWLEDGE_EMBEDDING_BATCH_SIZE),
         )
+        max_tokens = settings.KNOWLEDGE_EMBEDDING_MAX_BATCH_TOKENS
+        batch: List[Tuple[KnowledgeEntry, str]] = []
+        batch_tokens = 0
+        for entry, document in documents:
+            tokens = self._estimate_tokens(document)
+            if batch and (len(batch) >= max_inputs or batch_tokens + tokens > max_tokens):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append((entry, document))
+            batch_tokens += tokens
+        if batch:
+            yield batch
 
-    def search_relevant_entries(
+    async def _embed_batch(self, texts: List[str], api_key: str) -> List[Optional[List[float]]]:
+        """
+        Embed a batch of texts in one request. On failure the batch is split in
+        half and each half retried, so only the failing inputs are dropped.
+        """
+        try:
+            response = await litellm_aembedding(
+                model=self.model,
+                input=texts,
+                api_key=api_key,
+                **self._embedding_options(),
+            )
+        except Exception as exc:  # pragma: no cover - external API error
+            if len(texts) == 1:
+                logger.error("Embedding failed for document: %s", exc)
+                return [None]
+            logger.warning(
+                "Embedding batch of %d failed (%s); retrying in halves", len(texts), exc
+            )
+            middle = len(texts) // 2
+            return await self._embed_batch(texts[:middle], api_key) + await self._embed_batch(
+                texts[middle:], api_key
+            )
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for position, item in enumerate(response["data"]):
+            vectors[item.get("index", position)] = self._decode_embedding(item["embedding"])
+        return vectors
+
+    def _embedding_options(self) -> Dict[str, Any]:
+        if self.provider in BASE64_EMBEDDING_PROVIDERS:
+            return {"encoding_format": "base64"}
+        return {}
+
+    @staticmethod
+    def _decode_embedding(value: Any) -> List[float]:
+        if not isinstance(value, str):
+            return value
+        values = array.array("f")
+        values.frombytes(base64.b64decode(value))
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values.tolist()
+
+    def _estimate_tokens(self, text: str) -> int:
+        encoder = _get_token_encoder()
+        if encoder is not None:
+            return len(encoder.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    async def search_relevant_entries(
         self,
         query: str,
         project_id: UUID,
         limit: int = 5,
     ) -> List[Dict[str, Any]]:
-        """Search for relevant knowledge entries using semantic search."""
+        """
+        Search for relevant knowledge entries using semantic search.
+        Returns no results, rather than raising, when the vector store is down.
+        """
+        try:
+            collection_name = await self._search_collection(project_id)
+        except Exception as exc:
+            logger.warning("Knowledge search skipped: %s", exc)
+            return []
+        if collection_name is None:
+            # Nothing has been indexed for this organization yet
+            return []
         api_key = self._resolve_api_key()
         try:
-            response = litellm_embedding(
+            response = await litellm_aembedding(
                 model=self.model,
                 input=query,
                 api_key=api_key,
+                **self._embedding_options(),
             )
         except Exception as exc:
             logger.error("Embedding failed for search query: %s", exc)
             return []
 
-        embedding_vector = response["data"][0]["embedding"]
-        
-        # Filter by project_id
-        project_filter = qmodels.Filter(
-            must=[
-                qmodels.FieldCondition(
-                    key="project_id",
-                    match=qmodels.MatchValue(value=str(project_id)),
-                )
-            ]
-        )
+        embedding_vector = self._decode_embedding(response["data"][0]["embedding"])
+        return await self._search(collection_name, embedding_vector, project_id, limit)
 
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=embedding_vector,
-            query_filter=project_filter,
-            limit=limit,
-        )
+    async def search_by_vector(
+        self,
+        vector: List[float],
+        project_id: UUID,
+        limit: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """Like search_relevant_entries, for a query that is already embedded"""
+        try:
+            collection_name = await self._search_collection(project_id)
+        except Exception as exc:
+            logger.warning("Knowledge search skipped: %s", exc)
+            return []
+        if collection_name is None:
+            return []
+        return await self._search(collection_name, vector, project_id, limit)
+
+    async def _search_collection(self, project_id: UUID) -> Optional[str]:
+        """The collection to search for a project, or None if it does not exist yet"""
+        if self.tenant_mode == "shared":
+            collection_name = self.collection_name
+        else:
+            collection_name = self.collection_for(await self._organization_for_project(project_id))
+        if not await self._ensure_collection(collection_name, create=False):
+            return None
+        return collection_name
 
-        return [
-            {
-                "id": hit.id,
-                "score": hit.score,
-                "payload": hit.payload
-            }
-            for hit in results
-        ]
+    async def _organization_for_project(self, project_id: UUID) -> UUID:
+        organization_id = self._project_organizations.get(project_id)
+        if organization_id is None:
+            # A short session of its own: callers may be sharing theirs across tasks
+            async with self.session_factory() as db:
+                organization_id = await db.scalar(
+                    select(Project.organization_id).where(Project.id == project_id)
+                )
+            if organization_id is None:
+                raise ValueError(f"Project {project_id} not found")
+            self._project_organizations[project_id] = organization_id
+        return organization_id
+
+    async def _search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        project_id: UUID,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        try:
+            return await self.backend.search(collection_name, vector, str(project_id), limit)
+        except Exception as exc:
+            self._record_failure(exc)
+            logger.warning("Knowledge search failed: %s", exc)
+            return []
 
     def _build_document(self, entry: KnowledgeEntry) -> str:
         parts: List[str] = [entry.title or ""]
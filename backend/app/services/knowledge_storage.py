@@ -4,9 +4,10 @@ from __future__ import annotations
 import logging
 import os
 import re
+import shutil
 from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 from uuid import UUID
 
 from app.core.config import settings
@@ -91,6 +92,32 @@ class KnowledgeStorageClient:
         destination.write_bytes(data)
         return self.build_uri(object_path)
 
+    def upload_file(
+        self, object_path: str, file_obj: BinaryIO, content_type: Optional[str] = None
+    ) -> str:
+        """Stream a file object to storage without reading it into memory."""
+        file_obj.seek(0)
+        if self.bucket_name:
+            bucket = self._get_bucket()
+            blob = bucket.blob(object_path)
+            blob.upload_from_file(file_obj, content_type=content_type)
+            return self.build_uri(object_path)
+
+        destination = self.local_dir / object_path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with destination.open("wb") as handle:
+            shutil.copyfileobj(file_obj, handle)
+        return self.build_uri(object_path)
+
+    def open_stream(self, object_path: str) -> BinaryIO:
+        """Open an object for buffered sequential reads; the caller closes it."""
+        if self.bucket_name:
+            bucket = self._get_bucket()
+            blob = bucket.blob(object_path)
+            return blob.open("rb")
+
+        return (self.local_dir / object_path).open("rb")
+
     def download_bytes(self, object_path: str) -> bytes:
         if self.bucket_name:
             bucket = self._get_bucket()
@@ -0,0 +1,131 @@
+"""Two-tier response cache for LLM completions: in-memory LRU in front of Redis."""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+try:  # Optional at runtime: the cache degrades to memory-only without it
+    from redis import asyncio as redis_asyncio  # type: ignore
+except Exception:  # pragma: no cover - redis client not installed
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """
+    Caches successful completion results by key.
+
+    The memory tier is a per-process LRU bounded by entry count; the Redis tier
+    is shared across workers and survives restarts. Both tiers expire entries
+    after the configured TTL. Redis errors never fail a request: the cache just
+    falls back to the memory tier, and skips Redis for a short cool-down after
+    a failure so an outage does not add a connection attempt to every call.
+    """
+
+    REDIS_RETRY_SECONDS = 30
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: int,
+        max_entries: int,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "llm:completion:",
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self._counters = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "redis_errors": 0}
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        if time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            self._redis = redis_asyncio.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = await client.get(self.key_prefix + key)
+            except Exception as exc:  # pragma: no cover - network errors
+                self._redis_failed()
+                logger.warning("LLM cache read from Redis failed: %s", exc)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._remember(key, value)
+                self._counters["redis_hits"] += 1
+                return value
+
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._remember(key, value)
+        self._counters["stores"] += 1
+
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.set(self.key_prefix + key, json.dumps(value), ex=self.ttl_seconds)
+        except Exception as exc:  # pragma: no cover - network errors
+            self._redis_failed()
+            logger.warning("LLM cache write to Redis failed: %s", exc)
+
+    def _redis_failed(self) -> None:
+        self._counters["redis_errors"] += 1
+        self._redis_disabled_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._counters["memory_hits"] + self._counters["redis_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            **self._counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "redis_enabled": bool(self.redis_url) and redis_asyncio is not None,
+            "redis_available": time.monotonic() >= self._redis_disabled_until,
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+completion_cache = CompletionCache(
+    ttl_seconds=settings.LITELLM_CACHE_TTL,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL if settings.LLM_CACHE_USE_REDIS else None,
+)
@@ -3,21 +3,23 @@ LLM Orchestrator using LiteLLM for multi-provider support
 This is the core AI-agnostic layer that allows users to use any LLM provider
 """
 import litellm
-from litellm import completion, embedding
-from typing import Dict, List, Optional, Any
+from litellm import acompletion
+from typing import AsyncIterator, Dict, List, Optional, Any
 import asyncio
 from functools import lru_cache
 import json
 import hashlib
+import re
+import weakref
 
 from app.core.config import settings
+from app.services.llm_cache import completion_cache
 from cryptography.fernet import Fernet
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Configure LiteLLM
-litellm.cache = litellm.Cache() if settings.LITELLM_CACHE_ENABLED else None
+# Configure LiteLLM (response caching is handled by app.services.llm_cache)
 litellm.set_verbose = settings.DEBUG
 
 
@@ -53,6 +55,19 @@ class LLMOrchestrator:
     def __init__(self):
         self.encryption_key = settings.SECRET_KEY.encode()[:32].ljust(32, b'0')
         self.cipher = Fernet(Fernet.generate_key())  # TODO: Use proper key management
+        # Per-provider caps on in-flight requests, scoped to the event loop that created them
+        self._provider_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    def provider_slot(self, provider: str) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent LLM requests for a provider (LLM_MAX_CONCURRENT_REQUESTS)"""
+        loop_semaphores = self._provider_semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = loop_semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENT_REQUESTS))
+            loop_semaphores[provider] = semaphore
+        return semaphore
     
     def encrypt_api_key(self, api_key: str) -> str:
         """Encrypt user API key"""
@@ -67,6 +82,28 @@ class LLMOrchestrator:
         cache_data = f"{prompt}:{model}:{json.dumps(params, sort_keys=True)}"
         return hashlib.sha256(cache_data.encode()).hexdigest()
     
+    def _api_key_scope(self, user_api_key: Optional[str], provider: str) -> Optional[str]:
+        """
+        Hash of the key a request is made with, so a cached completion is only
+        served to callers holding the same key. None when the user key cannot
+        be decrypted: such requests are not cached.
+        """
+        if user_api_key:
+            try:
+                api_key = self.decrypt_api_key(user_api_key)
+            except Exception:
+                return None
+        else:
+            api_key = f"system:{provider}"
+        return hashlib.sha256(api_key.encode()).hexdigest()
+    
+    @staticmethod
+    def _normalize_prompt(text: Optional[str]) -> Optional[str]:
+        """Collapse whitespace so formatting-only differences share a cache entry"""
+        if text is None:
+            return None
+        return re.sub(r"\s+", " ", text).strip()
+    
     async def generate_completion(
         self,
         prompt: str,
@@ -76,7 +113,8 @@ class LLMOrchestrator:
         temperature: float = 0.7,
         max_tokens: int = 2000,
         system_message: Optional[str] = None,
-        use_system_key_fallback: bool = True
+        use_system_key_fallback: bool = True,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Generate LLM completion with user's API key
@@ -90,10 +128,51 @@ class LLMOrchestrator:
             max_tokens: Maximum tokens
             system_message: System message/instructions
             use_system_key_fallback: Use system key if user key fails
+            use_cache: Serve/store the response in the completion cache
         
         Returns:
-            Dict with response, usage, and metadata
+            Dict with response, usage, and metadata ("cached" is True on cache hits)
         """
+        cache_key = None
+        key_scope = self._api_key_scope(user_api_key, provider) if use_cache else None
+        if use_cache and settings.LITELLM_CACHE_ENABLED and key_scope:
+            supported_models = self.get_supported_models(provider)
+            resolved_model = model or (supported_models[0] if supported_models else None)
+            cache_key = self._get_cache_key(
+                self._normalize_prompt(prompt),
+                resolved_model,
+                {
+                    "provider": provider,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "system_message": self._normalize_prompt(system_message),
+                    "api_key": key_scope,
+                }
+            )
+            cached = await completion_cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True, "cost": 0.0}
+        
+        result = await self._generate_completion_uncached(
+            prompt, user_api_key, provider, model, temperature, max_tokens,
+            system_message, use_system_key_fallback
+        )
+        if cache_key and result.get("success"):
+            await completion_cache.set(cache_key, result)
+        return {**result, "cached": False}
+    
+    async def _generate_completion_uncached(
+        self,
+        prompt: str,
+        user_api_key: str,
+        provider: str,
+        model: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        system_message: Optional[str],
+        use_system_key_fallback: bool
+    ) -> Dict[str, Any]:
+        """Call the provider directly, falling back to the system key on failure"""
         try:
             # Decrypt user API key
             api_key = self.decrypt_api_key(user_api_key) if user_api_key else None
@@ -108,17 +187,17 @@ class LLMOrchestrator:
                 messages.append({"role": "system", "content": system_message})
             messages.append({"role": "user", "content": prompt})
             
-            # Generate completion using LiteLLM
-            response = await asyncio.to_thread(
-                completion,
-                model=model,
-                messages=messages,
-                api_key=api_key,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                timeout=settings.LITELLM_TIMEOUT,
-                num_retries=settings.LITELLM_MAX_RETRIES
-            )
+            # Generate completion using LiteLLM's native async client
+            async with self.provider_slot(provider):
+                response = await acompletion(
+                    model=model,
+                    messages=messages,
+                    api_key=api_key,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=settings.LITELLM_TIMEOUT,
+                    num_retries=settings.LITELLM_MAX_RETRIES
+                )
             
             # Extract response
             content = response.choices[0].message.content
@@ -184,14 +263,14 @@ class LLMOrchestrator:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            response = await asyncio.to_thread(
-                completion,
-                model=model,
-                messages=messages,
-                api_key=system_key,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
+            async with self.provider_slot(provider):
+                response = await acompletion(
+                    model=model,
+                    messages=messages,
+                    api_key=system_key,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
             
             content = response.choices[0].message.content
             usage = response.usage
@@ -217,14 +296,65 @@ class LLMOrchestrator:
                 "provider": provider
             }
     
-    def _has_system_key(self, provider: str) -> bool:
-        """Check if system has API key for provider"""
+    async def stream_completion(
+        self,
+        prompt: str,
+        user_api_key: str,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        system_message: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream LLM completion tokens as they arrive
+        
+        Uses the user's key when configured, otherwise the system key for the provider.
+        Errors are raised to the caller since a partially streamed response cannot
+        be transparently retried.
+        
+        Yields:
+            Content deltas in arrival order
+        """
+        api_key = self.decrypt_api_key(user_api_key) if user_api_key else self._get_system_key(provider)
+        if not model:
+            model = self.SUPPORTED_PROVIDERS[provider]["models"][0]
+        
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+        
+        async with self.provider_slot(provider):
+            response = await acompletion(
+                model=model,
+                messages=messages,
+                api_key=api_key,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=settings.LITELLM_TIMEOUT,
+                num_retries=settings.LITELLM_MAX_RETRIES,
+                stream=True
+            )
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    
+    def _get_system_key(self, provider: str) -> Optional[str]:
+        """Get the system API key for provider, if configured"""
         system_keys = {
             "openai": settings.SYSTEM_OPENAI_API_KEY,
             "anthropic": settings.SYSTEM_ANTHROPIC_API_KEY,
             "google": settings.SYSTEM_GOOGLE_API_KEY
         }
-        return bool(system_keys.get(provider))
+        return system_keys.get(provider) or None
+    
+    def _has_system_key(self, provider: str) -> bool:
+        """Check if system has API key for provider"""
+        return bool(self._get_system_key(provider))
     
     def _calculate_cost(self, provider: str, model: str, usage) -> float:
         """
@@ -280,10 +410,8 @@ class LLMOrchestrator:
             else:
                 completion_kwargs["model"] = test_model
             
-            response = await asyncio.to_thread(
-                completion,
-                **completion_kwargs
-            )
+            async with self.provider_slot(provider):
+                await acompletion(**completion_kwargs)
             
             return {
                 "valid": True,
@@ -0,0 +1,61 @@
+"""Incremental parsing of JSON objects out of a streamed LLM response."""
+import json
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class JSONObjectStreamParser:
+    """
+    Emits each top-level JSON object as soon as its closing brace arrives.
+
+    Text outside objects (array brackets, commas, markdown code fences, prose)
+    is ignored, so the parser works for both a bare JSON array and one wrapped
+    in ```json fences. Braces inside string literals are handled.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return any objects completed by it"""
+        completed: List[Dict[str, Any]] = []
+        for char in text:
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw_object = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        completed.append(json.loads(raw_object))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed streamed object: {e}")
+        return completed
+
+    @property
+    def has_partial_object(self) -> bool:
+        return self._depth > 0
@@ -0,0 +1,142 @@
+"""Background task dispatch with a local in-process backend and a Celery backend."""
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TaskFunc = Callable[..., Awaitable[None]]
+HeartbeatFunc = Callable[[List[str]], Awaitable[None]]
+SweepFunc = Callable[[], Awaitable[None]]
+
+# Registered background tasks by name; the Celery worker exposes each one under the same name
+TASKS: Dict[str, TaskFunc] = {}
+# Local queue only: per task name, stamps the records (first task argument) this process holds
+HEARTBEATS: Dict[str, HeartbeatFunc] = {}
+# Local queue only: recover records whose process stopped stamping them
+SWEEPS: List[SweepFunc] = []
+
+
+def register_task(name: str) -> Callable[[TaskFunc], TaskFunc]:
+    """Register a coroutine function as a background task. Arguments must be strings."""
+    def decorator(func: TaskFunc) -> TaskFunc:
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def register_heartbeat(task_name: str) -> Callable[[HeartbeatFunc], HeartbeatFunc]:
+    """
+    Register a coroutine that stamps the records (ids passed as the task's
+    first argument) of tasks queued or running on this process
+    """
+    def decorator(func: HeartbeatFunc) -> HeartbeatFunc:
+        HEARTBEATS[task_name] = func
+        return func
+    return decorator
+
+
+def register_sweep(func: SweepFunc) -> SweepFunc:
+    """Register a coroutine that recovers records whose heartbeat went stale"""
+    SWEEPS.append(func)
+    return func
+
+
+class LocalTaskQueue:
+    """
+    In-process backend: runs tasks as asyncio tasks on the API event loop (no
+    Redis needed). Tasks stop with the process, so while started it stamps the
+    records its tasks work on every TASK_HEARTBEAT_SECONDS and sweeps records
+    no process has stamped for TASK_STALE_SECONDS. That is safe with several
+    API processes: each only stamps its own.
+    """
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+        # task name -> record ids of tasks queued or running here
+        self._held: Dict[str, Counter] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def enqueue(self, task_name: str, *args: Any) -> None:
+        func = TASKS[task_name]
+        args = tuple(str(arg) for arg in args)
+        task = asyncio.get_running_loop().create_task(func(*args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if args:
+            held = self._held.setdefault(task_name, Counter())
+            held[args[0]] += 1
+            task.add_done_callback(lambda _: self._release(task_name, args[0]))
+
+    def _release(self, task_name: str, record_id: str) -> None:
+        held = self._held[task_name]
+        held[record_id] -= 1
+        if held[record_id] <= 0:
+            del held[record_id]
+
+    def start(self) -> None:
+        """Start stamping and sweeping on the running loop"""
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+
+    async def close(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def _beat(self) -> None:
+        while True:
+            await self.heartbeat()
+            await self.sweep()
+            await asyncio.sleep(settings.TASK_HEARTBEAT_SECONDS)
+
+    async def heartbeat(self) -> None:
+        for task_name, func in HEARTBEATS.items():
+            record_ids = list(self._held.get(task_name, ()))
+            if not record_ids:
+                continue
+            try:
+                await func(record_ids)
+            except Exception as exc:
+                logger.error("Heartbeat for %s failed: %s", task_name, exc)
+
+    async def sweep(self) -> None:
+        for func in SWEEPS:
+            try:
+                await func()
+            except Exception as exc:
+                logger.error("Sweeping stale %s records failed: %s", func.__qualname__, exc)
+
+
+class CeleryTaskQueue:
+    """Dispatches tasks to Celery workers (see app.worker)"""
+
+    name = "celery"
+
+    def enqueue(self, task_name: str, *args: Any) -> None:
+        from app.worker import celery_app
+
+        celery_app.send_task(task_name, args=[str(arg) for arg in args])
+
+    def start(self) -> None:
+        """Workers keep running tasks across API restarts; nothing to stamp or sweep"""
+
+    async def close(self) -> None:
+        pass
+
+
+def _build_task_queue():
+    backend = settings.TASK_QUEUE_BACKEND.lower()
+    if backend == "celery":
+        return CeleryTaskQueue()
+    if backend != "local":
+        logger.warning("Unknown TASK_QUEUE_BACKEND %s; using local backend", backend)
+    return LocalTaskQueue()
+
+
+task_queue = _build_task_queue()
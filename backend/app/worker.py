@@ -0,0 +1,61 @@
+"""
+Celery worker entry point
+
+Run with:
+    celery -A app.worker.celery_app worker --loglevel=info -Q generation,knowledge
+"""
+import asyncio
+import logging
+
+from celery import Celery
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.jira_client import jira_http
+from app.services.jira_tokens import jira_tokens
+from app.services.knowledge_base.vector_service import vector_indexer
+from app.services.llm_cache import completion_cache
+from app.services.task_queue import TASKS, TaskFunc
+# Imported for their register_task side effects
+from app.services import generation_jobs  # noqa: F401
+from app.services.knowledge_base import pipeline  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery(
+    "testgen",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+)
+celery_app.conf.update(
+    task_default_queue="generation",
+    task_routes={"knowledge.*": {"queue": "knowledge"}},
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
+
+
+async def _run_task(func: TaskFunc, *args: str) -> None:
+    try:
+        await func(*args)
+    finally:
+        # Each task runs in a fresh event loop; pooled connections cannot be reused across loops
+        await engine.dispose()
+        await completion_cache.close()
+        await jira_http.close()
+        await jira_tokens.close()
+        await vector_indexer.close()
+
+
+def _make_celery_task(name: str, func: TaskFunc):
+    def run(*args: str) -> None:
+        logger.info("Running task %s%s", name, args)
+        asyncio.run(_run_task(func, *args))
+
+    run.__name__ = name.replace(".", "_")
+    run.__doc__ = func.__doc__
+    return celery_app.task(name=name)(run)
+
+
+for _name, _func in TASKS.items():
+    _make_celery_task(_name, _func)
@@ -0,0 +1,157 @@
+"""
+Benchmark: recursive ADF text extraction vs the iterative renderer
+
+Builds large ADF documents shaped like real Jira descriptions (headings,
+acceptance-criteria lists nested a few levels deep, tables, panels, code,
+mentions and cards) and times the previous recursive extractor against
+app.services.adf in plain-text and Markdown modes. A deeply nested document
+shows where the recursive version hits the recursion limit.
+
+Usage (from backend/):
+    python -m benchmarks.adf_benchmark --documents 200 --sections 40
+"""
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.adf import render_adf
+
+
+def legacy_extract(node: dict) -> Optional[str]:
+    """The recursive extractor JiraService used before app.services.adf"""
+    texts = []
+    if node.get("type") == "text":
+        return node.get("text", "")
+    for item in node.get("content", []):
+        if item.get("type") == "text":
+            texts.append(item.get("text", ""))
+        elif item.get("type") in ["paragraph", "heading", "bulletList", "orderedList", "listItem", "blockquote", "codeBlock", "panel", "table", "tableRow", "tableCell", "tableHeader"]:
+            nested_text = legacy_extract(item)
+            if nested_text:
+                texts.append(nested_text)
+        elif item.get("type") == "hardBreak":
+            texts.append("\n")
+    return "\n".join(filter(None, texts)) if texts else None
+
+
+WORDS = (
+    "user account order payment checkout cart email password reset session token "
+    "admin report export filter search profile invoice refund shipping address"
+).split()
+
+
+def _text(rng: random.Random, words: int = 12, marks: bool = True) -> Dict[str, Any]:
+    node: Dict[str, Any] = {"type": "text", "text": " ".join(rng.choice(WORDS) for _ in range(words))}
+    if marks and rng.random() < 0.2:
+        node["marks"] = [{"type": rng.choice(["strong", "em", "code"])}]
+    return node
+
+
+def _paragraph(rng: random.Random) -> Dict[str, Any]:
+    content: List[Dict[str, Any]] = [_text(rng)]
+    if rng.random() < 0.3:
+        content.append({"type": "mention", "attrs": {"id": "5b10a2844c20165700ede21g", "text": "@Reviewer"}})
+        content.append(_text(rng, 4))
+    if rng.random() < 0.2:
+        content.append({"type": "inlineCard", "attrs": {"url": "https://example.atlassian.net/browse/PROJ-1"}})
+    return {"type": "paragraph", "content": content}
+
+
+def _list(rng: random.Random, depth: int) -> Dict[str, Any]:
+    items = []
+    for _ in range(rng.randint(3, 6)):
+        content: List[Dict[str, Any]] = [_paragraph(rng)]
+        if depth < 3 and rng.random() < 0.3:
+            content.append(_list(rng, depth + 1))
+        items.append({"type": "listItem", "content": content})
+    return {"type": rng.choice(["bulletList", "orderedList"]), "content": items}
+
+
+def _table(rng: random.Random) -> Dict[str, Any]:
+    def row(cell_type: str) -> Dict[str, Any]:
+        return {"type": "tableRow", "content": [
+            {"type": cell_type, "content": [{"type": "paragraph", "content": [_text(rng, 3, False)]}]}
+            for _ in range(4)
+        ]}
+    return {"type": "table", "content": [row("tableHeader")] + [row("tableCell") for _ in range(rng.randint(3, 8))]}
+
+
+def build_document(rng: random.Random, sections: int) -> Dict[str, Any]:
+    content: List[Dict[str, Any]] = []
+    for index in range(sections):
+        content.append({"type": "heading", "attrs": {"level": 3}, "content": [{"type": "text", "text": f"Section {index}"}]})
+        content.append(_paragraph(rng))
+        roll = rng.random()
+        if roll < 0.4:
+            content.append(_list(rng, 1))
+        elif roll < 0.6:
+            content.append(_table(rng))
+        elif roll < 0.8:
+            content.append({"type": "panel", "attrs": {"panelType": "info"}, "content": [_paragraph(rng)]})
+        else:
+            code = "\n".join(f"assert response.status_code == {200 + i}" for i in range(5))
+            content.append({"type": "codeBlock", "attrs": {"language": "python"}, "content": [{"type": "text", "text": code}]})
+    return {"type": "doc", "version": 1, "content": content}
+
+
+def build_deep_document(depth: int) -> Dict[str, Any]:
+    root: Dict[str, Any] = {"type": "doc", "version": 1, "content": []}
+    node = root
+    for _ in range(depth):
+        child: Dict[str, Any] = {"type": "bulletList", "content": [{"type": "listItem", "content": []}]}
+        node["content"].append(child)
+        node = child["content"][0]
+    node["content"].append({"type": "paragraph", "content": [{"type": "text", "text": "leaf"}]})
+    return root
+
+
+def _time(extract: Callable[[dict], Any], documents: List[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for document in documents:
+            extract(document)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _report(label: str, documents: int, megabytes: float, elapsed: float) -> None:
+    print(f"{label:<20} {elapsed * 1000:9.1f} ms  {documents / elapsed:9.0f} docs/s  {megabytes / elapsed:7.1f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=40, help="heading + body sections per document")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per variant; the best is reported")
+    parser.add_argument("--depth", type=int, default=5000, help="nesting depth of the deep document")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    documents = [build_document(rng, args.sections) for _ in range(args.documents)]
+    megabytes = sum(len(render_adf(document) or "") for document in documents) / 1_000_000
+    print(f"{args.documents} documents, {megabytes:.1f} MB of rendered text")
+
+    _report("recursive (legacy)", args.documents, megabytes, _time(legacy_extract, documents, args.repeat))
+    _report("iterative text", args.documents, megabytes, _time(render_adf, documents, args.repeat))
+    _report(
+        "iterative markdown",
+        args.documents,
+        megabytes,
+        _time(lambda document: render_adf(document, markdown=True), documents, args.repeat),
+    )
+
+    deep = build_deep_document(args.depth)
+    try:
+        legacy_extract(deep)
+        print(f"depth {args.depth}: recursive ok")
+    except RecursionError:
+        print(f"depth {args.depth}: recursive raised RecursionError")
+    rendered = render_adf(deep) or ""
+    print(f"depth {args.depth}: iterative ok ({len(rendered)} chars, ends with {rendered.splitlines()[-1].strip()!r})")
+
+
+if __name__ == "__main__":
+    main()
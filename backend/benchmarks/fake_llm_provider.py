@@ -0,0 +1,87 @@
+"""
+Local fake OpenAI-compatible provider used by the benchmarks.
+Responds to chat completions and embeddings after a fixed latency without
+doing any real work.
+"""
+import array
+import asyncio
+import base64
+import hashlib
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_SECONDS = 0.5
+EMBEDDING_DIMENSIONS = 1536
+
+app = FastAPI()
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY_SECONDS)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake-model"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "[]"},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+    }
+
+
+@app.post("/v1/embeddings")
+@app.post("/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    await asyncio.sleep(LATENCY_SECONDS)
+    data = []
+    for index, text in enumerate(inputs):
+        # Deterministic per text so repeated documents get the same vector
+        rng = random.Random(hashlib.sha256(str(text).encode()).digest())
+        # Signed bytes widened to float32 in C: the provider shares the CPU with the
+        # code being benchmarked, so it must stay cheap
+        values = array.array("f", array.array("b", rng.randbytes(EMBEDDING_DIMENSIONS)))
+        if body.get("encoding_format") == "base64":
+            # What the OpenAI SDK asks for by default: little-endian float32
+            vector = base64.b64encode(values.tobytes()).decode()
+        else:
+            vector = values.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+    # A JSONResponse skips FastAPI's per-value jsonable_encoder walk
+    return JSONResponse({
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "fake-embedding"),
+        "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+    })
+
+
+def start_server(port: int, latency: float, embedding_dimensions: int = 1536) -> uvicorn.Server:
+    """Start the fake provider in a background thread and wait until it accepts requests"""
+    global LATENCY_SECONDS, EMBEDDING_DIMENSIONS
+    LATENCY_SECONDS = latency
+    EMBEDDING_DIMENSIONS = embedding_dimensions
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
@@ -0,0 +1,84 @@
+"""
+Benchmark: thread-wrapped LiteLLM completion vs native async completion
+
+Fires N concurrent chat completions at a local fake provider and compares
+asyncio.to_thread(litellm.completion) with the orchestrator's async path
+(litellm.acompletion behind the per-provider semaphore).
+
+Usage (from backend/):
+    python -m benchmarks.llm_async_benchmark --requests 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import litellm  # noqa: E402
+from litellm import acompletion, completion  # noqa: E402
+
+from app.services.llm_orchestrator import llm_orchestrator  # noqa: E402
+from benchmarks.fake_llm_provider import start_server  # noqa: E402
+
+litellm.set_verbose = False
+
+
+def _kwargs(api_base: str, index: int) -> dict:
+    return {
+        "model": "openai/fake-model",
+        "messages": [{"role": "user", "content": f"benchmark request {index}"}],
+        "api_key": "sk-fake",
+        "api_base": api_base,
+        "max_tokens": 10,
+    }
+
+
+async def run_thread_wrapped(api_base: str, requests: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        asyncio.to_thread(completion, **_kwargs(api_base, i)) for i in range(requests)
+    ])
+    return time.perf_counter() - start
+
+
+async def run_native_async(api_base: str, requests: int) -> float:
+    async def _one(i: int):
+        async with llm_orchestrator.provider_slot("openai"):
+            return await acompletion(**_kwargs(api_base, i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_one(i) for i in range(requests)])
+    return time.perf_counter() - start
+
+
+def _report(label: str, requests: int, latency: float, elapsed: float) -> None:
+    print(
+        f"{label:<16} {requests:>6} req  {elapsed:8.2f} s  "
+        f"{requests / elapsed:8.1f} req/s  ({elapsed / latency:5.1f}x single-call latency)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake provider latency in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency)
+    api_base = f"http://127.0.0.1:{args.port}/v1"
+    try:
+        # Warm up connection setup and imports for both paths
+        await run_native_async(api_base, 2)
+        await run_thread_wrapped(api_base, 2)
+
+        print(f"default executor workers: {min(32, (os.cpu_count() or 1) + 4)}")
+        _report("to_thread", args.requests, args.latency, await run_thread_wrapped(api_base, args.requests))
+        _report("acompletion", args.requests, args.latency, await run_native_async(api_base, args.requests))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Benchmark: top-k search on the local vector backend
+
+Writes N synthetic embeddings for one project (noisy copies of topic vectors,
+so near neighbours exist the way they do for similar test cases), plus a
+smaller second project so every search goes through the project_id filter,
+into LocalVectorBackend and times project-filtered top-k search:
+
+  exact      a full scan of the project's memory-mapped rows (NumPy)
+  hnsw       the HNSW index (needs hnswlib), with its recall against exact
+  reopened   a fresh backend on the same directory: the saved index is loaded
+             instead of rebuilt
+
+Exits with status 1 if the best available search is slower than --max-p50-ms
+at the median, so it doubles as a regression check.
+
+Usage (from backend/):
+    python -m benchmarks.local_vector_benchmark --points 100000 --dimensions 1536
+    python -m benchmarks.local_vector_benchmark --points 20000 --dimensions 384 --directory /tmp/vectors
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.knowledge_base.local_vector_backend import LocalVectorBackend, hnswlib
+from app.services.knowledge_base.vector_backends import VectorPoint
+
+COLLECTION = "local_benchmark"
+WRITE_BATCH = 1000
+POINTS_PER_TOPIC = 50
+NOISE = 0.5
+
+
+def _embeddings(rng: np.random.Generator, topics: np.ndarray, count: int) -> np.ndarray:
+    picked = topics[rng.integers(0, len(topics), count)]
+    return picked + NOISE * rng.standard_normal(picked.shape, dtype=np.float32)
+
+
+async def _fill(
+    backend: LocalVectorBackend, project_id: str, points: int, topics: np.ndarray, seed: int
+) -> float:
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    for offset in range(0, points, WRITE_BATCH):
+        vectors = _embeddings(rng, topics, min(WRITE_BATCH, points - offset))
+        await backend.upsert(COLLECTION, [
+            VectorPoint(str(uuid.uuid4()), vector, {"project_id": project_id, "jira_key": f"BENCH-{offset + row}"})
+            for row, vector in enumerate(vectors)
+        ])
+    return time.perf_counter() - start
+
+
+async def _search(
+    backend: LocalVectorBackend, project_id: str, queries: np.ndarray, limit: int
+) -> Tuple[List[float], List[List[str]]]:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = await backend.search(COLLECTION, query, project_id, limit)
+        latencies.append(time.perf_counter() - start)
+        results.append([hit["id"] for hit in hits])
+    return latencies, results
+
+
+async def _wait_for_index(backend: LocalVectorBackend, project_id: str) -> float:
+    segment = backend._segments[(COLLECTION, project_id)]
+    start = time.perf_counter()
+    while segment.index is None:
+        if not segment.building:
+            raise RuntimeError("index build did not start or failed")
+        await asyncio.sleep(0.1)
+    return time.perf_counter() - start
+
+
+def _report(label: str, latencies: List[float], extra: str = "") -> float:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{label:<10} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  {extra}")
+    return p50
+
+
+def _recall(expected: List[List[str]], found: List[List[str]]) -> float:
+    return statistics.mean(len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(expected, found))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000, help="points in the searched project")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--directory", help="keep the files here instead of a temporary directory")
+    parser.add_argument("--max-p50-ms", type=float, default=10.0, help="fail above this median search time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.directory or temporary
+        project_id, other_project_id = str(uuid.uuid4()), str(uuid.uuid4())
+        rng = np.random.default_rng(args.seed)
+        topics = rng.standard_normal((max(1, args.points // POINTS_PER_TOPIC), args.dimensions), dtype=np.float32)
+        exact = LocalVectorBackend(directory, args.dimensions, hnsw=False)
+        await exact.ensure_collection(COLLECTION, True)
+        written = await _fill(exact, project_id, args.points, topics, args.seed + 1)
+        await _fill(exact, other_project_id, max(1, args.points // 10), topics, args.seed + 2)
+        print(
+            f"{args.points} x {args.dimensions} points written in {written:.1f} s "
+            f"({args.points / written:.0f}/s), {directory}"
+        )
+
+        queries = _embeddings(np.random.default_rng(args.seed + 3), topics, args.queries)
+        latencies, expected = await _search(exact, project_id, queries, args.limit)
+        best = _report("exact", latencies)
+
+        if hnswlib is None:
+            print("hnsw       skipped: hnswlib is not installed")
+        else:
+            indexed = LocalVectorBackend(
+                directory, args.dimensions, hnsw_min_points=1, hnsw_ef_search=args.ef_search
+            )
+            # The first search starts the build and scans meanwhile
+            await indexed.search(COLLECTION, queries[0], project_id, args.limit)
+            built = await _wait_for_index(indexed, project_id)
+            latencies, found = await _search(indexed, project_id, queries, args.limit)
+            best = min(best, _report(
+                "hnsw", latencies, f"recall@{args.limit} {_recall(expected, found):.3f}, built in {built:.1f} s"
+            ))
+            await indexed.close()
+
+            reopened = LocalVectorBackend(
+                directory, args.dimensions, hnsw_min_points=1, hnsw_ef_search=args.ef_search
+            )
+            start = time.perf_counter()
+            await reopened.search(COLLECTION, queries[0], project_id, args.limit)
+            loaded = time.perf_counter() - start
+            latencies, found = await _search(reopened, project_id, queries, args.limit)
+            _report(
+                "reopened", latencies, f"recall@{args.limit} {_recall(expected, found):.3f}, first search {loaded:.2f} s"
+            )
+
+    if best > args.max_p50_ms:
+        print(f"FAIL: median search {best:.2f} ms (limit {args.max_p50_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
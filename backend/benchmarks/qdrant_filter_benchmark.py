@@ -0,0 +1,173 @@
+"""
+Benchmark: project-filtered knowledge search latency vs corpus size
+
+Fills Qdrant with synthetic knowledge points spread over organizations and
+projects (random vectors, no embedding calls) and times
+KnowledgeVectorService.search_by_vector, which filters on project_id, for
+each collection layout:
+
+  unindexed      one shared collection without payload indexes (server only)
+  shared         one shared collection with keyword indexes on project_id,
+                 organization_id and jira_key
+  organization   QDRANT_TENANT_MODE=organization: a collection per organization
+
+Without --qdrant-url, Qdrant's local mode stands in for the server. It has
+no payload indexes and evaluates filters by scanning every point, so it
+shows the brute-force cost that the indexes remove, and what sharding by
+organization saves on its own.
+
+Usage (from backend/):
+    python -m benchmarks.qdrant_filter_benchmark --sizes 1000,5000,20000
+    python -m benchmarks.qdrant_filter_benchmark --qdrant-url http://localhost:6333 --sizes 10000,100000,500000
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.knowledge_base.vector_backends import QdrantVectorBackend
+from app.services.knowledge_base.vector_service import KnowledgeVectorService
+
+
+class UnindexedQdrantBackend(QdrantVectorBackend):
+    """The previous bootstrap: a collection without payload indexes"""
+
+    payload_index_fields = ()
+
+
+def _corpus(
+    size: int, organizations: int, projects: int, dimensions: int, rng: random.Random
+) -> Tuple[List[SimpleNamespace], List[List[float]], Dict[uuid.UUID, uuid.UUID]]:
+    organization_ids = [uuid.uuid4() for _ in range(organizations)]
+    project_organizations = {
+        uuid.uuid4(): organization_id for organization_id in organization_ids for _ in range(projects)
+    }
+    project_ids = list(project_organizations)
+    entries, vectors = [], []
+    for index in range(size):
+        project_id = rng.choice(project_ids)
+        entries.append(SimpleNamespace(
+            id=uuid.uuid4(),
+            project_id=project_id,
+            organization_id=project_organizations[project_id],
+            user_story_id=None,
+            jira_key=f"BENCH-{index}",
+            priority="medium",
+            test_type="functional",
+            title=f"Knowledge entry {index}",
+            description=None,
+            steps=None,
+            expected_result=None,
+            qdrant_point_id=None,
+            embedding_model=None,
+        ))
+        vectors.append([rng.uniform(-1, 1) for _ in range(dimensions)])
+    return entries, vectors, project_organizations
+
+
+async def run(
+    service: KnowledgeVectorService,
+    entries: List[SimpleNamespace],
+    vectors: List[List[float]],
+    project_organizations: Dict[uuid.UUID, uuid.UUID],
+    queries: int,
+    limit: int,
+    rng: random.Random,
+) -> dict:
+    # Searches resolve project -> organization from the database; seed that cache
+    service._project_organizations.update(project_organizations)
+    # Every document is "cached", so indexing goes straight to upserts
+    cached = dict(zip(service.document_hashes(entries), vectors))
+    start = time.perf_counter()
+    await service.index_entries(entries, cached_vectors=cached)
+    indexed = time.perf_counter() - start
+
+    project_ids = list(project_organizations)
+    dimensions = len(vectors[0])
+    latencies = []
+    hits = 0
+    for _ in range(queries):
+        query = [rng.uniform(-1, 1) for _ in range(dimensions)]
+        start = time.perf_counter()
+        results = await service.search_by_vector(query, rng.choice(project_ids), limit=limit)
+        latencies.append(time.perf_counter() - start)
+        hits += len(results)
+
+    backend = service.backend
+    if backend.location != ":memory:":
+        collections = {service.collection_for(organization_id) for organization_id in project_organizations.values()}
+        # Collections are created behind aliases of these names
+        for alias_name, collection_name in (await backend.aliases()).items():
+            if alias_name in collections:
+                await backend.client.delete_collection(collection_name)
+    await service.close()
+    latencies.sort()
+    return {
+        "index_s": indexed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "hits": hits / queries,
+    }
+
+
+def _service(cls, tenant_mode: str, qdrant_url: Optional[str]) -> KnowledgeVectorService:
+    backend = cls(settings.QDRANT_VECTOR_SIZE, settings.QDRANT_UPSERT_BATCH_SIZE, location=qdrant_url or ":memory:")
+    service = KnowledgeVectorService(tenant_mode=tenant_mode, backend=backend)
+    service.collection_name = f"filter_benchmark_{uuid.uuid4().hex[:8]}"
+    return service
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="comma-separated corpus sizes")
+    parser.add_argument("--organizations", type=int, default=20)
+    parser.add_argument("--projects", type=int, default=5, help="projects per organization")
+    parser.add_argument("--dimensions", type=int, default=128, help="vector size")
+    parser.add_argument("--queries", type=int, default=20, help="searches per layout and size")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--qdrant-url", help="benchmark against this Qdrant instead of local mode")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Local mode warns on every payload index request
+    logging.getLogger().setLevel(logging.ERROR)
+    settings.QDRANT_VECTOR_SIZE = args.dimensions
+    layouts = [("shared", QdrantVectorBackend, "shared"), ("organization", QdrantVectorBackend, "organization")]
+    if args.qdrant_url:
+        layouts.insert(0, ("unindexed", UnindexedQdrantBackend, "shared"))
+
+    target = args.qdrant_url or "local mode"
+    print(
+        f"{args.organizations} organizations x {args.projects} projects, "
+        f"{args.dimensions} dimensions, {target}"
+    )
+    print(f"{'points':>8}  {'layout':<13} {'index s':>8} {'p50 ms':>8} {'p95 ms':>8} {'hits':>5}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        entries, vectors, project_organizations = _corpus(
+            size, args.organizations, args.projects, args.dimensions, rng
+        )
+        for label, cls, tenant_mode in layouts:
+            result = await run(
+                _service(cls, tenant_mode, args.qdrant_url),
+                entries,
+                vectors,
+                project_organizations,
+                args.queries,
+                args.limit,
+                random.Random(args.seed),
+            )
+            print(
+                f"{size:>8}  {label:<13} {result['index_s']:8.2f} {result['p50_ms']:8.2f} "
+                f"{result['p95_ms']:8.2f} {result['hits']:5.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,240 @@
+"""
+Benchmark: event-loop responsiveness during knowledge indexing and search
+
+Indexes N synthetic knowledge entries and then runs concurrent RAG searches
+through KnowledgeVectorService, against the local fake embedding provider
+(in its own process) and Qdrant. A heartbeat task ticks every few
+milliseconds and records how late each tick fires: that lag is what every
+other request on the worker would see. The same workload is repeated with the
+embedding calls made synchronously (as the service used to) for comparison.
+
+Without --qdrant-url, Qdrant's local mode stands in for the server. Its
+search is plain Python, so it runs on a worker thread the way a real server
+would do that work out of process.
+
+Exits with status 1 if the async service lets the loop stall for longer than
+--max-lag-ms, so it doubles as a regression check.
+
+Usage (from backend/):
+    python -m benchmarks.vector_loop_benchmark --entries 2000 --searches 50 --latency 0.2
+    python -m benchmarks.vector_loop_benchmark --qdrant-url http://localhost:6333
+"""
+import argparse
+import asyncio
+import functools
+import gc
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import litellm  # noqa: E402
+from litellm import embedding as litellm_embedding  # noqa: E402
+from qdrant_client.local.qdrant_local import QdrantLocal  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services.knowledge_base.vector_backends import QdrantVectorBackend  # noqa: E402
+from app.services.knowledge_base.vector_service import KnowledgeVectorService  # noqa: E402
+from benchmarks.fake_llm_provider import start_server  # noqa: E402
+
+litellm.set_verbose = False
+HEARTBEAT_SECONDS = 0.005
+
+
+class BlockingVectorService(KnowledgeVectorService):
+    """The previous behaviour: embeddings requested with the synchronous client"""
+
+    async def _embed_batch(self, texts, api_key):
+        response = litellm_embedding(model=self.model, input=texts, api_key=api_key)
+        return [item["embedding"] for item in response["data"]]
+
+
+class ThreadedLocalQdrant:
+    """
+    Async facade over in-process Qdrant. Calls run one at a time on a single
+    worker thread: a pool of threads scanning payloads in Python would starve
+    the loop of the GIL, which a real server never does.
+    """
+
+    def __init__(self) -> None:
+        self._local = QdrantLocal(":memory:")
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._local, name)
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+        return call
+
+
+def _entries(count: int, project_id: uuid.UUID) -> List[SimpleNamespace]:
+    organization_id = uuid.uuid4()
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            project_id=project_id,
+            organization_id=organization_id,
+            user_story_id=None,
+            jira_key=f"BENCH-{index}",
+            priority="medium",
+            test_type="functional",
+            title=f"Checkout validates payment method {index}",
+            description=f"Verify that order {index} rejects expired cards and keeps the cart intact",
+            steps=[{"action": "Add item to cart"}, {"action": "Pay with expired card", "expected_result": "Error"}],
+            expected_result="Payment is declined with a clear message",
+            qdrant_point_id=None,
+            embedding_model=None,
+        )
+        for index in range(count)
+    ]
+
+
+async def _heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def _service(cls, qdrant_url: Optional[str]) -> KnowledgeVectorService:
+    backend = QdrantVectorBackend(settings.QDRANT_VECTOR_SIZE, settings.QDRANT_UPSERT_BATCH_SIZE, location=qdrant_url)
+    if not qdrant_url:
+        backend._clients[asyncio.get_running_loop()] = ThreadedLocalQdrant()
+    service = cls(backend=backend)
+    service.collection_name = f"loop_benchmark_{uuid.uuid4().hex[:8]}"
+    return service
+
+
+async def run(
+    service: KnowledgeVectorService, entries: List[SimpleNamespace], searches: int, concurrency: int
+) -> dict:
+    project_id = entries[0].project_id
+    # One-off costs (collection bootstrap, tokenizer load) are not loop lag under load
+    await service.index_entries(entries[:1])
+    await service.search_relevant_entries("warm up", project_id, limit=1)
+    # Full collections over the existing heap (litellm's import alone is a few
+    # hundred thousand objects) pause any code for ~0.2 s; that is a process-wide
+    # cost, not a blocking call, so keep it out of the measurement
+    gc.collect()
+    gc.freeze()
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    await asyncio.sleep(0)  # let the heartbeat start before the workload
+
+    start = time.perf_counter()
+    await service.index_entries(entries)
+    indexed = time.perf_counter() - start
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def search(index: int) -> None:
+        async with semaphore:
+            await service.search_relevant_entries(f"expired card checkout {index}", project_id, limit=5)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[search(index) for index in range(searches)])
+    searched = time.perf_counter() - start
+
+    stop.set()
+    await heartbeat
+    gc.unfreeze()
+    if service.backend.location:
+        aliases = await service.backend.aliases()
+        await service.backend.client.delete_collection(aliases[service.collection_name])
+    await service.close()
+    lags.sort()
+    return {
+        "index_s": indexed,
+        "search_s": searched,
+        "max_lag_ms": lags[-1] * 1000 if lags else 0.0,
+        "p99_lag_ms": lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0,
+    }
+
+
+def _serve(port: int, latency: float, dimensions: int) -> None:
+    start_server(port, latency, dimensions)
+    while True:
+        time.sleep(3600)
+
+
+def _start_provider(port: int, latency: float, dimensions: int) -> multiprocessing.Process:
+    """Run the fake provider in its own process so it does not compete for this one's GIL"""
+    process = multiprocessing.Process(target=_serve, args=(port, latency, dimensions), daemon=True)
+    process.start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+
+
+def _report(label: str, result: dict) -> None:
+    print(
+        f"{label:<10} index {result['index_s']:7.2f} s  search {result['search_s']:7.2f} s  "
+        f"loop lag p99 {result['p99_lag_ms']:8.1f} ms  max {result['max_lag_ms']:8.1f} ms"
+    )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--searches", type=int, default=50, help="searches after indexing")
+    parser.add_argument("--concurrency", type=int, default=10, help="searches in flight at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake embedding latency in seconds")
+    parser.add_argument("--dimensions", type=int, default=256, help="embedding size")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--qdrant-url", help="benchmark against this Qdrant instead of local mode")
+    parser.add_argument(
+        "--max-lag-ms", type=float, default=100.0,
+        help="fail above this loop stall (a blocking embedding call stalls for at least --latency)",
+    )
+    args = parser.parse_args()
+
+    provider = _start_provider(args.port, args.latency, args.dimensions)
+    litellm.api_base = f"http://127.0.0.1:{args.port}/v1"
+    settings.SYSTEM_OPENAI_API_KEY = settings.SYSTEM_OPENAI_API_KEY or "sk-fake"
+    settings.KNOWLEDGE_EMBEDDING_PROVIDER = "openai"
+    settings.QDRANT_VECTOR_SIZE = args.dimensions
+    try:
+        with warnings.catch_warnings():
+            # litellm's EmbeddingResponse types embeddings as float lists, so its
+            # logging warns about every base64 response, quoting the value (the
+            # default once-per-location filter never silences it)
+            warnings.filterwarnings(
+                "ignore", message=r"(?s)Pydantic serializer warnings:.*field_name='embedding'", category=UserWarning
+            )
+            project_id = uuid.uuid4()
+            entries = _entries(args.entries, project_id)
+            blocking = await run(
+                _service(BlockingVectorService, args.qdrant_url), entries, args.searches, args.concurrency
+            )
+            _report("blocking", blocking)
+            result = await run(
+                _service(KnowledgeVectorService, args.qdrant_url), entries, args.searches, args.concurrency
+            )
+            _report("async", result)
+    finally:
+        provider.terminate()
+
+    if result["max_lag_ms"] > args.max_lag_ms:
+        print(f"FAIL: event loop stalled for {result['max_lag_ms']:.1f} ms (limit {args.max_lag_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,74 @@
+"""
+Rebuild knowledge vector collections under the current QDRANT_* storage
+settings (quantization, on-disk vectors, HNSW parameters) while they serve.
+
+Each collection is copied into a new version and swapped in behind its alias
+once indexed; searches and indexing keep using the old one until then. Writes
+are not paused: changes made during the copy are caught up, but a write landing
+right at the swap can still be missed (see QdrantVectorBackend.rebuild_collection),
+so run it when indexing is quiet. A run interrupted after deleting a plain
+collection from before aliases is finished by running it again.
+
+Usage (from backend/):
+    python migrate_vector_collection.py              # every knowledge collection
+    python migrate_vector_collection.py test_cases --keep-old
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add current directory to path to ensure app package is found
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services.knowledge_base.vector_service import KnowledgeVectorService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def migrate(collections, keep_old: bool, index_timeout: float, dry_run: bool) -> None:
+    service = KnowledgeVectorService()
+    backend = service.backend
+    if backend.name != "qdrant":
+        logger.error(
+            "Knowledge vectors are not stored in Qdrant (VECTOR_BACKEND=%s); nothing to rebuild",
+            settings.VECTOR_BACKEND,
+        )
+        return
+    try:
+        names = collections or await backend.managed_collections(service.collection_name)
+        if not names:
+            logger.info("No knowledge collections to rebuild")
+            return
+        logger.info(
+            "Storage: quantization=%s, vectors on disk=%s, HNSW m=%d ef_construct=%d on disk=%s",
+            backend.quantization,
+            settings.QDRANT_VECTORS_ON_DISK,
+            settings.QDRANT_HNSW_M,
+            settings.QDRANT_HNSW_EF_CONSTRUCT,
+            settings.QDRANT_HNSW_ON_DISK,
+        )
+        for name in names:
+            if dry_run:
+                logger.info("Would rebuild %s", name)
+                continue
+            await backend.rebuild_collection(name, keep_old=keep_old, index_timeout=index_timeout)
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collections", nargs="*", help="collection (alias) names; default: all knowledge collections")
+    parser.add_argument("--keep-old", action="store_true", help="keep the previous version for rollback")
+    parser.add_argument(
+        "--index-timeout", type=float, default=3600,
+        help="seconds to wait for the new collection's index before giving up",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="list the collections that would be rebuilt")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.collections, args.keep_old, args.index_timeout, args.dry_run))
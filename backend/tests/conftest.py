@@ -0,0 +1,83 @@
+"""
+Shared test fixtures.
+
+Database tests run against DATABASE_URL (the CI Postgres service); they are
+skipped when it cannot be reached. Knowledge vectors use the local backend,
+and local file storage and the local vector index are redirected to a
+temporary directory before the app is imported.
+"""
+import os
+import tempfile
+import uuid
+
+_data_dir = tempfile.mkdtemp(prefix="testgen-tests-")
+os.environ.setdefault("KNOWLEDGE_BASE_LOCAL_DIR", os.path.join(_data_dir, "knowledge"))
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_VECTOR_DIR", os.path.join(_data_dir, "vectors"))
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.models import Organization, Project, User  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def db():
+    """A session on a database with every table created; tests use fresh ids instead of cleanup"""
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+    except Exception as exc:
+        await engine.dispose()
+        pytest.skip(f"database not available: {exc}")
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        await session.close()
+        await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db):
+    """Sessions on the test database, for code that opens its own (AsyncSessionLocal)"""
+    return async_sessionmaker(db.bind, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def user(db):
+    organization = Organization(id=uuid.uuid4(), name="Test organization")
+    db.add(organization)
+    await db.flush()
+    user = User(
+        id=uuid.uuid4(),
+        email=f"qa-{uuid.uuid4().hex[:8]}@example.com",
+        hashed_password="not-a-hash",
+        organization_id=organization.id,
+        jira_access_token="jira-token",
+        jira_cloud_id=f"cloud-{uuid.uuid4().hex[:8]}",
+    )
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest_asyncio.fixture
+async def project(db, user):
+    project = Project(
+        id=uuid.uuid4(),
+        name="Checkout",
+        # Jira keys are unique across the whole database, which tests share
+        jira_project_key="T" + uuid.uuid4().hex[:6].upper(),
+        organization_id=user.organization_id,
+        created_by=user.id,
+    )
+    db.add(project)
+    await db.commit()
+    return project
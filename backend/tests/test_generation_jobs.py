@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models import GenerationJob, GenerationJobKind, GenerationJobStatus, UserStory
+from app.services import generation_jobs as jobs_module
+from app.services import task_queue as queue_module
+from app.services.task_queue import LocalTaskQueue
+
+
+@pytest.fixture
+def jobs_db(session_factory, monkeypatch):
+    monkeypatch.setattr(jobs_module, "AsyncSessionLocal", session_factory)
+    return session_factory
+
+
+async def _job(db, project, user, heartbeat_at):
+    story = UserStory(id=uuid.uuid4(), project_id=project.id, name="Reject expired cards")
+    db.add(story)
+    job = GenerationJob(
+        project_id=project.id,
+        user_story_id=story.id,
+        created_by=user.id,
+        kind=GenerationJobKind.STORY.value,
+        status=GenerationJobStatus.RUNNING.value,
+        heartbeat_at=heartbeat_at,
+    )
+    db.add(job)
+    await db.commit()
+    return job.id
+
+
+async def _status(db, job_id):
+    result = await db.execute(
+        select(GenerationJob).where(GenerationJob.id == job_id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one().status
+
+
+@pytest.mark.asyncio
+async def test_sweep_fails_only_jobs_with_stale_heartbeat(db, project, user, jobs_db):
+    now = datetime.now(timezone.utc)
+    # Held by another live API process
+    live = await _job(db, project, user, now - timedelta(seconds=5))
+    # Its process stopped stamping it
+    orphaned = await _job(db, project, user, now - timedelta(hours=1))
+
+    await jobs_module.fail_interrupted_jobs()
+
+    assert await _status(db, live) == GenerationJobStatus.RUNNING.value
+    assert await _status(db, orphaned) == GenerationJobStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+async def test_local_queue_stamps_jobs_it_runs(db, project, user, jobs_db, monkeypatch):
+    job_id = await _job(db, project, user, datetime.now(timezone.utc) - timedelta(hours=1))
+    release = asyncio.Event()
+
+    async def run(job_id):
+        await release.wait()
+
+    monkeypatch.setitem(queue_module.TASKS, jobs_module.RUN_GENERATION_JOB, run)
+    queue = LocalTaskQueue()
+    queue.enqueue(jobs_module.RUN_GENERATION_JOB, job_id)
+    await queue.heartbeat()
+    await queue.sweep()
+
+    # Stamped by this process, so the sweep leaves it running
+    assert await _status(db, job_id) == GenerationJobStatus.RUNNING.value
+    release.set()
+    await asyncio.wait(set(queue._tasks))
+    await asyncio.sleep(0)
+    assert not queue._held[jobs_module.RUN_GENERATION_JOB]
@@ -0,0 +1,68 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from app.services.jira_client import JiraHttpClient
+
+
+@pytest.fixture
+def client():
+    return JiraHttpClient(
+        http2=False,
+        max_connections_per_host=2,
+        max_keepalive_connections=2,
+        timeout=5.0,
+        max_retries=3,
+        backoff_seconds=0.5,
+        max_backoff_seconds=60.0,
+    )
+
+
+@pytest.fixture
+def non_utc_host():
+    """Run with a local timezone far from UTC, as on a host not configured for UTC"""
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Los_Angeles"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def _response(retry_after):
+    return httpx.Response(429, headers={"Retry-After": retry_after})
+
+
+def test_retry_after_seconds(client):
+    assert client._retry_after(_response("7")) == 7.0
+
+
+def test_retry_after_http_date(client, non_utc_host):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = client._retry_after(_response(format_datetime(retry_at, usegmt=True)))
+    assert 28 <= delay <= 30
+
+
+def test_retry_after_date_without_zone_is_utc(client, non_utc_host):
+    # "-0000" parses to a naive datetime, which must not be read as local time
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = client._retry_after(_response(retry_at.strftime("%a, %d %b %Y %H:%M:%S -0000")))
+    assert 28 <= delay <= 30
+
+
+def test_retry_after_is_clamped(client):
+    assert client._retry_after(_response("3600")) == 60.0
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert client._retry_after(_response(format_datetime(past, usegmt=True))) == 0.0
+
+
+@pytest.mark.parametrize("value", ["soon", "nan"])
+def test_retry_after_unparseable(client, value):
+    assert client._retry_after(_response(value)) is None
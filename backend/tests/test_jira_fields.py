@@ -0,0 +1,57 @@
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import jira_service as jira_module
+from app.services.jira_service import JiraService
+
+FIELDS = [
+    {"id": "customfield_10010", "name": "Acceptance Criteria", "custom": True, "schema": {"type": "string"}},
+    {"id": "customfield_10011", "name": "Acceptance criteria (template)", "custom": True, "schema": {"type": "option"}},
+    {
+        "id": "customfield_10012",
+        "name": "Definition of Done",
+        "custom": True,
+        "schema": {"type": "array", "items": "option"},
+    },
+    {"id": "customfield_10013", "name": "Requirement owners", "custom": True, "schema": {"type": "array", "items": "user"}},
+    {"id": "customfield_10014", "name": "Story points", "custom": True, "schema": {"type": "number"}},
+    {"id": "customfield_10015", "name": "Scenario date", "custom": True, "schema": {"type": "date"}},
+    {"id": "description", "name": "Description", "custom": False, "schema": {"type": "string"}},
+]
+
+
+@pytest.fixture
+def field_list(monkeypatch):
+    async def get(url, **kwargs):
+        return httpx.Response(200, json=FIELDS)
+
+    monkeypatch.setattr(jira_module, "jira_http", SimpleNamespace(get=get))
+
+
+def _user():
+    return SimpleNamespace(jira_cloud_id=f"cloud-{uuid.uuid4().hex[:8]}")
+
+
+@pytest.mark.asyncio
+async def test_discovers_text_option_and_option_list_fields(field_list):
+    fields = await JiraService()._discover_description_fields(_user(), "token")
+    assert fields == ["customfield_10010", "customfield_10011", "customfield_10012"]
+
+
+@pytest.mark.asyncio
+async def test_discovered_types_are_configurable(field_list, monkeypatch):
+    monkeypatch.setattr(jira_module.settings, "JIRA_DESCRIPTION_FIELD_TYPES", "string")
+    fields = await JiraService()._discover_description_fields(_user(), "token")
+    assert fields == ["customfield_10010"]
+
+
+def test_option_fields_render_into_description():
+    description = JiraService()._build_story_description({
+        "customfield_10011": {"value": "Declined payments show a message"},
+        "customfield_10012": [{"value": "Reviewed by QA"}, {"value": "Covered by regression tests"}],
+    })
+    assert "Declined payments show a message" in description
+    assert "Reviewed by QA, Covered by regression tests" in description
@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import JiraSyncState, UserStory
+from app.services.jira_service import _as_utc, jira_service
+
+ACCEPTANCE_FIELD = "customfield_10010"
+
+
+def _issue(key, summary, acceptance):
+    return {
+        "key": key,
+        "fields": {
+            "summary": summary,
+            "description": "As a shopper I want expired cards rejected",
+            ACCEPTANCE_FIELD: acceptance,
+            "issuetype": {"name": "Story"},
+            "status": {"name": "In Progress"},
+            "updated": "2024-05-01T10:15:30.000+0000",
+        },
+    }
+
+
+@pytest.fixture
+def jira(monkeypatch):
+    """Jira as seen by sync: one discovered description field and a scripted /search/jql"""
+    calls = {"fields": [], "issues": [], "jql": []}
+
+    async def token(user, db):
+        return "jira-token"
+
+    async def discover(user, access_token):
+        return [ACCEPTANCE_FIELD]
+
+    async def search(jql, user, access_token, fields, page_size=None):
+        calls["fields"].append(fields)
+        calls["jql"].append(jql)
+        if "issuetype = Story" in jql:
+            yield calls["issues"]
+
+    monkeypatch.setattr(jira_service, "_get_valid_token", token)
+    monkeypatch.setattr(jira_service, "_discover_description_fields", discover)
+    monkeypatch.setattr(jira_service, "search_issue_pages", search)
+    return calls
+
+
+@pytest.fixture
+def new_york_host():
+    """Run with the process in a timezone behind UTC"""
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    yield
+    if previous is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+@pytest.mark.asyncio
+async def test_delta_sync_keeps_custom_field_description(db, project, user, jira):
+    key = f"{project.jira_project_key}-1"
+    acceptance = "Given an expired card, the payment is declined with a message"
+    jira["issues"] = [_issue(key, "Reject expired cards", acceptance)]
+    await jira_service.sync_project_features(project.id, db, user)
+
+    jira["issues"] = [_issue(key, "Reject expired cards at checkout", acceptance)]
+    report = await jira_service.sync_project_features(project.id, db, user)
+
+    assert report["mode"] == "delta"
+    assert report["updated"] == 1
+    assert all(ACCEPTANCE_FIELD in fields for fields in jira["fields"])
+    story = (await db.execute(select(UserStory).where(UserStory.jira_key == key))).scalar_one()
+    await db.refresh(story)
+    assert story.name == "Reject expired cards at checkout"
+    assert acceptance in story.description
+    assert story.description == jira_service._build_story_description(jira["issues"][0]["fields"])
+
+
+@pytest.mark.asyncio
+async def test_watermark_round_trips_as_utc_on_non_utc_host(db, project, user, jira, new_york_host):
+    jira["issues"] = [_issue(f"{project.jira_project_key}-1", "Reject expired cards", "Declined")]
+    await jira_service.sync_project_features(project.id, db, user)
+
+    state = (await db.execute(
+        select(JiraSyncState)
+        .where(JiraSyncState.project_id == project.id)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+    updated = datetime(2024, 5, 1, 10, 15, 30, tzinfo=timezone.utc)
+    assert _as_utc(state.updated_watermark) == updated
+
+    jira["jql"].clear()
+    await jira_service.sync_project_features(project.id, db, user)
+
+    # The delta window reaches back to the watermark, not the watermark shifted by the host's offset
+    minutes = int(jira["jql"][0].split("updated >= -")[1].split("m")[0])
+    expected = (datetime.now(timezone.utc) - updated).total_seconds() / 60 + settings.JIRA_SYNC_WATERMARK_OVERLAP_MINUTES
+    assert abs(minutes - expected) < 2
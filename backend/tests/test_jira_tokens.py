@@ -0,0 +1,88 @@
+import time
+import uuid
+
+import pytest
+
+from app.services import jira_tokens as tokens_module
+from app.services.jira_tokens import JiraTokenManager
+
+
+class FakeRedis:
+    """The Redis calls the token manager makes, over a dict (expiry is not modelled)"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def delete(self, key):
+        return int(self.values.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, value):
+        assert script == tokens_module.RELEASE_LOCK_SCRIPT
+        if self.values.get(key) == value.encode():
+            del self.values[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    manager = JiraTokenManager(refresh_margin_seconds=60, lock_seconds=5, redis_url="redis://test")
+    monkeypatch.setattr(manager, "_get_redis", lambda: fake)
+    return manager, fake
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_encrypted_in_redis(redis):
+    manager, fake = redis
+    user_id = uuid.uuid4()
+    await manager.store(user_id, {"access_token": "access-secret", "refresh_token": "refresh-secret"})
+
+    stored = fake.values[manager._key(user_id)]
+    assert b"refresh-secret" not in stored and b"access-secret" not in stored
+
+    # Another process reads it back
+    other = JiraTokenManager(refresh_margin_seconds=60, lock_seconds=5, redis_url="redis://test")
+    other._get_redis = lambda: fake
+    entry = await other._cached(user_id)
+    assert entry["refresh_token"] == "refresh-secret"
+
+
+@pytest.mark.asyncio
+async def test_refresh_does_not_release_a_lock_taken_over_by_another_worker(redis, monkeypatch):
+    manager, fake = redis
+    user_id = uuid.uuid4()
+    lock_key = manager._key(user_id) + ":refresh"
+
+    async def slow_refresh(user_id, stale):
+        # Our lock expired meanwhile and another worker took it
+        fake.values[lock_key] = b"other-worker"
+        return {"access_token": "new", "refresh_token": "r2", "expires_at": time.time() + 3600}
+
+    monkeypatch.setattr(manager, "_refresh_now", slow_refresh)
+    await manager._refresh(user_id, {"access_token": "old", "refresh_token": "r1", "expires_at": 0})
+
+    assert fake.values[lock_key] == b"other-worker"
+
+
+@pytest.mark.asyncio
+async def test_refresh_releases_its_own_lock(redis, monkeypatch):
+    manager, fake = redis
+    user_id = uuid.uuid4()
+
+    async def refresh(user_id, stale):
+        return {"access_token": "new", "refresh_token": "r2", "expires_at": time.time() + 3600}
+
+    monkeypatch.setattr(manager, "_refresh_now", refresh)
+    await manager._refresh(user_id, {"access_token": "old", "refresh_token": "r1", "expires_at": 0})
+
+    assert manager._key(user_id) + ":refresh" not in fake.values
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.v1 import jira as jira_api
+from app.main import app
+from app.models import UserStory
+from app.services.jira_service import DELETED_IN_JIRA, jira_service
+from app.services.jira_webhooks import JiraWebhookProcessor
+
+FIXTURES = Path(__file__).parent / "fixtures" / "jira"
+SECRET = "webhook-secret"
+ACCEPTANCE_FIELD = "customfield_10010"
+
+
+def recorded(name, project_key):
+    """A recorded Jira payload, moved into the test project's Jira key"""
+    text = (FIXTURES / name).read_text()
+    return json.loads(text.replace('"PAY-', f'"{project_key}-').replace('"PAY"', f'"{project_key}"'))
+
+
+def sign(body):
+    return "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def install_processor(monkeypatch, session_factory):
+    processor = JiraWebhookProcessor(
+        secret=SECRET,
+        # Nothing is applied until flush(), so tests control when the upsert happens
+        coalesce_seconds=3600,
+        dedupe_ttl_seconds=3600,
+        session_factory=session_factory,
+    )
+    monkeypatch.setattr(jira_api, "jira_webhooks", processor)
+    return processor
+
+
+def no_database():
+    raise AssertionError("this test must not apply events")
+
+
+@pytest_asyncio.fixture
+async def receiver(monkeypatch):
+    """A processor for tests of the endpoint alone: events are received, never applied"""
+    processor = install_processor(monkeypatch, no_database)
+    yield processor
+    for timer in processor._timers.values():
+        timer.cancel()
+
+
+@pytest_asyncio.fixture
+async def processor(db, user, monkeypatch):
+    processor = install_processor(monkeypatch, async_sessionmaker(db.bind, expire_on_commit=False))
+    # The site's discovered description fields, as an import would have cached them
+    monkeypatch.setitem(
+        jira_service._description_fields, user.jira_cloud_id, (time.monotonic() + 3600, [ACCEPTANCE_FIELD])
+    )
+    yield processor
+    await processor.flush()
+
+
+async def post(body, signature, identifier="delivery-1"):
+    headers = {"X-Hub-Signature": signature, "X-Atlassian-Webhook-Identifier": identifier}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post("/api/v1/jira/webhook", content=body, headers=headers)
+
+
+async def story(db, jira_key):
+    # Written by the processor's own sessions
+    result = await db.execute(
+        select(UserStory).where(UserStory.jira_key == jira_key).execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+@pytest.mark.asyncio
+async def test_rejects_bad_signature(receiver):
+    body = json.dumps(recorded("issue_updated.json", "PAY")).encode()
+
+    assert (await post(body, "sha256=" + "0" * 64)).status_code == 401
+    assert (await post(body, sign(body + b" "))).status_code == 401
+    assert (await post(body, sign(body).replace("sha256", "sha1"))).status_code == 401
+    assert receiver.stats()["received"] == 0
+
+    response = await post(body, sign(body))
+    assert response.status_code == 202
+    assert response.json() == {"status": "accepted"}
+
+
+@pytest.mark.asyncio
+async def test_rejects_signed_body_that_is_not_json(receiver):
+    body = b"{not json"
+
+    assert (await post(body, sign(body))).status_code == 400
+    assert receiver.stats()["received"] == 0
+
+
+@pytest.mark.asyncio
+async def test_duplicate_deliveries_are_dropped(receiver):
+    body = json.dumps(recorded("issue_updated.json", "PAY")).encode()
+
+    first = await post(body, sign(body), identifier="delivery-42")
+    retried = await post(body, sign(body), identifier="delivery-42")
+
+    assert first.json() == {"status": "accepted"}
+    assert retried.json() == {"status": "duplicate"}
+    assert receiver.stats()["duplicates"] == 1
+
+
+@pytest.mark.asyncio
+async def test_burst_for_one_issue_is_applied_once(db, processor, project):
+    for index, summary in enumerate(["Draft", "Reject expired cards", "Reject expired cards at checkout"]):
+        payload = recorded("issue_updated.json", project.jira_project_key)
+        payload["timestamp"] += index
+        payload["issue"]["fields"]["summary"] = summary
+        result = await processor.receive(payload, f"delivery-{index}")
+        assert result == ("accepted" if index == 0 else "coalesced")
+
+    await processor.flush()
+
+    stats = processor.stats()
+    assert (stats["coalesced"], stats["applied"], stats["pending"]) == (2, 1, 0)
+    saved = await story(db, f"{project.jira_project_key}-101")
+    assert saved.name == "Reject expired cards at checkout"
+
+
+@pytest.mark.asyncio
+async def test_update_upserts_story_with_import_fields(db, processor, project):
+    payload = recorded("issue_updated.json", project.jira_project_key)
+    await processor.apply(payload)
+
+    saved = await story(db, f"{project.jira_project_key}-101")
+    assert saved.project_id == project.id
+    assert saved.name == "Reject expired cards at checkout"
+    assert saved.jira_status == "In Progress"
+    assert saved.jira_type == "story"
+    assert "expired cards rejected before the order is placed" in saved.description
+    assert "declined with a clear message" in saved.description
+    # Only the discovered description fields are used, as on import
+    assert "triage note" not in saved.description
+    assert saved.description == jira_service._build_story_description(
+        {key: value for key, value in payload["issue"]["fields"].items() if key != "customfield_10035"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_delete_keeps_story_and_marks_it(db, processor, project):
+    await processor.apply(recorded("issue_updated.json", project.jira_project_key))
+    await processor.apply(recorded("issue_deleted.json", project.jira_project_key))
+
+    saved = await story(db, f"{project.jira_project_key}-101")
+    assert saved.jira_status == DELETED_IN_JIRA
+    assert saved.name == "Reject expired cards at checkout"
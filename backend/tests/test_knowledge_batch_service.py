@@ -0,0 +1,169 @@
+import io
+import uuid
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models import KnowledgeEntry, KnowledgeEntryStatus
+from app.services.knowledge_base import batch_service as batch_module
+from app.services.knowledge_base import parser as parser_module
+from app.services.knowledge_base import vector_service as vector_module
+from app.services.knowledge_base.batch_service import KnowledgeBatchService, KnowledgeIngestMode
+from app.services.knowledge_base.local_vector_backend import LocalVectorBackend
+from app.services.knowledge_base.vector_service import KnowledgeVectorService
+
+CSV = b"jira_key,title,expected_result\nPAY-1,Expired card is declined,Error shown\n"
+TWO_ROWS_CSV = CSV + b"PAY-2,Saved card is charged,Receipt shown\n"
+DIMENSIONS = 4
+
+
+class FlakyIndexer:
+    """Stands in for vector_indexer.index_entries: fails while ``failing`` is set"""
+
+    def __init__(self):
+        self.failing = True
+        self.indexed = []
+
+    async def index_entries(self, entries, cached_vectors=None):
+        if self.failing:
+            raise ConnectionError("Qdrant unavailable")
+        for entry in entries:
+            entry.qdrant_point_id = str(uuid.uuid4())
+            entry.embedding_model = "test-embedding"
+            self.indexed.append(entry.id)
+        return {}
+
+
+class FailingUpsertBackend(LocalVectorBackend):
+    """A local backend whose upserts fail from the ``fail_from``-th call on"""
+
+    def __init__(self, directory, fail_from):
+        super().__init__(directory, DIMENSIONS, hnsw=False)
+        self.fail_from = fail_from
+        self.upserts = 0
+
+    async def upsert(self, collection_name, points):
+        self.upserts += 1
+        if self.fail_from is not None and self.upserts >= self.fail_from:
+            raise ConnectionError("Qdrant unavailable")
+        await super().upsert(collection_name, points)
+
+
+async def fake_embeddings(model, input, api_key, **kwargs):
+    return {"data": [{"index": index, "embedding": [1.0] * DIMENSIONS} for index, _ in enumerate(input)]}
+
+
+async def _upload(service, project, user, mode, content=CSV):
+    batch = await service.create_batch(
+        project=project, user=user, file_name="cases.csv", file_type="csv", file_size_bytes=len(content)
+    )
+    await service.db.commit()
+    service.upload_original_file(batch, file_obj=io.BytesIO(content))
+    return await service.process_batch(batch, mode)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", list(KnowledgeIngestMode))
+async def test_reupload_after_failed_indexing_reindexes_row(db, project, user, monkeypatch, mode):
+    indexer = FlakyIndexer()
+    monkeypatch.setattr(batch_module.vector_indexer, "index_entries", indexer.index_entries)
+    service = KnowledgeBatchService(db)
+
+    await _upload(service, project, user, mode)
+    entry = (await db.execute(
+        select(KnowledgeEntry).where(KnowledgeEntry.project_id == project.id)
+    )).scalar_one()
+    assert entry.qdrant_point_id is None
+
+    indexer.failing = False
+    batch = await _upload(service, project, user, mode)
+
+    entries = (await db.execute(
+        select(KnowledgeEntry).where(KnowledgeEntry.project_id == project.id)
+    )).scalars().all()
+    # The stored row is unchanged, so it is reused rather than duplicated, but now indexed
+    assert [e.id for e in entries] == [entry.id]
+    await db.refresh(entries[0])
+    assert entries[0].qdrant_point_id is not None
+    assert indexer.indexed == [entry.id]
+    assert batch.processed_count == 1
+
+
+@pytest.mark.asyncio
+async def test_reupload_of_indexed_row_skips_indexing(db, project, user, monkeypatch):
+    indexer = FlakyIndexer()
+    indexer.failing = False
+    monkeypatch.setattr(batch_module.vector_indexer, "index_entries", indexer.index_entries)
+    service = KnowledgeBatchService(db)
+
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC)
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC)
+
+    assert len(indexer.indexed) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_upsert_leaves_entries_unindexed(db, project, user, monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_module.settings, "KNOWLEDGE_EMBEDDING_PROVIDER", "openai")
+    monkeypatch.setattr(vector_module.settings, "SYSTEM_OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(vector_module.settings, "QDRANT_VECTOR_SIZE", DIMENSIONS)
+    monkeypatch.setattr(vector_module.settings, "QDRANT_RETRY_SECONDS", 0)
+    monkeypatch.setattr(vector_module, "litellm_aembedding", fake_embeddings)
+    # One point per upsert: the first row is stored, the second row's upsert fails
+    backend = FailingUpsertBackend(str(tmp_path), fail_from=2)
+    indexer = KnowledgeVectorService(tenant_mode="shared", backend=backend)
+    indexer.upsert_batch_size = 1
+    monkeypatch.setattr(batch_module, "vector_indexer", indexer)
+    service = KnowledgeBatchService(db)
+
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC, TWO_ROWS_CSV)
+
+    query = (
+        select(KnowledgeEntry.jira_key, KnowledgeEntry.qdrant_point_id)
+        .where(KnowledgeEntry.project_id == project.id)
+        .order_by(KnowledgeEntry.jira_key)
+    )
+    stored = (await db.execute(query)).all()
+    assert stored[0].qdrant_point_id is not None
+    assert stored[1].qdrant_point_id is None
+
+    # The entry whose upsert failed is picked up again by the next upload
+    backend.fail_from = None
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC, TWO_ROWS_CSV)
+    assert all(point_id for _, point_id in (await db.execute(query)).all())
+
+
+@pytest.mark.asyncio
+async def test_entries_with_legacy_row_hash_still_match(db, project, user, monkeypatch):
+    indexer = FlakyIndexer()
+    indexer.failing = False
+    monkeypatch.setattr(batch_module.vector_indexer, "index_entries", indexer.index_entries)
+    service = KnowledgeBatchService(db)
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC)
+
+    # As stored before row hashes became content-only
+    entry = (await db.execute(
+        select(KnowledgeEntry).where(KnowledgeEntry.project_id == project.id)
+    )).scalar_one()
+    row = parser_module.ParsedRow(
+        2, {"jira_key": "PAY-1", "title": "Expired card is declined", "expected_result": "Error shown"}
+    )
+    column_map = parser_module.parser.detect_columns(["jira_key", "title", "expected_result"])
+    normalized = parser_module.parser.normalize_row(row, column_map)
+    await db.execute(
+        update(KnowledgeEntry)
+        .where(KnowledgeEntry.id == entry.id)
+        .values(source_row_hash=service._legacy_hash_row(normalized))
+    )
+    await db.commit()
+
+    await _upload(service, project, user, KnowledgeIngestMode.SYNC)
+
+    entries = (await db.execute(
+        select(KnowledgeEntry)
+        .where(KnowledgeEntry.project_id == project.id)
+        .execution_options(populate_existing=True)
+    )).scalars().all()
+    assert [(e.id, e.status) for e in entries] == [(entry.id, KnowledgeEntryStatus.ACTIVE.value)]
+    assert entries[0].source_row_hash == service._hash_row(normalized)
+    assert len(indexer.indexed) == 1
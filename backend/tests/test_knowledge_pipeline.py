@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models import KnowledgeBatch, KnowledgeBatchStatus
+from app.services.knowledge_base import pipeline as pipeline_module
+from app.services.knowledge_base.batch_service import KnowledgeBatchService
+
+
+async def _batch(db, project, user, status, heartbeat_at):
+    batch = await KnowledgeBatchService(db).create_batch(
+        project=project, user=user, file_name="cases.csv", file_type="csv", file_size_bytes=10
+    )
+    batch.status = status.value
+    batch.heartbeat_at = heartbeat_at
+    await db.commit()
+    return batch.id
+
+
+async def _status(db, batch_id):
+    result = await db.execute(
+        select(KnowledgeBatch).where(KnowledgeBatch.id == batch_id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one().status
+
+
+@pytest.mark.asyncio
+async def test_sweep_fails_only_batches_with_stale_heartbeat(db, project, user, session_factory, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "AsyncSessionLocal", session_factory)
+    now = datetime.now(timezone.utc)
+    live = await _batch(db, project, user, KnowledgeBatchStatus.PROCESSING, now - timedelta(seconds=5))
+    stuck = await _batch(db, project, user, KnowledgeBatchStatus.PROCESSING, now - timedelta(hours=1))
+    never_started = await _batch(db, project, user, KnowledgeBatchStatus.PENDING, now - timedelta(hours=1))
+
+    assert await pipeline_module.fail_interrupted_batches() == 2
+
+    assert await _status(db, live) == KnowledgeBatchStatus.PROCESSING.value
+    assert await _status(db, stuck) == KnowledgeBatchStatus.FAILED.value
+    assert await _status(db, never_started) == KnowledgeBatchStatus.FAILED.value
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_orchestrator as orchestrator_module
+from app.services.llm_cache import CompletionCache
+from app.services.llm_orchestrator import LLMOrchestrator
+
+
+class FakeCompletions:
+    """Stands in for litellm.acompletion; records the key each call was made with"""
+
+    def __init__(self):
+        self.api_keys = []
+
+    async def __call__(self, model, messages, api_key, **kwargs):
+        self.api_keys.append(api_key)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer for {api_key}"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+            model=model,
+        )
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    fake = FakeCompletions()
+    monkeypatch.setattr(orchestrator_module, "acompletion", fake)
+    monkeypatch.setattr(
+        orchestrator_module, "completion_cache", CompletionCache(ttl_seconds=60, max_entries=10)
+    )
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_is_not_served_to_another_key(completions):
+    orchestrator = LLMOrchestrator()
+    alice_key = orchestrator.encrypt_api_key("sk-alice")
+    bob_key = orchestrator.encrypt_api_key("sk-bob")
+
+    first = await orchestrator.generate_completion("Write test cases", alice_key)
+    again = await orchestrator.generate_completion("Write test cases", alice_key)
+    other = await orchestrator.generate_completion("Write test cases", bob_key)
+
+    assert again["cached"] and again["content"] == first["content"]
+    assert not other["cached"]
+    assert other["content"] == "answer for sk-bob"
+    assert completions.api_keys == ["sk-alice", "sk-bob"]
+
+
+@pytest.mark.asyncio
+async def test_same_key_encrypted_twice_shares_the_cache(completions):
+    orchestrator = LLMOrchestrator()
+
+    await orchestrator.generate_completion("Write test cases", orchestrator.encrypt_api_key("sk-alice"))
+    cached = await orchestrator.generate_completion("Write test cases", orchestrator.encrypt_api_key("sk-alice"))
+
+    assert cached["cached"]
+    assert completions.api_keys == ["sk-alice"]
@@ -0,0 +1,45 @@
+"""Choosing the vector backend, and deletes on the local one."""
+import pytest
+
+from app.services.knowledge_base import vector_service as vector_module
+from app.services.knowledge_base.local_vector_backend import LocalVectorBackend
+from app.services.knowledge_base.vector_backends import QdrantVectorBackend, VectorPoint
+
+DIMENSIONS = 4
+COLLECTION = "test_cases"
+
+
+def point(point_id, project_id):
+    return VectorPoint(id=point_id, vector=[1.0, 0.0, 0.0, 0.0], payload={"project_id": project_id})
+
+
+@pytest.mark.parametrize("configured, expected", [
+    ("qdrant", QdrantVectorBackend),
+    ("local", LocalVectorBackend),
+    # A typo must not move an existing deployment off its Qdrant data
+    ("qdarnt", QdrantVectorBackend),
+])
+def test_local_backend_only_when_asked_for(monkeypatch, tmp_path, configured, expected):
+    monkeypatch.setattr(vector_module.settings, "VECTOR_BACKEND", configured)
+    monkeypatch.setattr(vector_module.settings, "LOCAL_VECTOR_DIR", str(tmp_path))
+    assert isinstance(vector_module._build_vector_backend(None, DIMENSIONS, 16), expected)
+
+
+@pytest.mark.asyncio
+async def test_delete_opens_only_the_project_segment(tmp_path):
+    writer = LocalVectorBackend(str(tmp_path), DIMENSIONS, hnsw=False)
+    await writer.upsert(COLLECTION, [point("a1", "a"), point("a2", "a"), point("b1", "b")])
+
+    backend = LocalVectorBackend(str(tmp_path), DIMENSIONS, hnsw=False)
+    await backend.delete(COLLECTION, ["a1"], "a")
+
+    assert set(backend._segments) == {(COLLECTION, "a")}
+    assert [hit["id"] for hit in await backend.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], "a", 10)] == ["a2"]
+    assert [hit["id"] for hit in await backend.search(COLLECTION, [1.0, 0.0, 0.0, 0.0], "b", 10)] == ["b1"]
+
+
+@pytest.mark.asyncio
+async def test_delete_in_project_without_points_is_a_no_op(tmp_path):
+    backend = LocalVectorBackend(str(tmp_path), DIMENSIONS, hnsw=False)
+    await backend.delete(COLLECTION, ["missing"], "a")
+    assert backend._segments == {}
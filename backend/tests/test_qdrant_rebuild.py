@@ -0,0 +1,144 @@
+"""
+QdrantVectorBackend.rebuild_collection against in-process Qdrant: writes made
+while it copies, and plain collections from before aliases.
+"""
+import uuid
+
+import pytest
+from qdrant_client.http import models as qmodels
+
+from app.services.knowledge_base.vector_backends import QdrantVectorBackend, VectorPoint
+
+DIMENSIONS = 4
+NAME = "test_cases"
+
+
+def point(title, project_id="p1", point_id=None):
+    return VectorPoint(
+        id=point_id or str(uuid.uuid4()),
+        vector=[1.0, 0.5, 0.25, float(len(title))],
+        payload={"project_id": project_id, "title": title},
+    )
+
+
+@pytest.fixture
+def backend():
+    return QdrantVectorBackend(DIMENSIONS, batch_size=2, location=":memory:")
+
+
+async def titles(backend, collection_name=NAME):
+    hits = await backend.search(collection_name, [1.0, 0.5, 0.25, 1.0], "p1", limit=100)
+    return sorted(hit["payload"]["title"] for hit in hits)
+
+
+async def create_plain_collection(backend, points):
+    """A collection as created before aliases: the plain name, no version"""
+    await backend.client.create_collection(
+        NAME, vectors_config=qmodels.VectorParams(size=DIMENSIONS, distance=qmodels.Distance.COSINE)
+    )
+    await backend.upsert(NAME, points)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_moves_alias_and_keeps_points(backend):
+    await backend.ensure_collection(NAME, create=True)
+    await backend.upsert(NAME, [point("a"), point("b"), point("c")])
+
+    assert await backend.rebuild_collection(NAME) == f"{NAME}_v2"
+
+    assert (await backend.aliases())[NAME] == f"{NAME}_v2"
+    assert f"{NAME}_v1" not in await backend._collection_names()
+    assert await titles(backend) == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_catches_up_writes_made_during_the_copy(backend, monkeypatch):
+    await backend.ensure_collection(NAME, create=True)
+    kept = point("kept")
+    changed = point("before")
+    dropped = point("dropped")
+    await backend.upsert(NAME, [kept, changed, dropped])
+
+    async def write_while_indexing(collection_name, timeout):
+        # Indexing keeps going through the alias, which still points at v1
+        await backend.upsert(NAME, [point("after", point_id=changed.id), point("new")])
+        await backend.delete(NAME, [dropped.id], "p1")
+
+    monkeypatch.setattr(backend, "_wait_until_indexed", write_while_indexing)
+    await backend.rebuild_collection(NAME)
+
+    assert await titles(backend) == ["after", "kept", "new"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_writes_that_reach_the_old_collection_at_the_swap(backend, monkeypatch):
+    await backend.ensure_collection(NAME, create=True)
+    await backend.upsert(NAME, [point("a")])
+    point_alias = backend._point_alias
+    late = point("late")
+
+    async def write_then_swap(alias_name, collection_name):
+        # A write the old collection takes after the last catch-up, just before the alias moves
+        await backend.upsert(NAME, [late])
+        await point_alias(alias_name, collection_name)
+        # and one the new collection takes right after
+        await backend.upsert(NAME, [point("through new alias")])
+
+    monkeypatch.setattr(backend, "_point_alias", write_then_swap)
+    await backend.rebuild_collection(NAME)
+
+    assert await titles(backend) == ["a", "late", "through new alias"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_of_plain_collection_serves_from_copy_until_alias_exists(backend, monkeypatch):
+    await create_plain_collection(backend, [point("a"), point("b")])
+    point_alias = backend._point_alias
+    during_gap = {}
+
+    async def check_then_create(alias_name, collection_name):
+        # The plain collection is gone and the alias does not exist yet
+        assert NAME not in await backend._collection_names()
+        assert await backend.ensure_collection(NAME, create=False)
+        await backend.upsert(NAME, [point("during gap")])
+        during_gap["titles"] = await titles(backend)
+        await point_alias(alias_name, collection_name)
+
+    monkeypatch.setattr(backend, "_point_alias", check_then_create)
+    assert await backend.rebuild_collection(NAME) == f"{NAME}_v1"
+
+    assert during_gap["titles"] == ["a", "b", "during gap"]
+    assert (await backend.aliases())[NAME] == f"{NAME}_v1"
+    assert await titles(backend) == ["a", "b", "during gap"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_of_plain_collection_keeps_it_when_copy_falls_short(backend, monkeypatch):
+    await create_plain_collection(backend, [point("a")])
+
+    async def copy_nothing(records, target):
+        return None
+
+    monkeypatch.setattr(backend, "_copy_records", copy_nothing)
+    with pytest.raises(RuntimeError, match="was kept"):
+        await backend.rebuild_collection(NAME)
+
+    assert NAME in await backend._collection_names()
+    assert await titles(backend) == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_finishes_one_stopped_before_the_alias(backend, monkeypatch):
+    await create_plain_collection(backend, [point("a")])
+
+    async def stop(alias_name, collection_name):
+        raise ConnectionError("Qdrant went away")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(backend, "_point_alias", stop)
+        with pytest.raises(ConnectionError):
+            await backend.rebuild_collection(NAME)
+
+    assert await titles(backend) == ["a"]
+    assert await backend.rebuild_collection(NAME) == f"{NAME}_v1"
+    assert (await backend.aliases())[NAME] == f"{NAME}_v1"
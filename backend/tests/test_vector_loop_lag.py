@@ -0,0 +1,171 @@
+"""
+The event loop keeps running while knowledge indexing and search wait on the
+embedding provider and the vector store (the check behind
+benchmarks/vector_loop_benchmark.py, without a provider process).
+"""
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.knowledge_base import vector_service as vector_module
+from app.services.knowledge_base.local_vector_backend import LocalVectorBackend
+from app.services.knowledge_base.vector_service import KnowledgeVectorService
+
+DIMENSIONS = 8
+LATENCY = 0.2
+HEARTBEAT = 0.005
+# A blocking call would stall the loop for the whole LATENCY
+MAX_LAG = 0.1
+
+
+class FakeEmbeddings:
+    """Stands in for litellm.aembedding with a provider that takes LATENCY to answer"""
+
+    def __init__(self, blocking=False):
+        self.blocking = blocking
+        self.calls = 0
+
+    async def __call__(self, model, input, api_key, **kwargs):
+        self.calls += 1
+        if self.blocking:
+            time.sleep(LATENCY)
+        else:
+            await asyncio.sleep(LATENCY)
+        texts = [input] if isinstance(input, str) else input
+        return {"data": [
+            {"index": index, "embedding": [float(len(text) % 7 + 1)] * DIMENSIONS}
+            for index, text in enumerate(texts)
+        ]}
+
+
+async def max_loop_lag(coro):
+    """Run coro while a heartbeat ticks every HEARTBEAT; returns (result, worst lag, ticks)"""
+    loop = asyncio.get_running_loop()
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            expected = loop.time() + HEARTBEAT
+            await asyncio.sleep(HEARTBEAT)
+            lags.append(max(0.0, loop.time() - expected))
+
+    ticker = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    try:
+        result = await coro
+    finally:
+        stop.set()
+        await ticker
+    return result, max(lags), len(lags)
+
+
+def entries(project_id, count):
+    organization_id = uuid.uuid4()
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            project_id=project_id,
+            organization_id=organization_id,
+            user_story_id=None,
+            jira_key=f"PAY-{index}",
+            priority="medium",
+            test_type="functional",
+            title=f"Checkout rejects expired card {index}",
+            description="The order is not placed and the cart is kept",
+            steps=[{"action": "Pay with an expired card", "expected_result": "Error"}],
+            expected_result="Payment is declined with a clear message",
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_module.settings, "KNOWLEDGE_EMBEDDING_PROVIDER", "openai")
+    monkeypatch.setattr(vector_module.settings, "SYSTEM_OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(vector_module.settings, "QDRANT_VECTOR_SIZE", DIMENSIONS)
+    return KnowledgeVectorService(
+        tenant_mode="shared", backend=LocalVectorBackend(str(tmp_path), DIMENSIONS, hnsw=False)
+    )
+
+
+async def warm_up(service, project_id):
+    # One-off costs (collection bootstrap, tokenizer load) are not lag under load
+    await service.index_entries(entries(project_id, 1))
+    await service.search_relevant_entries("warm up", project_id, limit=1)
+
+
+@pytest.mark.asyncio
+async def test_indexing_does_not_block_loop(service, monkeypatch):
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(vector_module, "litellm_aembedding", embeddings)
+    project_id = uuid.uuid4()
+    await warm_up(service, project_id)
+
+    batch = entries(project_id, 50)
+    _, lag, ticks = await max_loop_lag(service.index_entries(batch))
+
+    assert all(entry.qdrant_point_id for entry in batch)
+    assert lag < MAX_LAG
+    assert ticks >= LATENCY / HEARTBEAT / 2
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_search_does_not_block_loop(service, monkeypatch):
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(vector_module, "litellm_aembedding", embeddings)
+    project_id = uuid.uuid4()
+    await warm_up(service, project_id)
+    await service.index_entries(entries(project_id, 20))
+
+    searches = [service.search_relevant_entries(f"expired card {index}", project_id) for index in range(10)]
+    results, lag, _ = await max_loop_lag(asyncio.gather(*searches))
+
+    assert all(len(hits) == 5 for hits in results)
+    assert lag < MAX_LAG
+    await service.close()
+
+
+class SlowTiktoken:
+    """Stands in for tiktoken with an encoding that takes LATENCY to load (a BPE download)"""
+
+    def get_encoding(self, name):
+        time.sleep(LATENCY)
+        return SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+
+
+@pytest.mark.asyncio
+async def test_first_indexing_loads_tokenizer_off_the_loop(service, monkeypatch):
+    monkeypatch.setattr(vector_module, "litellm_aembedding", FakeEmbeddings())
+    monkeypatch.setattr(vector_module, "tiktoken", SlowTiktoken())
+    monkeypatch.setattr(vector_module, "_token_encoder", None)
+    monkeypatch.setattr(vector_module, "_token_encoder_loaded", False)
+    project_id = uuid.uuid4()
+    # Only the collection is bootstrapped: the tokenizer is cold
+    await service._ensure_collection(service.collection_name)
+
+    batch = entries(project_id, 5)
+    _, lag, _ = await max_loop_lag(service.index_entries(batch))
+
+    assert vector_module._token_encoder is not None
+    assert all(entry.qdrant_point_id for entry in batch)
+    assert lag < MAX_LAG
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_lag_check_catches_blocking_call(service, monkeypatch):
+    # The same check fails for an embedding call that blocks the loop
+    monkeypatch.setattr(vector_module, "litellm_aembedding", FakeEmbeddings(blocking=True))
+    project_id = uuid.uuid4()
+    await warm_up(service, project_id)
+
+    _, lag, _ = await max_loop_lag(service.index_entries(entries(project_id, 5)))
+
+    assert lag >= MAX_LAG
+    await service.close()